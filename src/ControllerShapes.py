@@ -0,0 +1,79 @@
+# Controller curve shapes, as point arrays computed once per shape and size.
+# Curves are made straight from the points, so there is no makeCurve history and no scale to freeze,
+# and with shared = True every controller of the same shape and size instances one shape node:
+#   CreateControllerCurve("ac_hand_l", "box", 10, shared = True)
+import math
+from functools import lru_cache
+
+import maya.cmds as mc
+import maya.api.OpenMaya as om
+
+CIRCLE_SECTIONS = 8
+# a periodic cubic curve passes inside its cvs, at this fraction of their radius where a cv sits
+CIRCLE_CV_RADIUS_SCALE = 6 / (4 + 2 * math.cos(2 * math.pi / CIRCLE_SECTIONS))
+
+def GetBoxPoints():
+    return ((-0.5,0.5,0.5), (0.5,0.5,0.5), (0.5,0.5,-0.5), (-0.5, 0.5, -0.5), (-0.5, 0.5, 0.5), (-0.5, -0.5, 0.5), (0.5, -0.5, 0.5), (0.5, 0.5, 0.5), (0.5, -0.5, 0.5), (0.5, -0.5, -0.5), (0.5, 0.5, -0.5), (0.5, -0.5, -0.5), (-0.5, -0.5, -0.5), (-0.5, 0.5, -0.5), (-0.5, -0.5, -0.5), (-0.5, -0.5, 0.5))
+
+def GetCirclePoints():
+    # unit diameter, facing x like mc.circle(nr = (1,0,0))
+    radius = 0.5 * CIRCLE_CV_RADIUS_SCALE
+    angles = [2 * math.pi * i / CIRCLE_SECTIONS for i in range(CIRCLE_SECTIONS)]
+    return tuple((0, radius * math.cos(angle), radius * math.sin(angle)) for angle in angles)
+
+def GetArrowPoints():
+    # flat on the ground, pointing down +z
+    return ((-0.15,0,-0.5), (0.15,0,-0.5), (0.15,0,0.1), (0.35,0,0.1), (0,0,0.5), (-0.35,0,0.1), (-0.15,0,0.1), (-0.15,0,-0.5))
+
+def GetCrossPoints():
+    return ((-0.15,0,-0.5), (0.15,0,-0.5), (0.15,0,-0.15), (0.5,0,-0.15), (0.5,0,0.15), (0.15,0,0.15), (0.15,0,0.5), (-0.15,0,0.5), (-0.15,0,0.15), (-0.5,0,0.15), (-0.5,0,-0.15), (-0.15,0,-0.15), (-0.15,0,-0.5))
+
+# name: (unit size points, degree, periodic)
+SHAPES = {
+    "box": (GetBoxPoints, 1, False),
+    "circle": (GetCirclePoints, 3, True),
+    "arrow": (GetArrowPoints, 1, False),
+    "cross": (GetCrossPoints, 1, False),
+}
+
+sharedShapes = {} # (shape name, size): the shape node the controllers of that shape and size instance
+sceneCallbacks = [] # clear sharedShapes when a scene is made or opened, its nodes are not the cached ones
+
+def ClearSharedShapes(*args):
+    sharedShapes.clear()
+
+def WatchSceneChanges():
+    # once per session, the callbacks stay for every scene after
+    if not sceneCallbacks:
+        sceneCallbacks.extend(om.MSceneMessage.addCallback(message, ClearSharedShapes) for message in (om.MSceneMessage.kAfterNew, om.MSceneMessage.kAfterOpen))
+
+@lru_cache(maxsize = None)
+def GetShapeCurveArgs(shapeName, size):
+    # the mc.curve keyword arguments for the shape at size, made once and reused for every controller
+    getPoints, degree, periodic = SHAPES[shapeName]
+    points = [(x * size, y * size, z * size) for x, y, z in getPoints()]
+    if not periodic:
+        return {"d": degree, "p": points}
+    points += points[:degree] # a periodic curve repeats its first degree cvs
+    knots = list(range(-degree + 1, len(points)))
+    return {"d": degree, "p": points, "per": True, "k": knots}
+
+def CreateControllerCurve(name, shapeName, size, shared = False):
+    # returns the transform name, made as name
+    shapeKey = (shapeName, size)
+    sharedShape = sharedShapes.get(shapeKey)
+    if shared and sharedShape:
+        if mc.objExists(sharedShape):
+            mc.createNode("transform", n = name)
+            mc.parent(sharedShape, name, add = True, s = True)
+            return name
+        del sharedShapes[shapeKey] # deleted with its last controller, a new one is made below
+
+    mc.curve(n = name, **GetShapeCurveArgs(shapeName, size))
+    shape = (mc.listRelatives(name, s = True, f = True) or [None])[0]
+    if shape:
+        shape = mc.rename(shape, name + "Shape")
+        if shared:
+            WatchSceneChanges()
+            sharedShapes[shapeKey] = shape
+    return name
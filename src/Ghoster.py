@@ -1,12 +1,204 @@
+import os
+import bisect
+import json
+import mmap
+import struct
+from array import array
 import maya.cmds as mc
+import maya.api.OpenMaya as om
+from maya.api.MDGContextGuard import MDGContextGuard
 from PySide2.QtCore import Signal, Qt
-from PySide2.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QListWidget, QAbstractItemView, QColorDialog, QSlider
-from PySide2.QtGui import QColor, QPainter, QBrush
+from PySide2.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QListWidget, QAbstractItemView, QColorDialog, QSlider, QCheckBox, QLineEdit
+from PySide2.QtGui import QColor, QPainter, QBrush, QIntValidator
 
 
 def GetCurrentFrame():
     return int(mc.currentTime(q=True))
 
+def GetMeshShape(mesh):
+    shapes = mc.listRelatives(mesh, s=True, type = "mesh", ni = True) # ni skips the intermediate (orig) shapes
+    if not shapes:
+        return ""
+    return shapes[0]
+
+def DuplicateWithoutHistory(mesh, name):
+    mc.duplicate(mesh, n = name)
+    mc.polyCollapseTweaks(GetMeshShape(name)) # bakes the vertex tweaks, ghost points are written as tweaks later
+    mc.delete(name, ch = True)
+    for shape in mc.listRelatives(name, s = True, f = True) or []:
+        if mc.getAttr(shape + ".intermediateObject"):
+            mc.delete(shape) # the orig shapes a skinned mesh leaves behind
+
+def GetTopologyCounts(shape):
+    return mc.polyEvaluate(shape, v=True), mc.polyEvaluate(shape, e=True), mc.polyEvaluate(shape, f=True)
+
+def GetTopologyKey(shape):
+    # meshes with the same counts can share one ghost base
+    vertCount, edgeCount, faceCount = GetTopologyCounts(shape)
+    return f"{vertCount}v{edgeCount}e{faceCount}f"
+
+def SetPointTweaks(shape, points, restPoints):
+    # the points as tweaks on top of the untweaked rest points, through setAttr so it can be undone
+    tweaks = []
+    for point, restPoint in zip(points, restPoints):
+        tweaks.extend((point.x - restPoint.x, point.y - restPoint.y, point.z - restPoint.z))
+    mc.setAttr(shape + ".pnts[0:" + str(len(restPoints) - 1) + "]", *tweaks)
+
+def GetDependNode(name):
+    selectionList = om.MSelectionList()
+    selectionList.add(name)
+    return selectionList.getDependNode(0)
+
+def GetDagPath(name):
+    selectionList = om.MSelectionList()
+    selectionList.add(name)
+    return selectionList.getDagPath(0)
+
+def GetMeshPoints(shape):
+    # read through the outMesh plug so the value respects the current evaluation context
+    meshPlug = om.MFnDependencyNode(GetDependNode(shape)).findPlug("outMesh", False)
+    return om.MFnMesh(meshPlug.asMObject()).getPoints(om.MSpace.kObject)
+
+def GetWorldMatrix(obj):
+    matrixPlug = om.MFnDependencyNode(GetDependNode(obj)).findPlug("worldMatrix", False).elementByLogicalIndex(0)
+    matrix = om.MFnMatrixData(matrixPlug.asMObject()).matrix()
+    return [matrix[i] for i in range(16)]
+
+def GetRestPoints(mesh):
+    # a skinned/deformed mesh keeps its rest pose on the intermediate (orig) shape
+    for shape in mc.listRelatives(mesh, s = True, type = "mesh", f = True) or []:
+        if mc.getAttr(shape + ".intermediateObject"):
+            return GetMeshPoints(shape)
+    return GetMeshPoints(GetMeshShape(mesh))
+
+def PointsToFloats(points):
+    floats = array("f")
+    for point in points:
+        floats.extend((point.x, point.y, point.z))
+    return floats
+
+def FloatsToPoints(floats):
+    return om.MPointArray([om.MPoint(floats[i], floats[i + 1], floats[i + 2]) for i in range(0, len(floats), 3)])
+
+def GetGhostCachePath():
+    scenePath = mc.file(q=True, sn=True)
+    if not scenePath: # the scene was never saved, nowhere to put the cache
+        return ""
+    return os.path.splitext(scenePath)[0] + ".ghostcache"
+
+class GhostCache:
+    # Sidecar file layout:
+    #   magic (8 bytes) | version (uint32) | index size (uint32) | index (json) | float32 data
+    # The index holds one topology record per source (topology key, vertex count, offset of the rest points)
+    # and one record per ghost (source, frame, world matrix, offset of its point deltas against the rest).
+    # The data part is memory mapped, a ghost's deltas are only read when that ghost is restored.
+    magic = b"GHSTCACH"
+    version = 1
+    headerFormat = "<8sII"
+
+    def __init__(self, path):
+        self.path = path
+        self.sources = {} # source -> topology record
+        self.ghosts = {} # (source, frame) -> ghost record
+        self.file = None
+        self.buffer = None
+        self.dataStart = 0
+
+    def Load(self):
+        self.Close()
+        if not self.path or not os.path.exists(self.path):
+            return False
+
+        self.file = open(self.path, "rb")
+        self.buffer = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+        headerSize = struct.calcsize(self.headerFormat)
+        magic, version, indexSize = struct.unpack_from(self.headerFormat, self.buffer, 0)
+        if magic != self.magic or version != self.version:
+            self.Close()
+            return False
+
+        index = json.loads(self.buffer[headerSize:headerSize + indexSize].decode("utf-8"))
+        self.dataStart = headerSize + indexSize
+        self.sources = index["sources"]
+        self.ghosts = {(record["src"], record["frame"]): record for record in index["ghosts"]}
+        return True
+
+    def GetFloats(self, offset, count):
+        start = self.dataStart + offset * 4
+        return memoryview(self.buffer)[start:start + count * 4].cast("f") # no copy, reads straight from the map
+
+    def GetRestFloats(self, srcMesh):
+        source = self.sources[srcMesh]
+        return self.GetFloats(source["rest"], source["vertexCount"] * 3)
+
+    def GetDeltaFloats(self, srcMesh, frame):
+        record = self.ghosts[(srcMesh, frame)]
+        return self.GetFloats(record["deltas"], self.sources[srcMesh]["vertexCount"] * 3)
+
+    def Write(self, sources, ghosts):
+        # sources: source -> (topology key, rest floats), ghosts: list of (source, frame, world matrix, delta floats)
+        index = {"sources": {}, "ghosts": []}
+        data = array("f")
+        for srcMesh, (topologyKey, restFloats) in sources.items():
+            index["sources"][srcMesh] = {"topology": topologyKey, "vertexCount": len(restFloats) // 3, "rest": len(data)}
+            data.extend(restFloats)
+
+        for srcMesh, frame, worldMatrix, deltaFloats in ghosts:
+            index["ghosts"].append({"src": srcMesh, "frame": frame, "matrix": list(worldMatrix), "deltas": len(data)})
+            data.extend(deltaFloats)
+
+        indexBytes = json.dumps(index, separators = (",", ":")).encode("utf-8")
+        indexBytes += b" " * (-len(indexBytes) % 4) # keep the float data 4 byte aligned
+
+        self.Close() # the file can not be replaced while it is mapped
+        tempPath = self.path + ".tmp"
+        with open(tempPath, "wb") as cacheFile:
+            cacheFile.write(struct.pack(self.headerFormat, self.magic, self.version, len(indexBytes)))
+            cacheFile.write(indexBytes)
+            data.tofile(cacheFile)
+        os.replace(tempPath, self.path)
+        return self.Load()
+
+    def Close(self):
+        if self.buffer:
+            self.buffer.close()
+        if self.file:
+            self.file.close()
+        self.buffer = None
+        self.file = None
+        self.sources = {}
+        self.ghosts = {}
+
+FADE_NODE_SUFFIXES = ("_dist", "_div", "_offset", "_clamp") # nodes of a bucket that is faded in the graph
+
+class GhostEntry:
+    def __init__(self, ghost, frame):
+        self.ghost = ghost
+        self.frame = frame
+        self.mat = ""
+        self.sg = ""
+        self.bucket = None # key of the pooled material the ghost is in, None means not assigned yet
+        self.ghostMesh = "" # the GhostMesh a shared topology ghost is in
+
+class MaterialBucket:
+    def __init__(self, key):
+        self.mat = key + "_mat"
+        self.sg = key + "_sg"
+        self.nodes = [key + suffix for suffix in FADE_NODE_SUFFIXES] # only exist for buckets faded in the graph
+        self.users = 0 # how many ghosts are assigned to this bucket
+
+class GhostMesh:
+    # one mesh that holds the points of every shared topology ghost of a source, one block of faces per ghost
+    def __init__(self, name, base, faceCount):
+        self.name = name
+        self.base = base # the shared base the ghosts are made from
+        self.faceCount = faceCount # faces of one ghost
+        self.ghosts = [] # in the order their faces are in the mesh
+
+    def GetFaces(self, ghost):
+        start = self.ghosts.index(ghost) * self.faceCount
+        return f"{self.name}.f[{start}:{start + self.faceCount - 1}]"
+
 class Ghost:
     def __init__(self):
         self.srcMeshes = set() # a list that has unique elements.
@@ -16,69 +208,309 @@ class Ghost:
         self.transparencyRange = 100
         self.transparencyOffset = 0
         self.srcAttr = "src"
-        self.timeChangeJob = mc.scriptJob(e=["timeChanged", self.TimeChangedEvent])
+        self.rangeAttr = "transparencyRange"
+        self.offsetAttr = "transparencyOffset"
+        self.evaluateInGraphAttr = "evaluateInGraph"
+        self.evaluateInGraph = False # when True, the fade is computed by nodes and no python runs on time change
+        self.shareTopology = False # when True, the ghosts of a source only store points, as faces of one shared ghost mesh
+        self.ghostBaseSuffix = "_ghostBase"
+        self.ghostMeshSuffix = "_ghostMesh"
+        self.ghostsPerGhostMesh = 8 # an add re-unites at most this many ghosts, past it the next ones start another ghost mesh
+        self.ghostMeshAttr = "ghostMesh" # on a shared topology ghost, the mesh its points are in
+        self.ghostSlotsAttr = "ghostSlots" # on a ghost mesh, its ghosts in face order
+        self.ghostMeshes = {} # ghost mesh name -> GhostMesh
+        self.topologyCounts = {} # mesh -> (vertices, edges, faces), polyEvaluate once per source
+        self.basePoints = {} # shared base -> its points, the rest the ghost points are tweaked from
+        self.proxyReduction = 0 # percent of the source's vertices to remove for ghosts, 0 keeps full resolution
+        self.ghostProxySuffix = "_ghostProxy"
+        self.proxyVertexMapAttr = "proxyVertexMap"
+        self.proxyVertexMaps = {} # proxy base -> index of the source vertex every proxy vertex follows
+        self.transparencyLevels = 20 # transparency is quantized to this many steps, one pooled material per step
+        self.materialPoolPrefix = "ghost_pool_"
+        self.materialPool = {} # bucket key -> MaterialBucket
+        self.ghostEntries = {} # ghost name -> GhostEntry
+        self.ghostsByFrame = {} # frame -> list of GhostEntry on that frame
+        self.sortedFrames = [] # all frames that have ghosts, in ascending order
+        self.useGhostCacheAttr = "useGhostCache"
+        self.useGhostCache = False # when True, ghosts are saved to a sidecar cache instead of the scene
+        self.ghostCache = GhostCache("")
+        self.pendingGhosts = {} # frame -> sources with a cached ghost that is not rebuilt in the scene yet
+        self.pendingFrames = [] # frames of pendingGhosts, in ascending order
+        self.registryDirty = False # a ghost was deleted outside of the tool, the registry is rebuilt before its next use
+        self.timeChangeJob = None
+        self.sceneCallbacks = []
         self.InitIfGhostGrpNotExist()
+        if not self.evaluateInGraph:
+            self.timeChangeJob = mc.scriptJob(e=["timeChanged", self.TimeChangedEvent])
+        self.undoJobs = [mc.scriptJob(e=[event, self.RebuildGhostRegistry]) for event in ("Undo", "Redo")]
+        self.sceneCallbacks.append(om.MDGMessage.addNodeRemovedCallback(self.NodeRemovedEvent, "transform"))
+        self.sceneCallbacks.append(om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeSave, self.BeforeSceneSaved))
+        self.sceneCallbacks.append(om.MSceneMessage.addCallback(om.MSceneMessage.kAfterSave, self.AfterSceneSaved))
+        self.LoadGhostCache()
+
+    def Close(self):
+        # the jobs and callbacks outlive the window otherwise, and keep running in every scene opened after
+        for job in [self.timeChangeJob] + self.undoJobs:
+            if job is not None and mc.scriptJob(exists = job):
+                mc.scriptJob(kill = job, force = True)
+        self.timeChangeJob = None
+        self.undoJobs = []
+        om.MMessage.removeCallbacks(self.sceneCallbacks)
+        self.sceneCallbacks = []
+        self.ghostCache.Close()
+
+    def NodeRemovedEvent(self, node, *args):
+        # the tool unregisters its ghosts before deleting them, a registered one is deleted by the user
+        name = om.MFnDependencyNode(node).name()
+        if name in self.ghostEntries or name in self.ghostMeshes:
+            self.registryDirty = True
 
     def TimeChangedEvent(self):
+        self.RestoreVisibleCachedGhosts()
         self.UpdateGhostTransparency()
 
     def OffsetGhostTransparency(self, value):
         self.transparencyOffset = value/100
-        self.UpdateGhostTransparency()
+        mc.setAttr(self.ghostGrp + "." + self.offsetAttr, self.transparencyOffset)
+        if not self.evaluateInGraph: # the graph picks the new value up by itself
+            self.UpdateGhostTransparency()
 
+    def SetEvaluateInGraph(self, evaluateInGraph):
+        self.evaluateInGraph = evaluateInGraph
+        mc.setAttr(self.ghostGrp + "." + self.evaluateInGraphAttr, evaluateInGraph)
+        if evaluateInGraph and self.timeChangeJob is not None:
+            mc.scriptJob(kill = self.timeChangeJob, force = True)
+            self.timeChangeJob = None
+        elif not evaluateInGraph and self.timeChangeJob is None:
+            self.timeChangeJob = mc.scriptJob(e=["timeChanged", self.TimeChangedEvent])
 
-    def UpdateGhostTransparency(self, newRange):
-        self.transparencyRange = newRange
-        currentFrame = GetCurrentFrame()
-        ghosts = mc.listRelatives(self.ghostGrp, c = True)
-        if not ghosts:
-            return
-        
-        for ghost in ghosts:
-            ghostFrame = mc.getAttr(ghost + "." + self.frameAttr)
-            ghostFrameDistance = abs(ghostFrame - currentFrame) #Gives the absolute value of the argument
+        self.UpdateGhostTransparency() # moves every ghost to the buckets of the new mode
+
+    def GetTransparencyForFrame(self, ghostFrame, currentFrame):
+        ghostFrameDistance = abs(ghostFrame - currentFrame) #Gives the absolute value of the argument
+        if self.transparencyRange <= 0: # a zero range means everything but the current frame is fully faded
+            normalizeDistance = 1 if ghostFrameDistance else 0
+        else:
             normalizeDistance = ghostFrameDistance / self.transparencyRange
-            normalizeDistance += self.transparencyOffset
-            if normalizeDistance > 1:
-                normalizeDistance = 1
 
-            mat = self.GetMaterialNameForGhost(ghost)
-            if mc.objExists(mat):
-                mc.setAttr(mat + ".transparency" , normalizeDistance, normalizeDistance, normalizeDistance, type = "double3")
+        normalizeDistance += self.transparencyOffset
+        if normalizeDistance > 1:
+            normalizeDistance = 1
+        return normalizeDistance
+
+    def GetTransparencyLevel(self, transparency):
+        return int(round(transparency * self.transparencyLevels))
 
+    def GetBucketKey(self, entry, currentFrame):
+        if self.evaluateInGraph: # one bucket per ghost frame, the graph fades it
+            return self.materialPoolPrefix + "frame" + str(entry.frame).replace("-", "n")
+        level = self.GetTransparencyLevel(self.GetTransparencyForFrame(entry.frame, currentFrame))
+        return self.materialPoolPrefix + str(level)
 
+    def UpdateGhostTransparency(self):
+        if self.registryDirty:
+            self.ResyncGhostRegistry() # updates the transparency itself
+            return
+
+        currentFrame = GetCurrentFrame()
+        ghostsToMove = {} # bucket key -> entries that have to move to that bucket
+        for entry in self.ghostEntries.values():
+            key = self.GetBucketKey(entry, currentFrame)
+            if key == entry.bucket: # still in the same bucket, skip the scene edit
+                continue
+            ghostsToMove.setdefault(key, []).append(entry)
 
+        for key, entries in ghostsToMove.items():
+            bucket = self.GetOrCreateMaterialBucket(key, entries[0].frame, currentFrame)
+            mc.sets([self.GetGhostMembers(entry) for entry in entries], edit = True, forceElement = bucket.sg) # one call per bucket
+            for entry in entries:
+                self.ReleaseMaterialBucket(entry.bucket)
+                entry.bucket = key
+                entry.mat = bucket.mat
+                entry.sg = bucket.sg
+                bucket.users += 1
+
+        self.CleanupMaterialPool()
+
+    def GetGhostMembers(self, entry):
+        if entry.ghostMesh: # a shared topology ghost is a block of faces
+            return self.ghostMeshes[entry.ghostMesh].GetFaces(entry.ghost)
+        return entry.ghost
 
     def UpdateTransparencyRange(self, newRange):
         self.transparencyRange = newRange
-        self.UpdateGhostTransparency()
+        mc.setAttr(self.ghostGrp + "." + self.rangeAttr, max(newRange, 0.001)) # the graph divides by it
+        if not self.evaluateInGraph:
+            self.UpdateGhostTransparency()
 
 
     def UpgdateGhostColors(self, color: QColor):
-        ghosts = mc.listRelatives(self.ghostGrp, c= True)
         self.color[0] = color.redF()
         self.color[1] = color.greenF()
         self.color[2] = color.blueF()
-        for ghost in ghosts:
-            mat = self.GetMaterialNameForGhost(ghost)
-            mc.setAttr(mat + ".color", color.redF(), color.greenF(), color.blueF(), type = "double3")
+        for bucket in self.materialPool.values(): # the number of buckets does not grow with the ghosts
+            mc.setAttr(bucket.mat + ".color", color.redF(), color.greenF(), color.blueF(), type = "double3")
+
+    def GetOrCreateMaterialBucket(self, key, frame, currentFrame):
+        if key in self.materialPool:
+            return self.materialPool[key]
+
+        bucket = MaterialBucket(key)
+        if not mc.objExists(bucket.mat): #check if mat not exist
+            mc.shadingNode("lambert", asShader = True, name = bucket.mat) # create lambert mat if not exist
+
+        if not mc.objExists(bucket.sg): #check if shading engine exists
+            mc.sets(name = bucket.sg, renderable = True, empty = True) #create shading engine if not exists
+
+        mc.connectAttr(bucket.mat + ".outColor", bucket.sg + ".surfaceShader", force = True) # connect
+        mc.setAttr(bucket.mat + ".color", self.color[0], self.color[1], self.color[2], type = "double3")
+        if self.evaluateInGraph:
+            self.CreateFadeNetwork(bucket, frame)
+        else:
+            transparency = self.GetTransparencyLevel(self.GetTransparencyForFrame(frame, currentFrame)) / self.transparencyLevels
+            mc.setAttr(bucket.mat + ".transparency", transparency, transparency, transparency, type = "double3")
+
+        self.materialPool[key] = bucket
+        return bucket
+
+    def CreateFadeNetwork(self, bucket, frame):
+        # clamp(|time - frame| / range + offset, 0, 1), same as GetTransparencyForFrame
+        distNode, divNode, offsetNode, clampNode = bucket.nodes
+        if mc.objExists(clampNode):
+            return
+        mc.createNode("distanceBetween", n = distNode)
+        mc.connectAttr("time1.outTime", distNode + ".point1X")
+        mc.setAttr(distNode + ".point2X", frame)
+
+        mc.createNode("multiplyDivide", n = divNode)
+        mc.setAttr(divNode + ".operation", 2) # divide
+        mc.connectAttr(distNode + ".distance", divNode + ".input1X")
+        mc.connectAttr(self.ghostGrp + "." + self.rangeAttr, divNode + ".input2X")
+
+        mc.createNode("plusMinusAverage", n = offsetNode)
+        mc.connectAttr(divNode + ".outputX", offsetNode + ".input1D[0]")
+        mc.connectAttr(self.ghostGrp + "." + self.offsetAttr, offsetNode + ".input1D[1]")
+
+        mc.createNode("clamp", n = clampNode)
+        mc.setAttr(clampNode + ".maxR", 1)
+        mc.connectAttr(offsetNode + ".output1D", clampNode + ".inputR")
+        for channel in ("R", "G", "B"):
+            mc.connectAttr(clampNode + ".outputR", bucket.mat + ".transparency" + channel, force = True)
+
+    def ReleaseMaterialBucket(self, key):
+        bucket = self.materialPool.get(key)
+        if bucket:
+            bucket.users -= 1
+
+    def CleanupMaterialPool(self):
+        for key, bucket in list(self.materialPool.items()):
+            if bucket.users > 0:
+                continue
+            for node in [bucket.mat, bucket.sg] + bucket.nodes:
+                if mc.objExists(node):
+                    mc.delete(node)
+            del self.materialPool[key]
 
     def InitIfGhostGrpNotExist(self):
-        if mc.objExists(self.ghostGrp):
-            storedSrcMeshes = mc.getAttr(self.ghostGrp + "." + self.srcAttr)
-            if storedSrcMeshes:
-                self.srcMeshes = set(storedSrcMeshes.split("."))
+        if not mc.objExists(self.ghostGrp):
+            mc.createNode("transform", n = self.ghostGrp)
+            mc.addAttr(self.ghostGrp, ln = self.srcAttr, dt="string")
+
+        # settings the fade graph reads, scenes from older versions do not have them yet
+        if not mc.attributeQuery(self.rangeAttr, node = self.ghostGrp, exists = True):
+            mc.addAttr(self.ghostGrp, ln = self.rangeAttr, dv = self.transparencyRange, min = 0.001)
+        if not mc.attributeQuery(self.offsetAttr, node = self.ghostGrp, exists = True):
+            mc.addAttr(self.ghostGrp, ln = self.offsetAttr, dv = self.transparencyOffset)
+        if not mc.attributeQuery(self.evaluateInGraphAttr, node = self.ghostGrp, exists = True):
+            mc.addAttr(self.ghostGrp, ln = self.evaluateInGraphAttr, at = "bool", dv = False)
+        if not mc.attributeQuery(self.useGhostCacheAttr, node = self.ghostGrp, exists = True):
+            mc.addAttr(self.ghostGrp, ln = self.useGhostCacheAttr, at = "bool", dv = False)
+
+        storedSrcMeshes = mc.getAttr(self.ghostGrp + "." + self.srcAttr)
+        if storedSrcMeshes:
+            self.srcMeshes = set(storedSrcMeshes.split(","))
+        self.transparencyRange = mc.getAttr(self.ghostGrp + "." + self.rangeAttr)
+        self.transparencyOffset = mc.getAttr(self.ghostGrp + "." + self.offsetAttr)
+        self.evaluateInGraph = mc.getAttr(self.ghostGrp + "." + self.evaluateInGraphAttr)
+        self.useGhostCache = mc.getAttr(self.ghostGrp + "." + self.useGhostCacheAttr)
+        self.RebuildGhostRegistry()
+
+    def RebuildGhostRegistry(self):
+        # the only place that scans the scene for ghosts, everything else reads the registry
+        self.registryDirty = False
+        self.ghostEntries.clear()
+        self.ghostsByFrame.clear()
+        self.sortedFrames = []
+        self.ghostMeshes.clear()
+        self.topologyCounts.clear() # an undo can change the topology of a source
+        self.basePoints.clear()
+        self.materialPool.clear()
+        for sg in mc.ls(self.materialPoolPrefix + "*_sg", type = "shadingEngine") or []: # buckets saved with the scene
+            key = sg[:-len("_sg")]
+            self.materialPool[key] = MaterialBucket(key)
+
+        ghosts = (mc.listRelatives(self.ghostGrp, c = True) or []) if mc.objExists(self.ghostGrp) else [] # undo can take the group
+        for ghost in ghosts:
+            if mc.attributeQuery(self.ghostSlotsAttr, node = ghost, exists = True):
+                slots = [slot for slot in (mc.getAttr(ghost + "." + self.ghostSlotsAttr) or "").split(",") if slot]
+                base = ghost.rpartition(self.ghostMeshSuffix)[0]
+                ghostMesh = GhostMesh(ghost, base, mc.polyEvaluate(ghost, f = True) // max(len(slots), 1))
+                ghostMesh.ghosts = slots
+                self.ghostMeshes[ghost] = ghostMesh
+
+        for ghost in ghosts:
+            if not mc.attributeQuery(self.frameAttr, node = ghost, exists = True):
+                continue
+            frame = int(mc.getAttr(ghost + "." + self.frameAttr))
+            ghostMesh = ""
+            if mc.attributeQuery(self.ghostMeshAttr, node = ghost, exists = True):
+                ghostMesh = mc.getAttr(ghost + "." + self.ghostMeshAttr)
+                if ghostMesh not in self.ghostMeshes or ghost not in self.ghostMeshes[ghostMesh].ghosts:
+                    continue # its faces went with the mesh
+            self.RegisterGhost(ghost, frame, ghostMesh)
+
+        self.UpdateGhostTransparency() # puts every ghost in its bucket and drops the buckets nobody uses
+
+    def ResyncGhostRegistry(self):
+        # after an outside delete, also drops the faces of deleted shared topology ghosts from their meshes
+        self.RebuildGhostRegistry()
+        for ghostMesh in list(self.ghostMeshes.values()):
+            deletedGhosts = [ghost for ghost in ghostMesh.ghosts if not mc.objExists(ghost)]
+            if deletedGhosts:
+                self.CleanupGhostBase(self.RemoveFromGhostMesh(ghostMesh.name, deletedGhosts))
+
+    def RegisterGhost(self, ghost, frame, ghostMesh = ""):
+        entry = GhostEntry(ghost, frame)
+        entry.ghostMesh = ghostMesh
+        self.ghostEntries[ghost] = entry
+        if frame not in self.ghostsByFrame:
+            self.ghostsByFrame[frame] = []
+            bisect.insort(self.sortedFrames, frame) # keeps the frames in ascending order
+        self.ghostsByFrame[frame].append(entry)
+        return entry
+
+    def UnregisterGhost(self, ghost):
+        entry = self.ghostEntries.pop(ghost, None)
+        if not entry:
             return
-        
-        mc.createNode("transform", n = self.ghostGrp)
-        mc.addAttr(self.ghostGrp, ln = self.srcAttr, dt="string")
+
+        self.ReleaseMaterialBucket(entry.bucket)
+
+        frameEntries = self.ghostsByFrame[entry.frame]
+        frameEntries.remove(entry)
+        if not frameEntries: # no more ghost on this frame
+            del self.ghostsByFrame[entry.frame]
+            self.sortedFrames.pop(bisect.bisect_left(self.sortedFrames, entry.frame))
 
  
     def SetSelectedAsSrcMesh(self):
         selection = mc.ls(sl=True)
         self.srcMeshes.clear() #removes all elements in the set
+        self.topologyCounts.clear()
         for selected in selection:
             shapes = mc.listRelatives(selected, s=True) # find all shapes of the selected object
+            if not shapes:
+                continue
             for s in shapes:
                 if mc.objectType(s) == "mesh": # the object is a mesh
                     self.srcMeshes.add(selected) # add the mesh to our set
@@ -86,106 +518,486 @@ class Ghost:
         mc.setAttr(self.ghostGrp + "." + self.srcAttr, ",".join(self.srcMeshes), type = "string")
 
     def AddGhost(self):
+        currentFrame = GetCurrentFrame()
         for srcMesh in self.srcMeshes:
-            currentFrame = GetCurrentFrame()
             ghostName = srcMesh + "_" + str(currentFrame)
             if mc.objExists(ghostName):
-                mc.delete(ghostName)
+                self.DeleteGhost(ghostName)
+
+            if self.UseSnapshotGhosts():
+                srcShape = GetMeshShape(srcMesh)
+                self.CreateSnapshotGhosts(srcMesh, [(ghostName, currentFrame, GetMeshPoints(srcShape), GetWorldMatrix(srcMesh))])
+            else:
+                mc.duplicate(srcMesh, n = ghostName)
+                mc.parent(ghostName, self.ghostGrp)
+                self.SetupGhost(ghostName, currentFrame)
+
+        self.UpdateGhostTransparency()
+
+    def SetupGhost(self, ghostName, frame, ghostMesh = ""):
+        mc.addAttr(ghostName, ln = self.frameAttr, dv = frame)
+        self.RegisterGhost(ghostName, frame, ghostMesh) # the material comes from the pool on the next UpdateGhostTransparency
+
+    def UseSnapshotGhosts(self):
+        return self.shareTopology or self.proxyReduction > 0 # proxies are always built on a shared base
+
+    def CreateSnapshotGhosts(self, srcMesh, snapshots):
+        # Light ghosts: every snapshot of a source is a block of faces in a ghost mesh, so the scene holds a few
+        # meshes per source however many ghosts there are. A ghost itself is an empty transform that keeps its frame
+        # and world matrix. The snapshots are added to the source's last ghost mesh while it has fewer than
+        # ghostsPerGhostMesh ghosts, so an add only copies that many ghosts' points and not every ghost of the source.
+        # snapshots: list of (ghost name, frame, points, world matrix).
+        if snapshots and len(snapshots[0][2]) != self.GetSourceTopologyCounts(srcMesh)[0]:
+            self.topologyCounts.pop(srcMesh) # the source changed topology since it was counted
+        if self.proxyReduction > 0:
+            base, vertexMap = self.GetOrCreateProxyBase(srcMesh)
+        else:
+            base, vertexMap = self.GetOrCreateGhostBase(srcMesh), None
+        if base not in self.basePoints:
+            self.basePoints[base] = GetMeshPoints(GetMeshShape(base))
+        basePoints = self.basePoints[base]
+
+        pieces = []
+        for ghostName, frame, points, worldMatrix in snapshots:
+            if vertexMap:
+                points = [points[index] for index in vertexMap] # the proxy follows its source vertices
+            piece = mc.duplicate(base, n = ghostName + "_piece")[0]
+            SetPointTweaks(GetMeshShape(piece), points, basePoints)
+            mc.xform(piece, ws = True, m = worldMatrix)
+            pieces.append(piece)
+            mc.createNode("transform", n = ghostName, p = self.ghostGrp)
+            mc.xform(ghostName, ws = True, m = worldMatrix)
+            mc.addAttr(ghostName, ln = self.ghostMeshAttr, dt = "string")
+
+        ghostMesh = self.GetOpenGhostMesh(base)
+        if ghostMesh:
+            del self.ghostMeshes[ghostMesh.name] # out of the registry while it is replaced, see NodeRemovedEvent
+            pieces.insert(0, ghostMesh.name) # the old ghosts first, their faces keep their place and materials
+        else:
+            ghostMesh = GhostMesh(self.GetNewGhostMeshName(base), base, self.GetSourceTopologyCounts(base)[2])
+        ghostMeshName = ghostMesh.name
 
+        if len(pieces) > 1: # no history, the result is a plain mesh in world space
+            united = mc.polyUnite(pieces, ch = False, n = ghostMeshName + "_united")[0]
+            for piece in pieces:
+                if mc.objExists(piece): # the emptied transforms
+                    mc.delete(piece)
+            mc.rename(united, ghostMeshName)
+            mc.parent(ghostMeshName, self.ghostGrp)
+        else:
+            mc.rename(pieces[0], ghostMeshName)
+        mc.setAttr(ghostMeshName + ".visibility", True) # the pieces come from the hidden base
+        self.ghostMeshes[ghostMeshName] = ghostMesh
 
-            mc.duplicate(srcMesh, n = ghostName)
-            mc.parent(ghostName, self.ghostGrp)
-            mc.addAttr(ghostName, ln = self.frameAttr, dv = currentFrame)
+        for ghostName, frame, points, worldMatrix in snapshots:
+            ghostMesh.ghosts.append(ghostName)
+            mc.setAttr(ghostName + "." + self.ghostMeshAttr, ghostMeshName, type = "string")
+            self.SetupGhost(ghostName, frame, ghostMeshName)
+        self.WriteGhostSlots(ghostMesh)
 
+    def GetOpenGhostMesh(self, base):
+        # the ghost mesh of base that takes new ghosts, None when they start a new one
+        for ghostMesh in self.ghostMeshes.values():
+            if ghostMesh.base == base and len(ghostMesh.ghosts) < self.ghostsPerGhostMesh and mc.objExists(ghostMesh.name):
+                return ghostMesh
+        return None
 
-            matName = self.GetMaterialNameForGhost(ghostName) #figure out name of material
-            if not mc.objExists(matName): #check if mat not exist
-                mc.shadingNode("lambert", asShader = True, name = matName) # create lambert mat if not exist
+    def GetNewGhostMeshName(self, base):
+        ghostMeshName = base + self.ghostMeshSuffix
+        index = 1
+        while ghostMeshName in self.ghostMeshes or mc.objExists(ghostMeshName):
+            ghostMeshName = base + self.ghostMeshSuffix + str(index)
+            index += 1
+        return ghostMeshName
 
-            sgName = self.GetShadingEngineForGhost(ghostName) #figure name of shading engine
-            if not mc.objExists(sgName): #check if shading engine exists
-                mc.sets(name = sgName, renderable = True, empty = True) #create shading engine if not exists
+    def WriteGhostSlots(self, ghostMesh):
+        if not mc.attributeQuery(self.ghostSlotsAttr, node = ghostMesh.name, exists = True): # a new mesh after every unite
+            mc.addAttr(ghostMesh.name, ln = self.ghostSlotsAttr, dt = "string")
+        mc.setAttr(ghostMesh.name + "." + self.ghostSlotsAttr, ",".join(ghostMesh.ghosts), type = "string")
 
-            mc.connectAttr(matName + ".outColor", sgName + ".surfaceShader", force = True) # connect 
-            mc.sets(ghostName, edit=True, forceElement = sgName)    
+    def RemoveFromGhostMesh(self, ghostMeshName, ghosts):
+        # deletes the faces of the ghosts, returns the base of the mesh
+        ghostMesh = self.ghostMeshes.get(ghostMeshName)
+        if not ghostMesh:
+            return ghostMeshName.rpartition(self.ghostMeshSuffix)[0]
+        base = ghostMesh.base
+        faces = [ghostMesh.GetFaces(ghost) for ghost in ghosts if ghost in ghostMesh.ghosts]
+        ghostMesh.ghosts = [ghost for ghost in ghostMesh.ghosts if ghost not in ghosts]
+        if not mc.objExists(ghostMeshName):
+            del self.ghostMeshes[ghostMeshName]
+        elif not ghostMesh.ghosts:
+            del self.ghostMeshes[ghostMeshName] # before the delete, see NodeRemovedEvent
+            mc.delete(ghostMeshName)
+        elif faces:
+            mc.delete(faces) # the faces after them move up, their materials move with them
+            mc.delete(ghostMeshName, ch = True)
+            self.WriteGhostSlots(ghostMesh)
+        return base
 
-            mc.setAttr(matName + ".color", self.color[0], self.color[1], self.color[2], type = "double3")
+    def GetSourceTopologyCounts(self, mesh):
+        if mesh not in self.topologyCounts:
+            self.topologyCounts[mesh] = GetTopologyCounts(GetMeshShape(mesh))
+        return self.topologyCounts[mesh]
+
+    def GetSourceTopologyKey(self, srcMesh):
+        vertCount, edgeCount, faceCount = self.GetSourceTopologyCounts(srcMesh)
+        return f"{vertCount}v{edgeCount}e{faceCount}f"
+
+    def GetGhostBaseName(self, srcMesh):
+        return srcMesh + self.ghostBaseSuffix + "_" + self.GetSourceTopologyKey(srcMesh)
+
+    def GetOrCreateGhostBase(self, srcMesh):
+        baseName = self.GetGhostBaseName(srcMesh)
+        if not mc.objExists(baseName):
+            DuplicateWithoutHistory(srcMesh, baseName) # the base only has to hold the topology, no history needed
+            mc.parent(baseName, self.ghostGrp)
+            mc.setAttr(baseName + ".visibility", False)
+        return baseName
+
+    def GetProxyBaseName(self, srcMesh):
+        return srcMesh + self.ghostProxySuffix + str(self.proxyReduction) + "_" + self.GetSourceTopologyKey(srcMesh)
+
+    def GetOrCreateProxyBase(self, srcMesh):
+        # reduced once per source, topology and reduction, every ghost of the source reuses it
+        proxyName = self.GetProxyBaseName(srcMesh)
+        if proxyName in self.proxyVertexMaps and mc.objExists(proxyName):
+            return proxyName, self.proxyVertexMaps[proxyName]
+
+        if mc.objExists(proxyName): # made in an earlier session, the map is saved on it
+            vertexMap = mc.getAttr(proxyName + "." + self.proxyVertexMapAttr)
+        else:
+            DuplicateWithoutHistory(srcMesh, proxyName)
+            mc.polyReduce(proxyName, ver = 1, p = self.proxyReduction, kb = True)
+            mc.delete(proxyName, ch = True)
+            vertexMap = self.BuildProxyVertexMap(srcMesh, proxyName)
+            mc.addAttr(proxyName, ln = self.proxyVertexMapAttr, dt = "Int32Array")
+            mc.setAttr(proxyName + "." + self.proxyVertexMapAttr, vertexMap, type = "Int32Array")
+            mc.parent(proxyName, self.ghostGrp)
+            mc.setAttr(proxyName + ".visibility", False)
+
+        self.proxyVertexMaps[proxyName] = list(vertexMap)
+        return proxyName, self.proxyVertexMaps[proxyName]
+
+    def BuildProxyVertexMap(self, srcMesh, proxyName):
+        # the proxy was reduced from the source in its current pose, so every proxy vertex
+        # can follow the closest vertex of the closest source face
+        srcFn = om.MFnMesh(GetDagPath(GetMeshShape(srcMesh)))
+        proxyPoints = om.MFnMesh(GetDagPath(GetMeshShape(proxyName))).getPoints(om.MSpace.kObject)
+        vertexMap = []
+        for point in proxyPoints:
+            closestPoint, faceId = srcFn.getClosestPoint(point, om.MSpace.kObject)
+            faceVerts = srcFn.getPolygonVertices(faceId)
+            vertexMap.append(min(faceVerts, key = lambda vert: srcFn.getPoint(vert, om.MSpace.kObject).distanceTo(point)))
+        return vertexMap
+
+    def GetGhostBase(self, ghost):
+        # ghosts of older versions have their own shape on top of the base
+        ghostShape = GetMeshShape(ghost)
+        if not ghostShape:
+            return ""
+        sources = mc.listConnections(ghostShape + ".inMesh", s = True, d = False)
+        if not sources:
+            return "" # a duplicated ghost, it has no base
+        return sources[0]
+
+    def CleanupGhostBase(self, base):
+        if not base or not mc.objExists(base):
+            return
+        if any(ghostMesh.base == base for ghostMesh in self.ghostMeshes.values()) or mc.listConnections(GetMeshShape(base) + ".outMesh", s = False, d = True):
+            return # still used by other ghosts
+        mc.delete(base)
+        self.proxyVertexMaps.pop(base, None)
+        self.basePoints.pop(base, None)
+
+    def BakeRange(self, start, end, step = 1):
+        if step < 1 or end < start or not self.srcMeshes:
+            return
+
+        frames = list(range(start, end + 1, step))
+        srcMeshes = [(srcMesh, GetMeshShape(srcMesh)) for srcMesh in self.srcMeshes]
+
+        # evaluate every sample through a DG context, the time slider never moves
+        samples = []
+        for frame in frames:
+            timeContext = om.MDGContext(om.MTime(frame, om.MTime.uiUnit()))
+            with MDGContextGuard(timeContext):
+                for srcMesh, srcShape in srcMeshes:
+                    samples.append((srcMesh, frame, GetMeshPoints(srcShape), GetWorldMatrix(srcMesh)))
+
+        mc.undoInfo(openChunk = True, chunkName = "GhosterBakeRange") # one undo for the whole bake
+        mc.refresh(suspend = True) # no viewport redraw while the ghosts are created
+        try:
+            snapshots = {} # source -> its snapshots, each source's ghost mesh is edited once
+            for srcMesh, frame, points, worldMatrix in samples:
+                ghostName = srcMesh + "_" + str(frame)
+                if mc.objExists(ghostName):
+                    self.DeleteGhost(ghostName)
+
+                if self.UseSnapshotGhosts():
+                    snapshots.setdefault(srcMesh, []).append((ghostName, frame, points, worldMatrix))
+                else:
+                    self.CreateBakedDuplicateGhost(srcMesh, ghostName, points, worldMatrix)
+                    self.SetupGhost(ghostName, frame)
+
+            for srcMesh, sourceSnapshots in snapshots.items():
+                self.CreateSnapshotGhosts(srcMesh, sourceSnapshots)
+
+            self.UpdateGhostTransparency()
+        finally:
+            mc.refresh(suspend = False)
+            mc.undoInfo(closeChunk = True)
+
+    def CreateBakedDuplicateGhost(self, srcMesh, ghostName, points, worldMatrix):
+        # a full duplicate like AddGhost makes, but posed from points sampled at another time
+        DuplicateWithoutHistory(srcMesh, ghostName)
+        mc.parent(ghostName, self.ghostGrp)
+        ghostShape = GetMeshShape(ghostName)
+        SetPointTweaks(ghostShape, points, GetMeshPoints(ghostShape)) # not MFnMesh.setPoints, the bake has to undo as one
+        mc.xform(ghostName, ws = True, m = worldMatrix)
+
+    def SetUseGhostCache(self, useGhostCache):
+        self.useGhostCache = useGhostCache
+        mc.setAttr(self.ghostGrp + "." + self.useGhostCacheAttr, useGhostCache)
+
+    def BeforeSceneSaved(self, *args):
+        if not self.useGhostCache:
+            return
+        mc.undoInfo(stateWithoutFlush = False) # unloading for the save is not an edit to undo
+        try:
+            if self.SaveGhostCache():
+                self.UnloadGhostGeometry() # the scene file does not carry the ghosts, the cache does
+        finally:
+            mc.undoInfo(stateWithoutFlush = True)
+
+    def AfterSceneSaved(self, *args):
+        if not self.useGhostCache:
+            return
+        mc.undoInfo(stateWithoutFlush = False)
+        try:
+            self.RestoreVisibleCachedGhosts()
+            self.UpdateGhostTransparency()
+        finally:
+            mc.undoInfo(stateWithoutFlush = True)
+        mc.file(modified = False) # the ghosts are back as they were saved to the cache, the scene is still saved
+
+    def LoadGhostCache(self):
+        self.ghostCache.path = GetGhostCachePath()
+        self.pendingGhosts.clear()
+        self.pendingFrames = []
+        if not self.useGhostCache or not self.ghostCache.Load():
+            return
+
+        for srcMesh, frame in self.ghostCache.ghosts:
+            if (srcMesh + "_" + str(frame)) in self.ghostEntries: # already in the scene
+                continue
+            self.pendingGhosts.setdefault(frame, set()).add(srcMesh)
+        self.pendingFrames = sorted(self.pendingGhosts)
+        self.RestoreVisibleCachedGhosts()
+        self.UpdateGhostTransparency()
+
+    def SaveGhostCache(self):
+        self.ghostCache.path = GetGhostCachePath()
+        if not self.ghostCache.path:
+            return False
+
+        sources = {}
+        for srcMesh in self.srcMeshes | {srcMesh for srcMeshes in self.pendingGhosts.values() for srcMesh in srcMeshes}:
+            if not mc.objExists(srcMesh):
+                continue
+            topologyKey = self.GetSourceTopologyKey(srcMesh)
+            cachedSource = self.ghostCache.sources.get(srcMesh)
+            if cachedSource and cachedSource["topology"] == topologyKey:
+                restFloats = array("f", self.ghostCache.GetRestFloats(srcMesh)) # keep the rest the pending deltas use
+            else:
+                restFloats = PointsToFloats(GetRestPoints(srcMesh))
+            sources[srcMesh] = (topologyKey, restFloats)
+
+        ghosts = []
+        for frame, srcMeshes in self.pendingGhosts.items(): # not rebuilt yet, copy them over as they are
+            for srcMesh in srcMeshes:
+                if srcMesh in sources and srcMesh in self.ghostCache.sources:
+                    record = self.ghostCache.ghosts[(srcMesh, frame)]
+                    ghosts.append((srcMesh, frame, record["matrix"], array("f", self.ghostCache.GetDeltaFloats(srcMesh, frame))))
+
+        meshPoints = {} # ghost mesh -> its points, read once for all its ghosts
+        for entry in self.ghostEntries.values():
+            srcMesh = entry.ghost[:-len("_" + str(entry.frame))]
+            if srcMesh not in sources:
+                continue
+            restFloats = sources[srcMesh][1]
+            pointFloats = PointsToFloats(self.GetGhostPoints(entry, meshPoints))
+            if len(pointFloats) != len(restFloats): # the source changed topology since this ghost was made
+                continue
+            deltaFloats = array("f", [pointFloats[i] - restFloats[i] for i in range(len(pointFloats))])
+            ghosts.append((srcMesh, entry.frame, GetWorldMatrix(entry.ghost), deltaFloats))
+
+        return self.ghostCache.Write(sources, ghosts)
+
+    def GetGhostPoints(self, entry, meshPoints):
+        # object space points of a ghost, a shared topology ghost reads its block of its ghost mesh
+        if not entry.ghostMesh:
+            return GetMeshPoints(GetMeshShape(entry.ghost))
+        ghostMesh = self.ghostMeshes[entry.ghostMesh]
+        if ghostMesh.name not in meshPoints:
+            meshPoints[ghostMesh.name] = GetMeshPoints(GetMeshShape(ghostMesh.name))
+        points = meshPoints[ghostMesh.name]
+        vertexCount = len(points) // len(ghostMesh.ghosts)
+        start = ghostMesh.ghosts.index(entry.ghost) * vertexCount
+        toGhostSpace = om.MMatrix(GetWorldMatrix(ghostMesh.name)) * om.MMatrix(GetWorldMatrix(entry.ghost)).inverse()
+        return om.MPointArray([points[index] * toGhostSpace for index in range(start, start + vertexCount)])
+
+    def UnloadGhostGeometry(self):
+        ghosts = [srcMesh + "_" + str(frame) for srcMesh, frame in self.ghostCache.ghosts]
+        self.DeleteGhosts([ghost for ghost in ghosts if ghost in self.ghostEntries]) # proxy ghosts can not be cached and stay in the scene
+
+        self.pendingGhosts.clear()
+        for srcMesh, frame in self.ghostCache.ghosts:
+            self.pendingGhosts.setdefault(frame, set()).add(srcMesh)
+        self.pendingFrames = sorted(self.pendingGhosts)
+
+    def RestoreVisibleCachedGhosts(self):
+        if not self.pendingFrames:
+            return
+        if self.evaluateInGraph or self.transparencyRange <= 0: # no python on time change, bring back all of them
+            self.RestoreCachedFrames(list(self.pendingFrames))
+            return
+
+        # only the ghosts that are not fully faded at the current frame are needed
+        currentFrame = GetCurrentFrame()
+        visibleDistance = self.transparencyRange * (1 - self.transparencyOffset)
+        start = bisect.bisect_left(self.pendingFrames, currentFrame - visibleDistance)
+        end = bisect.bisect_right(self.pendingFrames, currentFrame + visibleDistance)
+        self.RestoreCachedFrames(self.pendingFrames[start:end])
+
+    def RestoreCachedFrames(self, frames):
+        frames = [frame for frame in frames if frame in self.pendingGhosts]
+        if not frames:
+            return
+
+        snapshots = {} # source -> its cached snapshots, each source's ghost mesh is edited once
+        for frame in frames:
+            for srcMesh in self.pendingGhosts.pop(frame):
+                snapshot = self.GetCachedSnapshot(srcMesh, frame)
+                if snapshot:
+                    snapshots.setdefault(srcMesh, []).append(snapshot)
+            self.pendingFrames.pop(bisect.bisect_left(self.pendingFrames, frame))
+
+        for srcMesh, sourceSnapshots in snapshots.items():
+            self.CreateSnapshotGhosts(srcMesh, sourceSnapshots)
+
+    def GetCachedSnapshot(self, srcMesh, frame):
+        source = self.ghostCache.sources.get(srcMesh)
+        if not source or not mc.objExists(srcMesh) or source["topology"] != self.GetSourceTopologyKey(srcMesh):
+            return None # the source is gone or its topology changed, the cached points do not fit anymore
+
+        ghostName = srcMesh + "_" + str(frame)
+        if mc.objExists(ghostName):
+            return None
+
+        restFloats = self.ghostCache.GetRestFloats(srcMesh)
+        deltaFloats = self.ghostCache.GetDeltaFloats(srcMesh, frame)
+        pointFloats = [restFloats[i] + deltaFloats[i] for i in range(len(restFloats))]
+        worldMatrix = self.ghostCache.ghosts[(srcMesh, frame)]["matrix"]
+        return ghostName, frame, FloatsToPoints(pointFloats), worldMatrix
+
+    def DropCachedFrames(self, frames):
+        for frame in frames:
+            if self.pendingGhosts.pop(frame, None) is not None:
+                self.pendingFrames.pop(bisect.bisect_left(self.pendingFrames, frame))
 
     def GetShadingEngineForGhost (self,ghost):
-        return ghost + "_sg"
+        return ghost + "_sg" # per ghost shading engine from before the material pool
 
     def GetMaterialNameForGhost(self, ghost):
-        return ghost + "_mat"                           
+        return ghost + "_mat" # per ghost material from before the material pool
 
     def GoToNextGhost(self):
-        frames = self.GetGhostFramesSorted() # find all the frames we have in ascending order
-        if not frames: # if there is not frames/Ghost, do nothing
+        if not self.sortedFrames and not self.pendingFrames: # if there is not frames/Ghost, do nothing
             return
         currentFrame = GetCurrentFrame()
-        for frame in frames: #go through each frame
-            if frame > currentFrame: # if we find one that is bigger than the current frame, it should be where we can move time slider to
-                mc.currentTime(frame, e = True) # e means 'edit', we are editing the time slider to be at frame
-                return
-            
-        mc.currentTime(frames[0], e=True)
+        nextFrames = [] # the next frame in the scene and the next frame still in the cache
+        firstFrames = [] # used to wrap around to the first ghost
+        for frames in (self.sortedFrames, self.pendingFrames):
+            if not frames:
+                continue
+            index = bisect.bisect_right(frames, currentFrame) # first frame bigger than the current frame
+            if index < len(frames):
+                nextFrames.append(frames[index])
+            firstFrames.append(frames[0])
 
-    def GoToPrevGhost(self):
-        frames = self.GetGhostFramesSorted()
-        frames.reverse() #sorts frames list in descending order
+        self.GoToGhostFrame(min(nextFrames) if nextFrames else min(firstFrames))
 
-        if not frames:
+    def GoToPrevGhost(self):
+        if not self.sortedFrames and not self.pendingFrames:
             return
         currentFrame = GetCurrentFrame()
-        for frame in frames:
-            if frame < currentFrame:
-                mc.currentTime(frame, e = True)
-                return
+        prevFrames = []
+        lastFrames = [] # used to wrap around to the last ghost
+        for frames in (self.sortedFrames, self.pendingFrames):
+            if not frames:
+                continue
+            index = bisect.bisect_left(frames, currentFrame) - 1 # last frame smaller than the current frame
+            if index >= 0:
+                prevFrames.append(frames[index])
+            lastFrames.append(frames[-1])
+
+        self.GoToGhostFrame(max(prevFrames) if prevFrames else max(lastFrames))
 
-            
-        mc.currentTime(frames[0], e=True)
+    def GoToGhostFrame(self, frame):
+        self.RestoreCachedFrames([frame]) # a cached ghost is rebuilt when it is navigated to
+        mc.currentTime(frame, e = True) # e means 'edit', we are editing the time slider to be at frame
+        if self.evaluateInGraph:
+            self.UpdateGhostTransparency() # no time changed job in this mode to pick up the restored ghosts
 
     def DeleteGhostOnCurFrame(self):
         currentFrame = GetCurrentFrame()
-        ghosts = mc.listRelatives(self.ghostGrp, c=True) #Gets all children of the ghost grp
-        for ghost in ghosts:
-            ghostFrame = mc.getAttr(ghost + "." + self.frameAttr) #ask for the frame recrorded for ghost
-            if ghostFrame == currentFrame: # if the ghost frame is same as current frame
-                self.DeleteGhost(ghost) # remove the ghost
+        self.DropCachedFrames([currentFrame])
+        frameEntries = self.ghostsByFrame.get(currentFrame)
+        if not frameEntries:
+            return
+        self.DeleteGhosts([entry.ghost for entry in frameEntries]) # remove the ghosts
 
     def DeleteAllGhost(self):
-        ghosts = mc.listRelatives(self.ghostGrp, c = True)
-        for ghost in ghosts:
-            self.DeleteGhost(ghost)
-
+        self.DropCachedFrames(list(self.pendingFrames))
+        self.DeleteGhosts(list(self.ghostEntries))
 
     def DeleteGhost(self, ghost):
-        #Delete Mat
-        mat = self.GetMaterialNameForGhost(ghost)
-        if mc.objExists(mat):
-            mc.delete(mat)
-        #Delete Shading
-        sg= self.GetShadingEngineForGhost(ghost)
-        if mc.objExists(sg):
-            mc.delete(sg)
-        #Delete Ghost Model
-        if mc.objExists(ghost):
-            mc.delete(ghost)
+        self.DeleteGhosts([ghost])
+
+    def DeleteGhosts(self, ghosts):
+        bases = set()
+        ghostMeshes = {} # ghost mesh -> its ghosts to delete, its faces are deleted in one go
+        for ghost in ghosts:
+            entry = self.ghostEntries.get(ghost)
+            self.UnregisterGhost(ghost)
+            if entry and entry.ghostMesh:
+                ghostMeshes.setdefault(entry.ghostMesh, []).append(ghost)
+            elif mc.objExists(ghost):
+                bases.add(self.GetGhostBase(ghost))
+            #Delete Mat left from older scenes
+            mat = self.GetMaterialNameForGhost(ghost)
+            if mc.objExists(mat):
+                mc.delete(mat)
+            #Delete Shading
+            sg= self.GetShadingEngineForGhost(ghost)
+            if mc.objExists(sg):
+                mc.delete(sg)
+            #Delete Ghost Model
+            if mc.objExists(ghost):
+                mc.delete(ghost)
+        self.CleanupMaterialPool()
+
+        for ghostMesh, meshGhosts in ghostMeshes.items():
+            bases.add(self.RemoveFromGhostMesh(ghostMesh, meshGhosts))
+        #Delete the shared base once no ghost uses it
+        for base in bases:
+            self.CleanupGhostBase(base)
 
 
 
         
     def GetGhostFramesSorted(self):
-        frames = set()
-        ghosts = mc.listRelatives(self.ghostGrp, c=True)
-
-        for ghost in ghosts:
-            frame = mc.getAttr(ghost + "." + self.frameAttr)
-            print(f"Frame is: {frame}")
-            frames.add(frame)
-
-        frames = list(frames) # this converts frames to a list
-        frames.sort() # sorts frames list to ascending order
-        return frames #returns sorted frames
+        return sorted(set(self.sortedFrames) | set(self.pendingFrames)) # a copy, so callers can not mess up the registry
 
 class ColorPicker(QWidget):
     onColorChanged = Signal(QColor) #This adds a built in class member called onColorChanged
@@ -225,6 +1037,29 @@ class GhostWidget(QWidget):
         addSrcMeshBtn.clicked.connect(self.AddSrcMeshBtnClicked)
         self.masterlayout.addWidget(addSrcMeshBtn)
 
+        self.evaluateInGraphBox = QCheckBox("Fade in Dependency Graph (no python on playback)")
+        self.evaluateInGraphBox.setChecked(self.ghost.evaluateInGraph)
+        self.evaluateInGraphBox.toggled.connect(self.ghost.SetEvaluateInGraph)
+        self.masterlayout.addWidget(self.evaluateInGraphBox)
+
+        self.proxyLayout = QHBoxLayout()
+        self.masterlayout.addLayout(self.proxyLayout)
+        self.proxyLayout.addWidget(QLabel("Proxy Reduction %: "))
+        self.proxyReductionLineEdit = QLineEdit(str(self.ghost.proxyReduction))
+        self.proxyReductionLineEdit.setValidator(QIntValidator(0, 95)) # 0 keeps the ghosts at full resolution
+        self.proxyReductionLineEdit.textChanged.connect(self.ProxyReductionChanged)
+        self.proxyLayout.addWidget(self.proxyReductionLineEdit)
+
+        self.useGhostCacheBox = QCheckBox("Save Ghosts to Cache File (not in the scene)")
+        self.useGhostCacheBox.setChecked(self.ghost.useGhostCache)
+        self.useGhostCacheBox.toggled.connect(self.ghost.SetUseGhostCache)
+        self.masterlayout.addWidget(self.useGhostCacheBox)
+
+        self.shareTopologyBox = QCheckBox("Share Topology (store points only)")
+        self.shareTopologyBox.setChecked(self.ghost.shareTopology)
+        self.shareTopologyBox.toggled.connect(self.ShareTopologyToggled)
+        self.masterlayout.addWidget(self.shareTopologyBox)
+
         self.ctrlLayout = QHBoxLayout()
         self.masterlayout.addLayout(self.ctrlLayout)
 
@@ -240,6 +1075,28 @@ class GhostWidget(QWidget):
         nextGhostBtn.clicked.connect(self.ghost.GoToNextGhost)
         self.ctrlLayout.addWidget(nextGhostBtn)
 
+        self.bakeLayout = QHBoxLayout()
+        self.masterlayout.addLayout(self.bakeLayout)
+
+        self.bakeLayout.addWidget(QLabel("Start: "))
+        self.bakeStartLineEdit = QLineEdit(str(int(mc.playbackOptions(q=True, min = True))))
+        self.bakeStartLineEdit.setValidator(QIntValidator())
+        self.bakeLayout.addWidget(self.bakeStartLineEdit)
+
+        self.bakeLayout.addWidget(QLabel("End: "))
+        self.bakeEndLineEdit = QLineEdit(str(int(mc.playbackOptions(q=True, max = True))))
+        self.bakeEndLineEdit.setValidator(QIntValidator())
+        self.bakeLayout.addWidget(self.bakeEndLineEdit)
+
+        self.bakeLayout.addWidget(QLabel("Step: "))
+        self.bakeStepLineEdit = QLineEdit("1")
+        self.bakeStepLineEdit.setValidator(QIntValidator(1, 1000))
+        self.bakeLayout.addWidget(self.bakeStepLineEdit)
+
+        bakeRangeBtn = QPushButton("Bake Range")
+        bakeRangeBtn.clicked.connect(self.BakeRangeBtnClicked)
+        self.bakeLayout.addWidget(bakeRangeBtn)
+
         self.ctrlLayout = QHBoxLayout()
         self.masterlayout.addLayout(self.ctrlLayout)
         
@@ -271,6 +1128,25 @@ class GhostWidget(QWidget):
         self.transparencyOffset.setMaximum(100)
         self.masterlayout.addWidget(self.transparencyOffset)
 
+    def closeEvent(self, event):
+        self.ghost.Close()
+        super().closeEvent(event)
+
+    def BakeRangeBtnClicked(self):
+        if not (self.bakeStartLineEdit.text() and self.bakeEndLineEdit.text() and self.bakeStepLineEdit.text()):
+            return
+        start = int(self.bakeStartLineEdit.text())
+        end = int(self.bakeEndLineEdit.text())
+        step = int(self.bakeStepLineEdit.text())
+        self.ghost.BakeRange(start, end, step)
+
+    def ProxyReductionChanged(self):
+        if self.proxyReductionLineEdit.text():
+            self.ghost.proxyReduction = int(self.proxyReductionLineEdit.text())
+
+    def ShareTopologyToggled(self, checked):
+        self.ghost.shareTopology = checked
+
     def TransparencyValueChanged(self, value):
         self.ghost.UpdateTransparencyRange(value)
 
@@ -285,5 +1161,6 @@ class GhostWidget(QWidget):
         self.srcMeshList.addItems(self.ghost.srcMeshes) # this adds the srcMeshes collected earlier to the list widget
 
 
-ghostWidget = GhostWidget()
-ghostWidget.show()
\ No newline at end of file
+if __name__ == "__main__": # only when run from the shelf, so the benchmark can import the ghost logic
+    ghostWidget = GhostWidget()
+    ghostWidget.show()
\ No newline at end of file
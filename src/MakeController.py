@@ -1,20 +1,34 @@
 #Press Alt+Shift+M
+import json
 import maya.cmds as mc
+import maya.api.OpenMaya as om
+from array import array
 
-from PySide2.QtWidgets import QWidget,QLabel, QVBoxLayout, QPushButton
+from PySide2.QtWidgets import QWidget,QLabel, QVBoxLayout, QPushButton, QLineEdit, QMessageBox, QCheckBox
+from PySide2.QtGui import QDoubleValidator
+from ControllerShapes import CreateControllerCurve
+
+LIMB_ROOT_KEYWORDS = ("upperarm", "thigh", "upleg") # lower case name parts of the joints that start an arm or a leg
+FK_CTRL_SIZE = 20
+IK_CTRL_SIZE = 10
+RIG_PLAN_NODE = "limbRigPlan" # network node holding the build plan as json, so a rebuild only touches what changed
+RIG_PLAN_REST_TOLERANCE = 1e-4
+REST_ATTRS = ("translate", "jointOrient", "bindPose") # what a joint rests at, the rig drives only rotate
+SHARE_CONTROLLER_SHAPES = False # True makes controllers of the same shape and size instance one shape node
 
 def CreateBox(name, size):
-    pntPositions = ((-0.5,0.5,0.5), (0.5,0.5,0.5), (0.5,0.5,-0.5), (-0.5, 0.5, -0.5), (-0.5, 0.5, 0.5), (-0.5, -0.5, 0.5), (0.5, -0.5, 0.5), (0.5, 0.5, 0.5), (0.5, -0.5, 0.5), (0.5, -0.5, -0.5), (0.5, 0.5, -0.5), (0.5, -0.5, -0.5), (-0.5, -0.5, -0.5), (-0.5, 0.5, -0.5), (-0.5, -0.5, -0.5), (-0.5, -0.5, 0.5))
-    mc.curve(n = name, d=1, p = pntPositions)
-    mc.setAttr(name + ".scale", size, size, size, type = "float3")
-    mc.makeIdentity(name, a = True) #Freeze Transformation
+    CreateControllerCurve(name, "box", size, SHARE_CONTROLLER_SHAPES)
 
-def CreateCircleController(jnt, size):
+def CreateCircleController(jnt, size, worldMatrix = None):
+    # worldMatrix is the joint's, when it was already queried with the others
     name = "ac_" + jnt
-    mc.circle(n = name, nr=(1,0,0), r = size/2)
+    CreateControllerCurve(name, "circle", size, SHARE_CONTROLLER_SHAPES)
     ctrlGrpName = name +"_GRP"
     mc.group(name, n=ctrlGrpName)
-    mc.matchTransform(ctrlGrpName, jnt)
+    if worldMatrix:
+        mc.xform(ctrlGrpName, ws = True, m = worldMatrix)
+    else:
+        mc.matchTransform(ctrlGrpName, jnt)
     mc.orientConstraint(name, jnt)
 
     return name, ctrlGrpName
@@ -26,6 +40,93 @@ def GetObjPos(obj):
 def SetObjPos(obj, pos):
     mc.setAttr(obj + ".translate", pos.x, pos.y, pos.z, type = "float3")
 
+def GetWorldMatrices(objs):
+    # the world matrices of all objs in one pass over a selection list, 16 values per obj
+    selectionList = om.MSelectionList()
+    for obj in objs:
+        selectionList.add(obj)
+    matrices = array("d")
+    for i in range(selectionList.length()):
+        matrix = selectionList.getDagPath(i).inclusiveMatrix()
+        matrices.extend(matrix[j] for j in range(16))
+    return matrices
+
+def GetRestData(jnts):
+    # joint -> its local translate, jointOrient and bindPose in one flat list, posing the rig leaves them alone
+    return {jnt: [value for attr in REST_ATTRS for value in AsFlatList(mc.getAttr(jnt + "." + attr))] for jnt in jnts}
+
+def GetAncestorJoints(roots):
+    # the joints above every root as long names, top first: moving one of them at rest moves the limb as well
+    ancestorPaths = []
+    for root in roots:
+        parts = mc.ls(root, long = True)[0].split("|")[1:-1]
+        ancestorPaths.append(["|" + "|".join(parts[:i + 1]) for i in range(len(parts))])
+    allPaths = [path for paths in ancestorPaths for path in paths]
+    jointPaths = set(mc.ls(allPaths, type = "joint", long = True) or []) if allPaths else set()
+    return [[path for path in paths if path in jointPaths] for paths in ancestorPaths]
+
+def AsFlatList(value):
+    # getAttr gives vectors as a list of one tuple and matrices as a list
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [item for element in value for item in AsFlatList(element)]
+    return [value]
+
+def ResetToRest(jnts):
+    # the constraints are gone, the joints go back to their jointOrient so the controllers are placed at rest
+    for jnt in jnts:
+        mc.setAttr(jnt + ".rotate", 0, 0, 0, type = "double3")
+
+def GetLimbChain(rootJnt):
+    # the root, its first child joint and that one's first child joint, or None if the chain is shorter
+    mid = mc.listRelatives(rootJnt, c=True, type="joint")
+    end = mc.listRelatives(mid[0], c=True, type="joint") if mid else None
+    if not end:
+        return None
+    return rootJnt, mid[0], end[0]
+
+def FindLimbChains(skeletonRoot, chainRoots = ()):
+    # arms and legs found by name under skeletonRoot, then the chains starting at chainRoots
+    jnts = mc.listRelatives(skeletonRoot, ad=True, type="joint") or []
+    limbRoots = [jnt for jnt in reversed(jnts) if any(keyword in jnt.lower() for keyword in LIMB_ROOT_KEYWORDS)]
+    chains = []
+    for limbRoot in limbRoots + [chainRoot for chainRoot in chainRoots if chainRoot not in limbRoots]:
+        chain = GetLimbChain(limbRoot)
+        if chain:
+            chains.append(chain)
+    return chains
+
+def ComputePoleVectorPositions(matrices, limbCount):
+    # matrices holds root, mid and end of every limb (see GetWorldMatrices), returns x, y, z per limb.
+    # The pole vector points from the root to end line towards mid, half the limb's reach out from its middle.
+    # Works a column at a time over all limbs (every root x, then every root y, ...) read as strided slices
+    # of the flat array, so each step is one comprehension instead of a python loop body per limb.
+    matrices = matrices[:limbCount * 48]
+    rootX, rootY, rootZ = (matrices[12 + i::48] for i in range(3))
+    midX, midY, midZ = (matrices[28 + i::48] for i in range(3))
+    endX, endY, endZ = (matrices[44 + i::48] for i in range(3))
+
+    toEndX, toEndY, toEndZ = ([e - r for e, r in zip(end, root)] for end, root in ((endX, rootX), (endY, rootY), (endZ, rootZ)))
+    toMidX, toMidY, toMidZ = ([m - r for m, r in zip(mid, root)] for mid, root in ((midX, rootX), (midY, rootY), (midZ, rootZ)))
+    lengthSq = [x * x + y * y + z * z or 1.0 for x, y, z in zip(toEndX, toEndY, toEndZ)]
+    along = [(ex * mx + ey * my + ez * mz) / l for ex, ey, ez, mx, my, mz, l in zip(toEndX, toEndY, toEndZ, toMidX, toMidY, toMidZ, lengthSq)]
+    bendX, bendY, bendZ = ([m - e * a for m, e, a in zip(toMid, toEnd, along)] for toMid, toEnd in ((toMidX, toEndX), (toMidY, toEndY), (toMidZ, toEndZ)))
+    bendLength = [(x * x + y * y + z * z) ** 0.5 for x, y, z in zip(bendX, bendY, bendZ)]
+
+    for limb in [limb for limb, length in enumerate(bendLength) if length < 1e-6]:
+        # a straight limb does not say where it bends: knees go forward, elbows back
+        axisZ = 1.0 if toEndY[limb] < -abs(toEndX[limb]) else -1.0
+        along = toEndZ[limb] * axisZ / lengthSq[limb]
+        bendX[limb], bendY[limb], bendZ[limb] = -toEndX[limb] * along, -toEndY[limb] * along, axisZ - toEndZ[limb] * along
+        bendLength[limb] = (bendX[limb] ** 2 + bendY[limb] ** 2 + bendZ[limb] ** 2) ** 0.5 or 1.0
+
+    scale = [l ** 0.5 / 2 / b for l, b in zip(lengthSq, bendLength)] # half the reach over the bend's length
+    positions = array("d", [0.0]) * (limbCount * 3)
+    for i, (root, toEnd, bend) in enumerate(((rootX, toEndX, bendX), (rootY, toEndY, bendY), (rootZ, toEndZ, bendZ))):
+        positions[i::3] = array("d", [r + e / 2 + b * s for r, e, b, s in zip(root, toEnd, bend, scale)])
+    return positions
+
 class Vector:
     def __init__(self, x, y, z):
         self.x = x
@@ -39,10 +140,10 @@ class Vector:
         return Vector(self.x - other.x, self.y - other.y, self.z - other.z)
 
     def __mul__(self, scalar):
-        return Vector (self.x * scalar.x, self.y * scalar.y, self.z * scalar.z)
+        return Vector (self.x * scalar, self.y * scalar, self.z * scalar)
 
     def __truediv__(self, scalar):
-        return Vector (self.x / scalar.x, self.y / scalar.y, self.z / scalar.z)
+        return Vector (self.x / scalar, self.y / scalar, self.z / scalar)
     
     def GetLength(self):
         return (self.x ** 2 + self.y ** 2 + self.z ** 2) ** 0.5
@@ -67,42 +168,156 @@ class CreateLimbControl:
         self.mid = mc.listRelatives(self.root, c=True, type="joint") [0]
         self.end = mc.listRelatives(self.mid, c=True, type="joint")[0]
 
-    def RigLimb(self):
-        rootCtrl, rootCtrlGrp = CreateCircleController(self.root, 20)
-        midCtrl, midCtrlGrp = CreateCircleController(self.mid, 20)
-        endCtrl, endCtrlGrp = CreateCircleController(self.end, 20)
-
-        mc.parent(midCtrlGrp, rootCtrl)
-        mc.parent(endCtrlGrp, midCtrl)
-
-        ikEndCtrl = "ac_ik_" + self.end
-        CreateBox(ikEndCtrl, 10)
-        ikEndCtrlGrp = ikEndCtrl + "_GRP"
-        mc.group(ikEndCtrl, n = ikEndCtrlGrp)
-        mc.matchTransform(ikEndCtrlGrp, self.end)
-        mc.orientConstraint(ikEndCtrl, self.end)
-
-        ikHandleName = "ikHandle_" + self.end
-        mc.ikHandle(n=ikHandleName, sj = self.root, ee = self.end, sol="ikRPSolver")
-
-        poleVector = mc.getAttr(ikHandleName +" .poleVector")[0]
-        poleVector = Vector(poleVector[0], poleVector[1], poleVector[2])
-        poleVector = poleVector.GetNormalized()
-
-        rootPos = GetObjPos(self.root)
-        endPos = GetObjPos(self.end)
-
-        rootToEndVec = endPos - rootPos
-
-        armHalfLength = rootToEndVec.GetLength()/2
-        
-        poleVecPos = rootPos + rootToEndVec/2 + poleVector * armHalfLength
-        ikMidCtrl = "ac_ik_" + self.mid
-        mc.spaceLocator(n = ikMidCtrl)
-        ikMidCtrlGrp = ikMidCtrl + "_grp"
-        mc.group(ikMidCtrl, n=ikMidCtrlGrp)
-        SetObjPos(ikMidCtrlGrp, poleVecPos)
-        mc.poleVectorContstriant(ikMidCtrl, ikHandleName)
+    def RigLimb(self, ctrlSize = FK_CTRL_SIZE, ikCtrlSize = IK_CTRL_SIZE):
+        return RigLimbs([(self.root, self.mid, self.end)], ctrlSize, ikCtrlSize)
+
+def LoadRigPlan():
+    # {"limbs": {root joint: {"chain", "rest", "ctrlSize", "ikCtrlSize"}}}, what the rig was built from.
+    # "rest" is the rest data of the joints above the root, then of the chain (see GetRestData).
+    if not mc.objExists(RIG_PLAN_NODE):
+        return {"limbs": {}}
+    return json.loads(mc.getAttr(RIG_PLAN_NODE + ".plan") or '{"limbs": {}}')
+
+def SaveRigPlan(plan):
+    if not mc.objExists(RIG_PLAN_NODE):
+        mc.createNode("network", n = RIG_PLAN_NODE)
+        mc.addAttr(RIG_PLAN_NODE, ln = "plan", dt = "string")
+    mc.setAttr(RIG_PLAN_NODE + ".plan", json.dumps(plan), type = "string")
+
+def GetLimbNodeNames(chain):
+    root, mid, end = chain
+    return {
+        "rootCtrl": "ac_" + root, "rootCtrlGrp": "ac_" + root + "_GRP",
+        "midCtrl": "ac_" + mid, "midCtrlGrp": "ac_" + mid + "_GRP",
+        "endCtrl": "ac_" + end, "endCtrlGrp": "ac_" + end + "_GRP",
+        "ikEndCtrl": "ac_ik_" + end, "ikEndCtrlGrp": "ac_ik_" + end + "_GRP",
+        "ikHandle": "ikHandle_" + end,
+        "ikMidCtrl": "ac_ik_" + mid, "ikMidCtrlGrp": "ac_ik_" + mid + "_grp",
+    }
+
+def GetLimbChangeStatus(entry, chain, restData, ctrlSize, ikCtrlSize, missingNodes):
+    # what a limb needs: "built" (new), "rebuilt" (nodes gone or sizes changed), "moved" (rest changed) or "unchanged".
+    # A posed limb is unchanged, only an edit of the skeleton's rest moves it.
+    if not entry or entry["chain"] != list(chain):
+        return "built"
+    if missingNodes or entry["ctrlSize"] != ctrlSize or entry["ikCtrlSize"] != ikCtrlSize:
+        return "rebuilt"
+    builtRest = entry.get("rest", []) # plans saved before the rest data was kept are placed again once
+    if len(builtRest) != len(restData) or any(abs(a - b) > RIG_PLAN_REST_TOLERANCE for a, b in zip(builtRest, restData)):
+        return "moved"
+    return "unchanged"
+
+def RigLimbs(chains, ctrlSize = FK_CTRL_SIZE, ikCtrlSize = IK_CTRL_SIZE):
+    # Every (root, mid, end) chain in one undo chunk, the joint transforms are read once up front.
+    # Chains already in the rig plan are compared to it by their joints' rest data and only the ones that changed are touched.
+    # Returns the root joints by what happened to them.
+    plan = LoadRigPlan()
+    restJnts = [ancestors + list(chain) for chain, ancestors in zip(chains, GetAncestorJoints([chain[0] for chain in chains]))]
+    restByJnt = GetRestData(set(jnt for jnts in restJnts for jnt in jnts)) # ancestors shared by limbs are read once
+    restData = [[value for jnt in jnts for value in restByJnt[jnt]] for jnts in restJnts]
+    allNames = [name for chain in chains for name in GetLimbNodeNames(chain).values()]
+    existingNodes = set(mc.ls(allNames) or []) if allNames else set()
+
+    statuses = []
+    for index, chain in enumerate(chains):
+        missingNodes = [name for name in GetLimbNodeNames(chain).values() if name not in existingNodes]
+        statuses.append(GetLimbChangeStatus(plan["limbs"].get(chain[0]), chain, restData[index], ctrlSize, ikCtrlSize, missingNodes))
+
+    report = {"built": [], "rebuilt": [], "moved": [], "unchanged": []}
+    mc.undoInfo(openChunk = True, chunkName = "RigLimbs") # one undo for the whole skeleton
+    mc.refresh(suspend = True)
+    try:
+        # a rigged limb may be posed: its constraints go first and its joints back to rest before the matrices are read
+        for chain, status in zip(chains, statuses):
+            names = GetLimbNodeNames(chain)
+            if status in ("built", "rebuilt"):
+                leftNodes = [name for name in names.values() if name in existingNodes] # a built limb can have some from an older rig
+                TeardownLimb(chain, leftNodes)
+                if status == "rebuilt" or leftNodes:
+                    ResetToRest(chain)
+            elif status == "moved":
+                TeardownLimb(chain, [names["ikHandle"]])
+                ResetToRest(chain)
+        matrices = GetWorldMatrices([jnt for chain in chains for jnt in chain])
+        poleVecPositions = ComputePoleVectorPositions(matrices, len(chains))
+
+        for index, (chain, status) in enumerate(zip(chains, statuses)):
+            chainMatrices = [list(matrices[(index * 3 + i) * 16: (index * 3 + i + 1) * 16]) for i in range(3)]
+            poleVecPos = Vector(*poleVecPositions[index * 3: index * 3 + 3])
+            if status in ("built", "rebuilt"):
+                BuildLimb(chain, chainMatrices, poleVecPos, ctrlSize, ikCtrlSize)
+            elif status == "moved":
+                UpdateLimbPlacement(chain, chainMatrices, poleVecPos)
+            report[status].append(chain[0])
+            plan["limbs"][chain[0]] = {"chain": list(chain), "rest": restData[index], "ctrlSize": ctrlSize, "ikCtrlSize": ikCtrlSize}
+        SaveRigPlan(plan)
+    finally:
+        mc.refresh(suspend = False)
+        mc.undoInfo(closeChunk = True)
+    return report
+
+def RebuildRig(ctrlSize = None, ikCtrlSize = None):
+    # every limb in the rig plan against the skeleton as it is now, sizes default to what each limb was built with
+    chainsBySizes = {} # one RigLimbs call per size pair, so the plan is read and written once per pair
+    for entry in LoadRigPlan()["limbs"].values():
+        sizes = (ctrlSize or entry["ctrlSize"], ikCtrlSize or entry["ikCtrlSize"])
+        chainsBySizes.setdefault(sizes, []).append(tuple(entry["chain"]))
+    report = {"built": [], "rebuilt": [], "moved": [], "unchanged": []}
+    for sizes, chains in chainsBySizes.items():
+        for status, roots in RigLimbs(chains, *sizes).items():
+            report[status] += roots
+    return report
+
+def TeardownLimb(chain, existingNodes):
+    constraints = []
+    for jnt in chain:
+        constraints += mc.listRelatives(jnt, type = "orientConstraint") or []
+    if constraints or existingNodes:
+        mc.delete(constraints + existingNodes)
+
+def BuildLimb(chain, chainMatrices, poleVecPos, ctrlSize = FK_CTRL_SIZE, ikCtrlSize = IK_CTRL_SIZE):
+    root, mid, end = chain
+    names = GetLimbNodeNames(chain)
+    rootMatrix, midMatrix, endMatrix = chainMatrices
+    rootCtrl, rootCtrlGrp = CreateCircleController(root, ctrlSize, rootMatrix)
+    midCtrl, midCtrlGrp = CreateCircleController(mid, ctrlSize, midMatrix)
+    endCtrl, endCtrlGrp = CreateCircleController(end, ctrlSize, endMatrix)
+
+    mc.parent(midCtrlGrp, rootCtrl)
+    mc.parent(endCtrlGrp, midCtrl)
+
+    ikEndCtrl = names["ikEndCtrl"]
+    CreateBox(ikEndCtrl, ikCtrlSize)
+    ikEndCtrlGrp = names["ikEndCtrlGrp"]
+    mc.group(ikEndCtrl, n = ikEndCtrlGrp)
+    mc.xform(ikEndCtrlGrp, ws = True, m = endMatrix)
+    mc.orientConstraint(ikEndCtrl, end)
+
+    ikHandleName = names["ikHandle"]
+    mc.ikHandle(n=ikHandleName, sj = root, ee = end, sol="ikRPSolver")
+
+    ikMidCtrl = names["ikMidCtrl"]
+    mc.spaceLocator(n = ikMidCtrl)
+    ikMidCtrlGrp = names["ikMidCtrlGrp"]
+    mc.group(ikMidCtrl, n=ikMidCtrlGrp)
+    SetObjPos(ikMidCtrlGrp, poleVecPos)
+    mc.poleVectorConstraint(ikMidCtrl, ikHandleName)
+
+def UpdateLimbPlacement(chain, chainMatrices, poleVecPos):
+    # the rest moved: the controller groups follow it, the constraints and the ik handle are made again, everything else stays.
+    # The constraints and the ik handle were already torn down by RigLimbs, chainMatrices are the joints at rest.
+    root, mid, end = chain
+    names = GetLimbNodeNames(chain)
+
+    for groupName, matrix in zip((names["rootCtrlGrp"], names["midCtrlGrp"], names["endCtrlGrp"]), chainMatrices):
+        mc.xform(groupName, ws = True, m = matrix)
+    mc.xform(names["ikEndCtrlGrp"], ws = True, m = chainMatrices[2])
+    SetObjPos(names["ikMidCtrlGrp"], poleVecPos)
+
+    for ctrl, jnt in ((names["rootCtrl"], root), (names["midCtrl"], mid), (names["endCtrl"], end), (names["ikEndCtrl"], end)):
+        mc.orientConstraint(ctrl, jnt)
+    mc.ikHandle(n=names["ikHandle"], sj = root, ee = end, sol="ikRPSolver")
+    mc.poleVectorConstraint(names["ikMidCtrl"], names["ikHandle"])
 
 class CreateLimbControllerWidget(QWidget):
     def __init__(self):
@@ -128,17 +343,60 @@ class CreateLimbControllerWidget(QWidget):
         rigLimbBtn.clicked.connect(self.RigLimbBtnClicked)
         self.masterlayout.addWidget(rigLimbBtn)
 
+        self.masterlayout.addWidget(QLabel("Extra Chain Roots (comma separated): "))
+        self.chainRootsLineEdit = QLineEdit()
+        self.masterlayout.addWidget(self.chainRootsLineEdit)
+        rigAllLimbsBtn = QPushButton("Rig All Limbs Under Selected Root")
+        rigAllLimbsBtn.clicked.connect(self.RigAllLimbsBtnClicked)
+        self.masterlayout.addWidget(rigAllLimbsBtn)
+
+        self.masterlayout.addWidget(QLabel("FK Controller Size: "))
+        self.ctrlSizeLineEdit = QLineEdit(str(FK_CTRL_SIZE))
+        self.ctrlSizeLineEdit.setValidator(QDoubleValidator(0.001, 10000, 3))
+        self.masterlayout.addWidget(self.ctrlSizeLineEdit)
+        self.masterlayout.addWidget(QLabel("IK Controller Size: "))
+        self.ikCtrlSizeLineEdit = QLineEdit(str(IK_CTRL_SIZE))
+        self.ikCtrlSizeLineEdit.setValidator(QDoubleValidator(0.001, 10000, 3))
+        self.masterlayout.addWidget(self.ikCtrlSizeLineEdit)
+        self.applySizesBox = QCheckBox("Rebuild with these sizes (off keeps each limb's own)")
+        self.masterlayout.addWidget(self.applySizesBox)
+        rebuildRigBtn = QPushButton("Rebuild Rig (only what changed)")
+        rebuildRigBtn.clicked.connect(self.RebuildRigBtnClicked)
+        self.masterlayout.addWidget(rebuildRigBtn)
+
         self.createLimbCtrl = CreateLimbControl()
 
     def FindJntBtnClicked(self):
         self.createLimbCtrl.FindJntBasedOnRootSel()
         self.autoFindJntDisplay.setText(f"{self.createLimbCtrl.root},{self.createLimbCtrl.mid},{self.createLimbCtrl.end}")
 
+    def GetCtrlSizes(self):
+        ctrlSize = float(self.ctrlSizeLineEdit.text()) if self.ctrlSizeLineEdit.hasAcceptableInput() else FK_CTRL_SIZE
+        ikCtrlSize = float(self.ikCtrlSizeLineEdit.text()) if self.ikCtrlSizeLineEdit.hasAcceptableInput() else IK_CTRL_SIZE
+        return ctrlSize, ikCtrlSize
+
+    def ShowRigReport(self, report):
+        self.autoFindJntDisplay.setText("\n".join(f"{status}: {', '.join(roots)}" for status, roots in report.items() if roots))
+
     def RigLimbBtnClicked(self):
-        self.createLimbCtrl.RigLimb()
+        self.ShowRigReport(self.createLimbCtrl.RigLimb(*self.GetCtrlSizes()))
+
+    def RebuildRigBtnClicked(self):
+        sizes = self.GetCtrlSizes() if self.applySizesBox.isChecked() else (None, None) # None: the size each limb was built with
+        self.ShowRigReport(RebuildRig(*sizes))
+
+    def RigAllLimbsBtnClicked(self):
+        skeletonRoot = mc.ls(sl=True, type = "joint")
+        if not skeletonRoot:
+            QMessageBox().warning(self, "Warning", "Please select the root joint of the skeleton")
+            return
+        chainRoots = [name.strip() for name in self.chainRootsLineEdit.text().split(",") if name.strip()]
+        chains = FindLimbChains(skeletonRoot[0], chainRoots)
+        self.ShowRigReport(RigLimbs(chains, *self.GetCtrlSizes()))
 
 
 
 
-ControllerWidget = CreateLimbControllerWidget()
-ControllerWidget.show()
\ No newline at end of file
+if __name__ == "__main__": # only when run from the shelf, so the benchmark can import the rig logic
+    ControllerWidget = CreateLimbControllerWidget()
+    ControllerWidget.show()
\ No newline at end of file
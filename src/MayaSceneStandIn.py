@@ -0,0 +1,1039 @@
+# An in-memory maya scene behind maya.cmds and a bit of maya.api.OpenMaya, to run and measure the tools without maya:
+#   import MayaSceneStandIn
+#   MayaSceneStandIn.Install() # before the tools are imported, they bind maya.cmds at import
+#   import MakeController
+#   MayaSceneStandIn.scene.CreateJoint("upperarm_l", "root", (10, 0, 0))
+#   MakeController.RigLimbs(MakeController.FindLimbChains("root"))
+#   print(MayaSceneStandIn.scene.callCounts)
+# Only the commands and flags the tools use are here, anything else raises NotImplementedError so a benchmark
+# never measures a silent stub. Every maya.cmds call is counted in scene.callCounts.
+# Simplifications: node names are unique (a clash gets a number like maya does for new nodes), transforms are
+# one local matrix (translate reads and writes its last row, rotate and scale are plain attributes),
+# constraints and ik handles are connected but never solved.
+import os
+import sys
+import json
+import types
+import fnmatch
+from collections import Counter
+
+IDENTITY_MATRIX = (1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0)
+DAG_TYPES = {"transform", "joint", "mesh", "nurbsCurve", "locator", "ikHandle", "ikEffector", "orientConstraint", "poleVectorConstraint"}
+SHAPE_TYPES = {"mesh", "nurbsCurve", "locator"}
+INHERITED_TYPES = {"joint": "transform", "ikHandle": "transform", "ikEffector": "transform", "orientConstraint": "transform", "poleVectorConstraint": "transform"}
+VECTOR_ATTRS = {"translate", "rotate", "scale", "jointOrient", "color", "transparency", "poleVector"}
+ANIM_CURVE_TYPES = {"translate": "animCurveTL", "rotate": "animCurveTA", "jointOrient": "animCurveTA"}
+
+scene = None # the current StandInScene, NewScene replaces it
+
+
+def MultiplyMatrices(a, b):
+    # row major with the translation in the last row, like maya's MMatrix
+    return tuple(sum(a[row * 4 + i] * b[i * 4 + column] for i in range(4)) for row in range(4) for column in range(4))
+
+
+def InvertMatrix(matrix):
+    rows = [list(matrix[row * 4: row * 4 + 4]) + [1.0 if i == row else 0.0 for i in range(4)] for row in range(4)]
+    for column in range(4):
+        pivot = max(range(column, 4), key = lambda row: abs(rows[row][column]))
+        if abs(rows[pivot][column]) < 1e-12:
+            raise RuntimeError("The matrix can not be inverted")
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        pivotValue = rows[column][column]
+        rows[column] = [value / pivotValue for value in rows[column]]
+        for row in range(4):
+            if row != column and rows[row][column]:
+                factor = rows[row][column]
+                rows[row] = [value - factor * pivotValue for value, pivotValue in zip(rows[row], rows[column])]
+    return tuple(value for row in rows for value in row[4:])
+
+
+def SplitPlug(plug):
+    nodeName, _, attr = plug.partition(".")
+    return nodeName, attr
+
+
+def SplitRange(attr):
+    # "f[2:5]" -> ("f", 2, 5), "pnts[3]" -> ("pnts", 3, 3)
+    name, _, indices = attr.partition("[")
+    first, _, last = indices.rstrip("]").partition(":")
+    return name, int(first), int(last or first)
+
+
+def TransformPoint(point, matrix):
+    return tuple(sum((point[i] if i < 3 else 1.0) * matrix[i * 4 + column] for i in range(4)) for column in range(3))
+
+
+class MeshData:
+    def __init__(self, points = (), polyCounts = (), polyConnects = ()):
+        self.points = [tuple(point) for point in points]
+        self.polyCounts = list(polyCounts)
+        self.polyConnects = list(polyConnects)
+        self.edgeCount = None # counted on the first polyEvaluate
+        self.tweaks = [(0.0, 0.0, 0.0)] * len(self.points) # pnts, already added to the points
+        self.faceShading = [None] * len(self.polyCounts) # per face shading engine, set through face components
+
+    def Copy(self):
+        copy = MeshData(self.points, self.polyCounts, self.polyConnects)
+        copy.tweaks = list(self.tweaks)
+        copy.faceShading = list(self.faceShading)
+        return copy
+
+    def SetTweaks(self, first, values):
+        for offset in range(len(values) // 3):
+            index = first + offset
+            oldTweak = self.tweaks[index]
+            newTweak = tuple(float(value) for value in values[offset * 3: offset * 3 + 3])
+            self.points[index] = tuple(self.points[index][axis] - oldTweak[axis] + newTweak[axis] for axis in range(3))
+            self.tweaks[index] = newTweak
+
+    def DeleteFaces(self, faces):
+        # the vertices no face uses anymore go as well, like maya does
+        keptCounts, keptFaces, keptShading = [], [], []
+        offset = 0
+        for face, count in enumerate(self.polyCounts):
+            if face not in faces:
+                keptCounts.append(count)
+                keptFaces.append(self.polyConnects[offset: offset + count])
+                keptShading.append(self.faceShading[face])
+            offset += count
+        usedVertices = sorted({vertex for face in keptFaces for vertex in face})
+        newIndices = {vertex: index for index, vertex in enumerate(usedVertices)}
+        self.points = [self.points[vertex] for vertex in usedVertices]
+        self.tweaks = [self.tweaks[vertex] for vertex in usedVertices]
+        self.polyCounts = keptCounts
+        self.polyConnects = [newIndices[vertex] for face in keptFaces for vertex in face]
+        self.faceShading = keptShading
+        self.edgeCount = None
+
+    def GetEdgeCount(self):
+        if self.edgeCount is None:
+            edges = set()
+            offset = 0
+            for count in self.polyCounts:
+                face = self.polyConnects[offset: offset + count]
+                edges.update(tuple(sorted((face[i], face[(i + 1) % count]))) for i in range(count))
+                offset += count
+            self.edgeCount = len(edges)
+        return self.edgeCount
+
+
+class SceneNode:
+    def __init__(self, name, nodeType):
+        self.name = name
+        self.type = nodeType
+        self.parents = [] # more than one when the node is instanced, the first one gives its path
+        self.children = []
+        self.attrs = {}
+        self.dynamicAttrs = set()
+        self.inputs = {} # attr -> (source node, source attr)
+        self.outputs = [] # (attr, destination node, destination attr)
+        self.matrix = IDENTITY_MATRIX # local, dag nodes only
+        self.mesh = MeshData() if nodeType == "mesh" else None
+        self.keys = [] # (time, value), anim curves only
+        self.members = [] # sets only
+        self.memberOf = [] # the sets this node is in
+
+    def IsA(self, nodeType):
+        current = self.type
+        while current:
+            if current == nodeType:
+                return True
+            current = INHERITED_TYPES.get(current)
+        return nodeType == "dagNode" and self.type in DAG_TYPES
+
+    def GetPath(self):
+        if self.type not in DAG_TYPES:
+            return self.name
+        return (self.parents[0].GetPath() if self.parents else "") + "|" + self.name
+
+    def GetWorldMatrix(self):
+        if not self.parents:
+            return self.matrix
+        return MultiplyMatrices(self.matrix, self.parents[0].GetWorldMatrix())
+
+
+class StandInScene:
+    def __init__(self):
+        self.nodes = {} # name -> SceneNode
+        self.selection = []
+        self.currentTime = 1.0
+        self.playbackRange = [1.0, 120.0]
+        self.scenePath = ""
+        self.modified = False
+        self.scriptJobs = {} # id -> (event, callback)
+        self.sceneCallbacks = {} # id -> (message, callback)
+        self.nextCallbackId = 1
+        self.exportedFiles = [] # paths FBXExport wrote
+        self.callCounts = Counter() # maya.cmds command -> times it was called
+        self.CreateNode("time", "time1")
+
+    # scene building, for fixtures; not maya commands, so not counted
+
+    def GetNode(self, name):
+        node = self.nodes.get(name.split("|")[-1]) if name else None
+        if not node:
+            raise ValueError(f"No object matches name: {name}")
+        return node
+
+    def GetUniqueName(self, name):
+        if name not in self.nodes:
+            return name
+        base = name.rstrip("0123456789")
+        index = 1
+        while f"{base}{index}" in self.nodes:
+            index += 1
+        return f"{base}{index}"
+
+    def CreateNode(self, nodeType, name = "", parent = None):
+        node = SceneNode(self.GetUniqueName(name or nodeType + "1"), nodeType)
+        self.nodes[node.name] = node
+        if parent:
+            self.Reparent(node, parent)
+        if nodeType in SHAPE_TYPES:
+            node.attrs["intermediateObject"] = False
+        if nodeType in DAG_TYPES:
+            node.attrs["visibility"] = True
+        if nodeType == "joint":
+            node.attrs["jointOrient"] = (0.0, 0.0, 0.0)
+            node.attrs["bindPose"] = list(IDENTITY_MATRIX)
+        return node
+
+    def CreateTransform(self, name, parent = None, translate = (0, 0, 0), nodeType = "transform"):
+        node = self.CreateNode(nodeType, name, self.GetNode(parent) if isinstance(parent, str) else parent)
+        node.matrix = IDENTITY_MATRIX[:12] + tuple(float(value) for value in translate) + (1.0,)
+        return node.name
+
+    def CreateJoint(self, name, parent = None, translate = (0, 0, 0)):
+        return self.CreateTransform(name, parent, translate, "joint")
+
+    def CreateMesh(self, name, points, polyCounts, polyConnects, parent = None):
+        transform = self.GetNode(self.CreateTransform(name, parent))
+        shape = self.CreateNode("mesh", transform.name + "Shape", transform)
+        shape.mesh = MeshData(points, polyCounts, polyConnects)
+        return transform.name
+
+    def CreateGridMesh(self, name, rows, columns, size = 100.0, parent = None):
+        # a flat grid of rows x columns quads on the xz plane
+        points = [(size * column / columns - size / 2, 0.0, size * row / rows - size / 2) for row in range(rows + 1) for column in range(columns + 1)]
+        polyConnects = []
+        for row in range(rows):
+            for column in range(columns):
+                first = row * (columns + 1) + column
+                polyConnects += [first, first + 1, first + columns + 2, first + columns + 1]
+        return self.CreateMesh(name, points, [4] * (rows * columns), polyConnects, parent)
+
+    def SetKeys(self, nodeName, attr, keys):
+        # an anim curve driving nodeName.attr through (time, value) keys, with linear tangents
+        node = self.GetNode(nodeName)
+        curve = self.CreateNode(ANIM_CURVE_TYPES.get(attr.rstrip("XYZ"), "animCurveTU"), f"{node.name}_{attr}")
+        curve.keys = sorted((float(time), float(value)) for time, value in keys)
+        curve.attrs["preInfinity"] = curve.attrs["postInfinity"] = 0 # constant
+        self.Connect(curve, "output", node, attr)
+        return curve.name
+
+    # graph edits the commands share
+
+    def Reparent(self, node, parent, keepWorld = False, add = False):
+        worldMatrix = node.GetWorldMatrix() if keepWorld else None
+        if not add:
+            for oldParent in node.parents:
+                oldParent.children.remove(node)
+            node.parents = []
+        if parent:
+            node.parents.append(parent)
+            parent.children.append(node)
+        if worldMatrix:
+            self.SetWorldMatrix(node, worldMatrix)
+
+    def SetWorldMatrix(self, node, worldMatrix):
+        worldMatrix = tuple(float(value) for value in worldMatrix)
+        node.matrix = MultiplyMatrices(worldMatrix, InvertMatrix(node.parents[0].GetWorldMatrix())) if node.parents else worldMatrix
+
+    def Connect(self, srcNode, srcAttr, dstNode, dstAttr, force = False):
+        if dstAttr in dstNode.inputs:
+            if not force:
+                raise RuntimeError(f"{dstNode.name}.{dstAttr} is already connected")
+            self.Disconnect(dstNode, dstAttr)
+        dstNode.inputs[dstAttr] = (srcNode, srcAttr)
+        srcNode.outputs.append((srcAttr, dstNode, dstAttr))
+        if srcAttr == "outMesh" and dstAttr == "inMesh":
+            dstNode.mesh = srcNode.mesh.Copy() # the shape evaluates to its input, the points can be tweaked after
+
+    def Disconnect(self, dstNode, dstAttr):
+        srcNode, srcAttr = dstNode.inputs.pop(dstAttr)
+        srcNode.outputs.remove((srcAttr, dstNode, dstAttr))
+
+    def DeleteNode(self, node):
+        if node.name not in self.nodes:
+            return # already gone with its parent
+        for message, callback in list(self.sceneCallbacks.values()):
+            if message[0] == "nodeRemoved" and (message[1] == "dependNode" or node.IsA(message[1])):
+                callback(MObject(node), None)
+        if "endEffector" in node.inputs: # an ik handle takes its effector with it
+            self.DeleteNode(node.inputs["endEffector"][0])
+        for child in list(node.children):
+            if len(child.parents) > 1: # an instance, only this path to it goes
+                node.children.remove(child)
+                child.parents.remove(node)
+            else:
+                self.DeleteNode(child)
+        for dstAttr in list(node.inputs):
+            self.Disconnect(node, dstAttr)
+        for srcAttr, dstNode, dstAttr in list(node.outputs):
+            self.Disconnect(dstNode, dstAttr)
+        for parent in node.parents:
+            parent.children.remove(node)
+        for objectSet in node.memberOf:
+            objectSet.members.remove(node)
+        for member in node.members:
+            member.memberOf.remove(node)
+        if node in self.selection:
+            self.selection.remove(node)
+        del self.nodes[node.name]
+
+    def AddToSet(self, objectSet, nodes):
+        for node in nodes:
+            if objectSet not in node.memberOf:
+                objectSet.members.append(node)
+                node.memberOf.append(objectSet)
+
+    def RemoveFromSet(self, objectSet, node):
+        objectSet.members.remove(node)
+        node.memberOf.remove(objectSet)
+
+    def Duplicate(self, node, name, parents):
+        copy = self.CreateNode(node.type, name)
+        copy.attrs = {attr: list(value) if isinstance(value, list) else value for attr, value in node.attrs.items()}
+        copy.dynamicAttrs = set(node.dynamicAttrs)
+        copy.matrix = node.matrix
+        copy.mesh = node.mesh.Copy() if node.mesh else None
+        for parent in parents:
+            self.Reparent(copy, parent, add = True)
+        for child in node.children:
+            childName = copy.name + "Shape" if child.type in SHAPE_TYPES else child.name
+            self.Duplicate(child, childName, [copy])
+        return copy
+
+    def GetAttr(self, node, attr):
+        if attr == "translate":
+            return tuple(node.matrix[12:15])
+        if attr in ("translateX", "translateY", "translateZ"):
+            return node.matrix[12 + "XYZ".index(attr[-1])]
+        if attr[:-1] in VECTOR_ATTRS and attr[-1] in "XYZRGB" and attr[:-1] in node.attrs:
+            return node.attrs[attr[:-1]]["XYZRGB".index(attr[-1]) % 3]
+        if attr not in node.attrs:
+            raise ValueError(f"No object matches name: {node.name}.{attr}")
+        return node.attrs[attr]
+
+    def SetAttr(self, node, attr, value):
+        if attr == "translate":
+            node.matrix = node.matrix[:12] + tuple(float(v) for v in value) + (1.0,)
+        elif attr in ("translateX", "translateY", "translateZ"):
+            translate = list(node.matrix[12:15])
+            translate["XYZ".index(attr[-1])] = float(value)
+            node.matrix = node.matrix[:12] + tuple(translate) + (1.0,)
+        else:
+            node.attrs[attr] = value
+
+    def FireTimeChanged(self):
+        for event, callback in list(self.scriptJobs.values()):
+            if event == "timeChanged":
+                callback()
+
+    def FireSceneMessage(self, message):
+        # False when a check callback refused the change
+        allowed = True
+        for callbackMessage, callback in list(self.sceneCallbacks.values()):
+            if callbackMessage == message and callback(None) is False:
+                allowed = False
+        return allowed
+
+
+def AsList(values):
+    if values is None:
+        return []
+    if isinstance(values, (list, tuple, set)):
+        return [value for item in values for value in AsList(item)]
+    return [values]
+
+
+def GetFlag(flags, *names, default = None):
+    for name in names:
+        if name in flags:
+            return flags[name]
+    return default
+
+
+class StandInCmds:
+    # the maya.cmds commands, by the names the tools call them with
+
+    def objExists(self, name):
+        nodeName, attr = SplitPlug(name)
+        node = scene.nodes.get(nodeName.split("|")[-1])
+        if not node or not attr:
+            return bool(node)
+        try:
+            scene.GetAttr(node, attr)
+            return True
+        except ValueError:
+            return attr in node.inputs
+
+    def createNode(self, nodeType, n = "", name = "", p = None, parent = None, **flags):
+        parentNode = GetFlag({"p": p, "parent": parent}, "p", "parent")
+        return scene.CreateNode(nodeType, n or name, scene.GetNode(parentNode) if parentNode else None).name
+
+    def shadingNode(self, nodeType, asShader = False, asUtility = False, name = "", n = ""):
+        return scene.CreateNode(nodeType, name or n).name
+
+    def addAttr(self, nodeName, ln = "", longName = "", dt = None, dataType = None, at = None, attributeType = None, dv = None, defaultValue = None, **flags):
+        node = scene.GetNode(nodeName)
+        attr = ln or longName
+        if attr in node.attrs:
+            raise RuntimeError(f"Found attribute {attr} already on {node.name}")
+        value = GetFlag({"dv": dv, "defaultValue": defaultValue}, "dv", "defaultValue")
+        if value is None and not (dt or dataType):
+            value = 0.0
+        if (at or attributeType) == "bool":
+            value = bool(value)
+        node.attrs[attr] = value
+        node.dynamicAttrs.add(attr)
+
+    def attributeQuery(self, attr, node = "", n = "", exists = False, ex = False):
+        sceneNode = scene.GetNode(node or n)
+        return attr in sceneNode.attrs or attr in ("translate", "translateX", "translateY", "translateZ")
+
+    def getAttr(self, plug, **flags):
+        nodeName, attr = SplitPlug(plug)
+        value = scene.GetAttr(scene.GetNode(nodeName), attr)
+        if isinstance(value, tuple) and attr in VECTOR_ATTRS:
+            return [value] # maya gives compound attributes as a list of one tuple
+        return value
+
+    def setAttr(self, plug, *values, type = None, **flags):
+        nodeName, attr = SplitPlug(plug)
+        node = scene.GetNode(nodeName)
+        if attr in node.inputs:
+            raise RuntimeError(f"{plug} is connected, it can not be set")
+        if attr.startswith("pnts["):
+            first, last = SplitRange(attr)[1:]
+            if last >= len(node.mesh.points) or len(values) != (last - first + 1) * 3:
+                raise RuntimeError(f"{plug} does not match the {len(values)} values given")
+            node.mesh.SetTweaks(first, values)
+        elif type in ("double3", "float3"):
+            scene.SetAttr(node, attr, tuple(float(value) for value in values))
+        elif type in ("string", "Int32Array", "doubleArray", "matrix"):
+            scene.SetAttr(node, attr, list(values[0]) if type != "string" else values[0])
+        else:
+            scene.SetAttr(node, attr, values[0])
+
+    def connectAttr(self, srcPlug, dstPlug, force = False, f = False):
+        srcName, srcAttr = SplitPlug(srcPlug)
+        dstName, dstAttr = SplitPlug(dstPlug)
+        scene.Connect(scene.GetNode(srcName), srcAttr, scene.GetNode(dstName), dstAttr, force or f)
+
+    def listConnections(self, plug, s = True, d = True, source = None, destination = None, **flags):
+        nodeName, attr = SplitPlug(plug)
+        node = scene.GetNode(nodeName)
+        connected = []
+        if GetFlag({"source": source}, "source", default = s):
+            connected += [srcNode.name for dstAttr, (srcNode, srcAttr) in node.inputs.items() if not attr or dstAttr == attr]
+        if GetFlag({"destination": destination}, "destination", default = d):
+            connected += [dstNode.name for srcAttr, dstNode, dstAttr in node.outputs if not attr or srcAttr == attr]
+        return connected or None
+
+    def listHistory(self, names, **flags):
+        # everything upstream of the nodes, them included
+        history = []
+        seen = set()
+        pending = [scene.GetNode(name) for name in AsList(names)]
+        while pending:
+            node = pending.pop(0)
+            if node.name in seen:
+                continue
+            seen.add(node.name)
+            history.append(node.name)
+            pending += [srcNode for srcNode, srcAttr in node.inputs.values()]
+        return history
+
+    def delete(self, *names, ch = False, constructionHistory = False, **flags):
+        faces = {} # mesh -> face indices, for face components
+        for name in AsList(names):
+            if ".f[" in name:
+                nodeName, attr = SplitPlug(name)
+                first, last = SplitRange(attr)[1:]
+                faces.setdefault(self.GetMeshNode(nodeName), set()).update(range(first, last + 1))
+        if faces:
+            for meshNode, meshFaces in faces.items():
+                meshNode.mesh.DeleteFaces(meshFaces)
+            return
+        nodes = [scene.GetNode(name) for name in AsList(names) or [node.name for node in scene.selection]]
+        if ch or constructionHistory:
+            for node in nodes:
+                for shape in [node] + node.children:
+                    for attr in ("inMesh", "create"):
+                        if attr in shape.inputs:
+                            scene.Disconnect(shape, attr)
+            return
+        for node in nodes:
+            scene.DeleteNode(node)
+
+    def duplicate(self, name, n = "", **flags):
+        node = scene.GetNode(name)
+        return [scene.Duplicate(node, n or node.name, node.parents[:1]).name]
+
+    def parent(self, *names, w = False, world = False, add = False, s = False, shape = False, **flags):
+        names = AsList(names)
+        if w or world:
+            children, parentNode = names, None
+        else:
+            children, parentNode = names[:-1], scene.GetNode(names[-1])
+        for childName in children:
+            child = scene.GetNode(childName)
+            scene.Reparent(child, parentNode, keepWorld = not (s or shape), add = add)
+        return [scene.GetNode(childName).name for childName in children]
+
+    def listRelatives(self, names = None, c = False, children = False, s = False, shapes = False, ad = False, allDescendents = False,
+                      p = False, parent = False, type = None, ni = False, noIntermediate = False, f = False, fullPath = False, **flags):
+        relatives = []
+        for name in AsList(names) or [node.name for node in scene.selection]:
+            node = scene.GetNode(name)
+            if p or parent:
+                relatives += node.parents
+            elif ad or allDescendents:
+                descendants = []
+                pending = list(node.children)
+                while pending:
+                    child = pending.pop(0)
+                    descendants.append(child)
+                    pending = child.children + pending
+                relatives += reversed(descendants) # maya lists the deepest first
+            elif s or shapes:
+                relatives += [child for child in node.children if child.type in SHAPE_TYPES]
+            else:
+                relatives += node.children
+        nodeTypes = AsList(type)
+        relatives = [node for node in relatives if not nodeTypes or any(node.IsA(nodeType) for nodeType in nodeTypes)]
+        if ni or noIntermediate:
+            relatives = [node for node in relatives if not node.attrs.get("intermediateObject")]
+        if not relatives:
+            return None
+        return [node.GetPath() if f or fullPath else node.name for node in relatives]
+
+    def ls(self, *names, type = None, sl = False, selection = False, l = False, long = False, **flags):
+        if sl or selection:
+            nodes = list(scene.selection)
+        elif names:
+            nodes = []
+            for pattern in AsList(names):
+                shortPattern = pattern.split("|")[-1]
+                if any(char in shortPattern for char in "*?["):
+                    nodes += [scene.nodes[name] for name in fnmatch.filter(scene.nodes, shortPattern)]
+                elif shortPattern in scene.nodes:
+                    nodes.append(scene.nodes[shortPattern])
+        else:
+            nodes = list(scene.nodes.values())
+        nodeTypes = AsList(type)
+        result = []
+        for node in nodes:
+            if nodeTypes and not any(node.IsA(nodeType) for nodeType in nodeTypes):
+                continue
+            name = node.GetPath() if l or long else node.name
+            if name not in result:
+                result.append(name)
+        return result
+
+    def objectType(self, name, **flags):
+        return scene.GetNode(name).type
+
+    def select(self, *names, r = False, replace = False, add = False, cl = False, clear = False, **flags):
+        if cl or clear:
+            scene.selection = []
+            return
+        nodes = [scene.GetNode(name) for name in AsList(names)]
+        scene.selection = (scene.selection if add else []) + nodes
+
+    def rename(self, oldName, newName):
+        node = scene.GetNode(oldName)
+        del scene.nodes[node.name]
+        node.name = scene.GetUniqueName(newName)
+        scene.nodes[node.name] = node
+        return node.name
+
+    def group(self, *names, n = "", name = "", em = False, empty = False, w = False, world = False, **flags):
+        names = AsList(names)
+        parentNode = None if (w or world or not names) else (scene.GetNode(names[0]).parents[:1] or [None])[0]
+        groupNode = scene.CreateNode("transform", n or name or "group1", parentNode)
+        for childName in names:
+            scene.Reparent(scene.GetNode(childName), groupNode, keepWorld = True)
+        return groupNode.name
+
+    def spaceLocator(self, n = "", name = "", **flags):
+        transform = scene.CreateNode("transform", n or name or "locator1")
+        scene.CreateNode("locator", transform.name + "Shape", transform)
+        return [transform.name]
+
+    def curve(self, n = "", name = "", d = 3, degree = None, p = (), point = None, per = False, periodic = False, k = None, knot = None, **flags):
+        transform = scene.CreateNode("transform", n or name or "curve1")
+        shape = scene.CreateNode("nurbsCurve", "curveShape1", transform)
+        shape.attrs["degree"] = degree or d
+        shape.attrs["controlPoints"] = [tuple(point) for point in (point or p)]
+        shape.attrs["form"] = 2 if (per or periodic) else 0
+        shape.attrs["knots"] = list(knot or k or [])
+        return transform.name
+
+    def joint(self, name = "", n = "", p = (0, 0, 0), position = None, **flags):
+        parentNode = scene.selection[0] if scene.selection and scene.selection[0].type == "joint" else None
+        jointNode = scene.GetNode(scene.CreateJoint(name or n or "joint1", parentNode))
+        scene.SetWorldMatrix(jointNode, IDENTITY_MATRIX[:12] + tuple(float(value) for value in (position or p)) + (1.0,))
+        scene.selection = [jointNode]
+        return jointNode.name
+
+    def xform(self, name, q = False, query = False, t = None, translation = None, m = None, matrix = None, ws = False, worldSpace = False, **flags):
+        node = scene.GetNode(name)
+        worldSpace = ws or worldSpace
+        worldMatrix = node.GetWorldMatrix() if worldSpace else node.matrix
+        if q or query:
+            if GetFlag({"t": t, "translation": translation}, "t", "translation"):
+                return list(worldMatrix[12:15])
+            if GetFlag({"m": m, "matrix": matrix}, "m", "matrix"):
+                return list(worldMatrix)
+            raise NotImplementedError("xform query only supports -t and -m in the stand-in")
+        newMatrix = GetFlag({"m": m, "matrix": matrix}, "m", "matrix")
+        newTranslate = GetFlag({"t": t, "translation": translation}, "t", "translation")
+        if newTranslate is not None:
+            newMatrix = worldMatrix[:12] + tuple(float(value) for value in newTranslate) + (1.0,)
+        if newMatrix is not None:
+            if worldSpace:
+                scene.SetWorldMatrix(node, newMatrix)
+            else:
+                node.matrix = tuple(float(value) for value in newMatrix)
+
+    def matchTransform(self, name, target, **flags):
+        scene.SetWorldMatrix(scene.GetNode(name), scene.GetNode(target).GetWorldMatrix())
+
+    def orientConstraint(self, *names, **flags):
+        # a second target on the same joint is added to its constraint, like maya does
+        *targets, drivenName = AsList(names)
+        driven = scene.GetNode(drivenName)
+        constraint = next((child for child in driven.children if child.type == "orientConstraint"), None)
+        if not constraint:
+            constraint = scene.CreateNode("orientConstraint", driven.name + "_orientConstraint1", driven)
+            scene.Connect(constraint, "constraintRotate", driven, "rotate", force = True)
+        for target in targets:
+            targetIndex = sum(1 for attr in constraint.inputs if attr.startswith("target["))
+            scene.Connect(scene.GetNode(target), "rotate", constraint, f"target[{targetIndex}]")
+        return [constraint.name]
+
+    def poleVectorConstraint(self, target, handleName, **flags):
+        handle = scene.GetNode(handleName)
+        constraint = scene.CreateNode("poleVectorConstraint", handle.name + "_poleVectorConstraint1", handle)
+        scene.Connect(scene.GetNode(target), "translate", constraint, "target[0]")
+        scene.Connect(constraint, "constraintTranslate", handle, "poleVector", force = True)
+        return [constraint.name]
+
+    def ikHandle(self, n = "", name = "", sj = "", startJoint = "", ee = "", endEffector = "", sol = "ikRPSolver", solver = None, **flags):
+        startJnt = scene.GetNode(sj or startJoint)
+        endJnt = scene.GetNode(ee or endEffector)
+        handle = scene.CreateNode("ikHandle", n or name or "ikHandle1")
+        scene.SetWorldMatrix(handle, endJnt.GetWorldMatrix())
+        effector = scene.CreateNode("ikEffector", "effector1", endJnt.parents[0] if endJnt.parents else None)
+        handle.attrs["ikSolver"] = solver or sol
+        scene.Connect(startJnt, "message", handle, "startJoint")
+        scene.Connect(effector, "handlePath", handle, "endEffector")
+        return [handle.name, effector.name]
+
+    def GetMeshNode(self, name):
+        node = scene.GetNode(name)
+        return node if node.type == "mesh" else next(child for child in node.children if child.type == "mesh")
+
+    def sets(self, *names, name = "", n = "", renderable = False, empty = False, edit = False, e = False, forceElement = "", fe = "", **flags):
+        components = [memberName for memberName in AsList(names) if ".f[" in memberName]
+        if components: # face components only ever go to a shading engine, kept per face on the mesh
+            setNode = scene.GetNode(forceElement or fe)
+            for component in components:
+                nodeName, attr = SplitPlug(component)
+                meshNode = self.GetMeshNode(nodeName)
+                first, last = SplitRange(attr)[1:]
+                if last >= len(meshNode.mesh.polyCounts):
+                    raise ValueError(f"No object matches name: {component}")
+                meshNode.mesh.faceShading[first: last + 1] = [setNode.name] * (last - first + 1)
+            names = [memberName for memberName in AsList(names) if memberName not in components]
+        members = [scene.GetNode(memberName) for memberName in AsList(names)]
+        if not (edit or e):
+            setNode = scene.CreateNode("shadingEngine" if renderable else "objectSet", name or n or "set1")
+            scene.AddToSet(setNode, [] if empty else members)
+            return setNode.name
+        setNode = scene.GetNode(forceElement or fe)
+        if setNode.type == "shadingEngine": # an object is in one shading engine only
+            for member in members:
+                for otherSet in [otherSet for otherSet in member.memberOf if otherSet.type == "shadingEngine" and otherSet is not setNode]:
+                    scene.RemoveFromSet(otherSet, member)
+        scene.AddToSet(setNode, members)
+
+    def polyCollapseTweaks(self, name, **flags):
+        mesh = self.GetMeshNode(name).mesh
+        mesh.tweaks = [(0.0, 0.0, 0.0)] * len(mesh.points)
+
+    def polyUnite(self, *names, ch = True, constructionHistory = True, n = "", name = "", **flags):
+        if ch and constructionHistory:
+            raise NotImplementedError("polyUnite only supports -ch off in the stand-in")
+        united = MeshData()
+        for transformName in AsList(names):
+            transform = scene.GetNode(transformName)
+            meshNode = self.GetMeshNode(transformName)
+            worldMatrix = transform.GetWorldMatrix()
+            offset = len(united.points)
+            united.points += [TransformPoint(point, worldMatrix) for point in meshNode.mesh.points]
+            united.polyCounts += meshNode.mesh.polyCounts
+            united.polyConnects += [vertex + offset for vertex in meshNode.mesh.polyConnects]
+            united.faceShading += meshNode.mesh.faceShading
+            scene.DeleteNode(meshNode) # the inputs are left as empty transforms
+        united.tweaks = [(0.0, 0.0, 0.0)] * len(united.points)
+        transform = scene.CreateNode("transform", n or name or "polySurface1")
+        shape = scene.CreateNode("mesh", transform.name + "Shape", transform)
+        shape.mesh = united
+        return [transform.name]
+
+    def polyEvaluate(self, name, v = False, vertex = False, e = False, edge = False, f = False, face = False, **flags):
+        node = scene.GetNode(name)
+        if node.type != "mesh":
+            node = next(child for child in node.children if child.type == "mesh")
+        if v or vertex:
+            return len(node.mesh.points)
+        if e or edge:
+            return node.mesh.GetEdgeCount()
+        if f or face:
+            return len(node.mesh.polyCounts)
+        raise NotImplementedError("polyEvaluate only supports -v, -e and -f in the stand-in")
+
+    def currentTime(self, *time, q = False, query = False, e = False, edit = False, **flags):
+        if q or query:
+            return scene.currentTime
+        scene.currentTime = float(time[0])
+        scene.FireTimeChanged()
+        return scene.currentTime
+
+    def playbackOptions(self, q = False, query = False, e = False, edit = False, **flags):
+        rangeFlags = {"min": 0, "minTime": 0, "max": 1, "maxTime": 1}
+        if q or query:
+            for flag, index in rangeFlags.items():
+                if flags.get(flag):
+                    return scene.playbackRange[index]
+            raise NotImplementedError("playbackOptions query only supports -min and -max in the stand-in")
+        for flag, index in rangeFlags.items():
+            if flag in flags:
+                scene.playbackRange[index] = float(flags[flag])
+
+    def keyframe(self, curveName, q = False, query = False, t = None, time = None, tc = False, timeChange = False, vc = False, valueChange = False, eval = False, **flags):
+        curve = scene.GetNode(curveName)
+        timeRange = AsList(GetFlag({"t": t, "time": time}, "t", "time"))
+        if eval:
+            return [self.EvaluateCurve(curve, float(timeValue)) for timeValue in timeRange]
+        keys = [key for key in curve.keys if not timeRange or timeRange[0] <= key[0] <= timeRange[-1]]
+        values = []
+        for keyTime, keyValue in keys:
+            values += ([keyTime] if tc or timeChange else []) + ([keyValue] if vc or valueChange else [])
+        return values or None
+
+    def EvaluateCurve(self, curve, time):
+        keys = curve.keys
+        if time <= keys[0][0]:
+            return keys[0][1]
+        for (startTime, startValue), (endTime, endValue) in zip(keys, keys[1:]):
+            if time <= endTime:
+                return startValue + (endValue - startValue) * (time - startTime) / (endTime - startTime)
+        return keys[-1][1]
+
+    def keyTangent(self, curveName, q = False, query = False, t = None, time = None, **flags):
+        keyCount = len(self.keyframe(curveName, q = True, t = GetFlag({"t": t, "time": time}, "t", "time"), tc = True) or [])
+        for flag, value in (("itt", "linear"), ("ott", "linear"), ("ia", 0.0), ("oa", 0.0), ("iw", 1.0), ("ow", 1.0)):
+            if flags.get(flag):
+                return [value] * keyCount
+        raise NotImplementedError("keyTangent query only supports the tangent type, angle and weight flags in the stand-in")
+
+    def file(self, *args, q = False, query = False, sn = False, sceneName = False, modified = None, mf = None, **flags):
+        if (q or query) and (sn or sceneName):
+            return scene.scenePath
+        modified = GetFlag({"modified": modified, "mf": mf}, "modified", "mf")
+        if modified is not None and not (q or query):
+            scene.modified = bool(modified)
+            return
+        raise NotImplementedError("file only supports -q -sn and -modified in the stand-in")
+
+    def scriptJob(self, e = None, event = None, kill = None, k = None, force = False, exists = None, ex = None, **flags):
+        jobId = GetFlag({"exists": exists, "ex": ex}, "exists", "ex")
+        if jobId is not None:
+            return jobId in scene.scriptJobs
+        jobId = GetFlag({"kill": kill, "k": k}, "kill", "k")
+        if jobId is not None:
+            scene.scriptJobs.pop(jobId, None)
+            return
+        eventName, callback = e or event
+        jobId = scene.nextCallbackId
+        scene.nextCallbackId += 1
+        scene.scriptJobs[jobId] = (eventName, callback)
+        return jobId
+
+    def undoInfo(self, **flags):
+        pass # there is no undo queue, the chunks are only counted
+
+    def refresh(self, **flags):
+        pass
+
+    def FBXExport(self, *args):
+        # a small file listing what was exported, so the tools see a file with a size
+        path = args[list(args).index("-f") + 1]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok = True)
+        with open(path, "w") as exportFile:
+            json.dump({"nodes": [node.name for node in scene.selection], "range": scene.playbackRange}, exportFile)
+        scene.exportedFiles.append(path)
+
+    def FBXResetExport(self, *args):
+        pass
+
+    def FBXExportOption(self, *args):
+        pass # stands in for every FBXExport* setting command, see CreateCmdsModule
+
+
+FBX_SETTING_COMMANDS = ("FBXExportSmoothingGroups", "FBXExportInputConnections", "FBXExportBakeComplexAnimation",
+                        "FBXExportBakeComplexStart", "FBXExportBakeComplexEnd", "FBXExportBakeComplexStep")
+
+
+def CreateCmdsModule():
+    # every command counts its calls in the current scene, unknown ones raise
+    cmds = StandInCmds()
+    module = types.ModuleType("maya.cmds")
+    def CountCalls(commandName, command):
+        def Call(*args, **flags):
+            scene.callCounts[commandName] += 1
+            return command(*args, **flags)
+        Call.__name__ = commandName
+        return Call
+
+    commandNames = [name for name in dir(StandInCmds) if not name.startswith("_") and name[0].islower()]
+    for commandName in commandNames + ["FBXExport", "FBXResetExport"]:
+        setattr(module, commandName, CountCalls(commandName, getattr(cmds, commandName)))
+    for commandName in FBX_SETTING_COMMANDS:
+        setattr(module, commandName, CountCalls(commandName, cmds.FBXExportOption))
+
+    def GetMissingCommand(commandName):
+        if commandName.startswith("__"):
+            raise AttributeError(commandName)
+        raise NotImplementedError(f"maya.cmds.{commandName} is not in the scene stand-in")
+    module.__getattr__ = GetMissingCommand
+    return module
+
+
+# the maya.api.OpenMaya classes the tools use
+
+class MSpace:
+    kTransform = 1
+    kObject = 2
+    kWorld = 4
+
+
+class MPoint:
+    def __init__(self, x = 0.0, y = 0.0, z = 0.0, w = 1.0):
+        if isinstance(x, (list, tuple, MPoint)):
+            x, y, z = x[0], x[1], x[2]
+        self.x, self.y, self.z, self.w = x, y, z, w
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.z, self.w)[index]
+
+    def __mul__(self, matrix):
+        return MPoint(TransformPoint((self.x, self.y, self.z), matrix))
+
+    def distanceTo(self, other):
+        return ((self.x - other.x) ** 2 + (self.y - other.y) ** 2 + (self.z - other.z) ** 2) ** 0.5
+
+
+class MPointArray(list):
+    def __init__(self, points = ()):
+        super().__init__(point if isinstance(point, MPoint) else MPoint(point) for point in points)
+
+
+class MMatrix(tuple):
+    def __mul__(self, other):
+        return MMatrix(MultiplyMatrices(self, other))
+
+    def inverse(self):
+        return MMatrix(InvertMatrix(self))
+
+
+class MObject:
+    def __init__(self, node = None, attr = ""):
+        self.node = node
+        self.attr = attr # the plug it came from, for plug values
+
+
+class MDagPath:
+    def __init__(self, node = None):
+        self.node = node
+
+    def inclusiveMatrix(self):
+        return MMatrix(self.node.GetWorldMatrix())
+
+    def fullPathName(self):
+        return self.node.GetPath()
+
+    def partialPathName(self):
+        return self.node.name
+
+
+class MSelectionList:
+    def __init__(self):
+        self.nodes = []
+
+    def add(self, name):
+        node = scene.nodes.get(name.split("|")[-1])
+        if not node:
+            raise RuntimeError("(kInvalidParameter): Object does not exist")
+        self.nodes.append(node)
+        return self
+
+    def length(self):
+        return len(self.nodes)
+
+    def getDagPath(self, index):
+        if self.nodes[index].type not in DAG_TYPES:
+            raise TypeError("item is not a DAG path")
+        return MDagPath(self.nodes[index])
+
+    def getDependNode(self, index):
+        return MObject(self.nodes[index])
+
+
+class MPlug:
+    def __init__(self, node, attr):
+        self.node = node
+        self.attr = attr
+
+    def elementByLogicalIndex(self, index):
+        return self # worldMatrix[0], there are no instanced transforms
+
+    def asMObject(self):
+        return MObject(self.node, self.attr)
+
+
+class MFnDependencyNode:
+    def __init__(self, obj = None):
+        self.node = obj.node
+
+    def findPlug(self, attr, wantNetworkedPlug = False):
+        return MPlug(self.node, attr)
+
+    def name(self):
+        return self.node.name
+
+
+class MFnMatrixData:
+    def __init__(self, obj):
+        self.obj = obj
+
+    def matrix(self):
+        return MMatrix(self.obj.node.GetWorldMatrix())
+
+
+class MFnMesh:
+    def __init__(self, obj):
+        self.node = obj.node
+        if self.node.type != "mesh":
+            raise RuntimeError("(kInvalidParameter): Object is incompatible with this method")
+
+    @property
+    def numVertices(self):
+        return len(self.node.mesh.points)
+
+    def getPoints(self, space = MSpace.kObject):
+        return MPointArray(self.node.mesh.points)
+
+    def setPoints(self, points, space = MSpace.kObject):
+        if len(points) != len(self.node.mesh.points):
+            raise RuntimeError("(kInvalidParameter): The point count does not match the mesh")
+        self.node.mesh.points = [(point.x, point.y, point.z) for point in points]
+
+    def getPoint(self, index, space = MSpace.kObject):
+        return MPoint(self.node.mesh.points[index])
+
+    def getVertices(self):
+        return list(self.node.mesh.polyCounts), list(self.node.mesh.polyConnects)
+
+
+class MSceneMessage:
+    kBeforeSave = "beforeSave"
+    kAfterSave = "afterSave"
+    kBeforeSaveCheck = "beforeSaveCheck"
+    kBeforeNewCheck = "beforeNewCheck"
+    kBeforeOpenCheck = "beforeOpenCheck"
+    kAfterNew = "afterNew"
+    kAfterOpen = "afterOpen"
+
+    @staticmethod
+    def addCallback(message, callback, clientData = None):
+        callbackId = scene.nextCallbackId
+        scene.nextCallbackId += 1
+        scene.sceneCallbacks[callbackId] = (message, callback)
+        return callbackId
+
+    addCheckCallback = addCallback # FireSceneMessage gives back what the checks return
+
+
+class MDGMessage:
+    @staticmethod
+    def addNodeRemovedCallback(callback, nodeType = "dependNode", clientData = None):
+        callbackId = scene.nextCallbackId
+        scene.nextCallbackId += 1
+        scene.sceneCallbacks[callbackId] = (("nodeRemoved", nodeType), callback)
+        return callbackId
+
+
+class MMessage:
+    @staticmethod
+    def removeCallback(callbackId):
+        scene.sceneCallbacks.pop(callbackId, None)
+
+    @staticmethod
+    def removeCallbacks(callbackIds):
+        for callbackId in callbackIds:
+            scene.sceneCallbacks.pop(callbackId, None)
+
+
+OPEN_MAYA_CLASSES = (MSpace, MPoint, MPointArray, MMatrix, MObject, MDagPath, MSelectionList, MPlug, MFnDependencyNode,
+                     MFnMatrixData, MFnMesh, MSceneMessage, MDGMessage, MMessage)
+
+
+def CreateOpenMayaModule():
+    module = types.ModuleType("maya.api.OpenMaya")
+    for openMayaClass in OPEN_MAYA_CLASSES:
+        setattr(module, openMayaClass.__name__, openMayaClass)
+
+    def GetMissingClass(className):
+        if className.startswith("__"):
+            raise AttributeError(className)
+        raise NotImplementedError(f"maya.api.OpenMaya.{className} is not in the scene stand-in")
+    module.__getattr__ = GetMissingClass
+    return module
+
+
+def NewScene():
+    # an empty scene, the installed modules work on it from now on
+    global scene
+    scene = StandInScene()
+    return scene
+
+
+def Install():
+    # Puts the stand-in in place of maya.cmds and maya.api.OpenMaya. The rest of the maya package (the vendor
+    # stubs, or a real maya) stays, for modules like maya.debug that the tools import too.
+    NewScene()
+    import maya
+    import maya.api
+    cmdsModule = CreateCmdsModule()
+    openMayaModule = CreateOpenMayaModule()
+    sys.modules["maya.cmds"] = cmdsModule
+    sys.modules["maya.api.OpenMaya"] = openMayaModule
+    maya.cmds = cmdsModule
+    maya.api.OpenMaya = openMayaModule
+    return scene
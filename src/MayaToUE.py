@@ -1,8 +1,24 @@
 import os
-from PySide2.QtCore import Signal
-from PySide2.QtGui import QIntValidator, QRegExpValidator
+import sys
+import json
+import time
+import shutil
+import hashlib
+import math
+import bisect
+import tempfile
+import subprocess
+from PySide2.QtCore import Signal, QObject, QTimer
+from PySide2.QtGui import QIntValidator, QRegExpValidator, QDoubleValidator
 import maya.cmds as mc
-from  PySide2 .QtWidgets import QCheckBox, QFileDialog, QHBoxLayout, QLabel, QLineEdit, QMessageBox, QPushButton, QVBoxLayout, QWidget, QListWidget, QAbstractItemView
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+from maya.api.MDGContextGuard import MDGContextGuard
+from maya.debug.emModeManager import emModeManager
+from maya.debug.PlaybackOptionsManager import PlaybackOptionsManager
+from array import array
+from UnrealLink import GetUnrealLink
+from  PySide2 .QtWidgets import QCheckBox, QComboBox, QFileDialog, QHBoxLayout, QLabel, QLineEdit, QMessageBox, QPushButton, QVBoxLayout, QWidget, QListWidget, QAbstractItemView, QProgressBar
 
 class AnimClip:
     def __init__(self):
@@ -11,6 +27,342 @@ class AnimClip:
         self.subFix = ""
         self.shouldExport = True
 
+    def ToDict(self):
+        return {"frameStart": self.frameStart, "frameEnd": self.frameEnd, "subFix": self.subFix, "shouldExport": self.shouldExport}
+
+    def LoadDict(self, clipDict):
+        self.frameStart = clipDict["frameStart"]
+        self.frameEnd = clipDict["frameEnd"]
+        self.subFix = clipDict["subFix"]
+        self.shouldExport = clipDict.get("shouldExport", True)
+
+
+class ExportResult:
+    def __init__(self, name, path):
+        self.name = name # "mesh" or the subfix of the clip
+        self.path = path
+        self.status = "pending" # ok, failed, skipped or cancelled once the export ran
+        self.message = ""
+        self.duration = 0.0 # seconds
+        self.size = 0 # bytes
+
+    def ToDict(self):
+        return dict(self.__dict__)
+
+    @staticmethod
+    def FromDict(resultDict):
+        result = ExportResult(resultDict["name"], resultDict["path"])
+        result.__dict__.update(resultDict)
+        return result
+
+    def __str__(self):
+        text = f"{self.name}: {self.status} {self.path} ({self.size} bytes, {self.duration:.2f}s)"
+        if self.message:
+            text += " " + self.message
+        return text
+
+
+def RunExport(result: ExportResult, exportFunc):
+    startTime = time.time()
+    try:
+        exportFunc()
+        result.status = "ok"
+    except Exception as e: # one bad clip should not stop the others
+        result.status = "failed"
+        result.message = str(e)
+
+    result.duration = time.time() - startTime
+    if os.path.exists(result.path):
+        result.size = os.path.getsize(result.path)
+    return result
+
+
+def GetDependNode(name):
+    selectionList = om.MSelectionList()
+    selectionList.add(name)
+    return selectionList.getDependNode(0)
+
+def GetDagPath(name):
+    selectionList = om.MSelectionList()
+    selectionList.add(name)
+    return selectionList.getDagPath(0)
+
+def HashValues(hasher, *values):
+    hasher.update(repr(values).encode("utf-8"))
+
+def GetRestShape(mesh):
+    # the orig shape of a deformed mesh: its points do not move when the joints are posed
+    shapes = mc.listRelatives(mesh, s = True, type = "mesh", f = True) or []
+    for shape in shapes:
+        if mc.getAttr(shape + ".intermediateObject") and not mc.listConnections(shape + ".inMesh", s = True, d = False):
+            return shape
+    return mc.listRelatives(mesh, s = True, type = "mesh", ni = True, f = True)[0]
+
+def GetFramesToSample(clips):
+    # the union of all the clip ranges, overlapping frames are only evaluated once
+    frames = set()
+    for clip in clips:
+        frames.update(range(clip.frameStart, clip.frameEnd + 1))
+    return sorted(frames)
+
+
+def ReduceLinearKeys(values, tolerance):
+    # Douglas-Peucker over one sample per frame: keeps the fewest keys so linear interpolation between
+    # them stays within tolerance of every sample. Returns the indexes to keep and the worst error left.
+    keep = {0, len(values) - 1}
+    worstErrorLeft = 0.0
+    segments = [(0, len(values) - 1)]
+    while segments:
+        first, last = segments.pop()
+        if last - first < 2:
+            continue
+        slope = (values[last] - values[first]) / (last - first)
+        worstIndex = first
+        worstError = 0.0
+        for index in range(first + 1, last):
+            error = abs(values[first] + slope * (index - first) - values[index])
+            if error > worstError:
+                worstIndex, worstError = index, error
+
+        if worstError > tolerance:
+            keep.add(worstIndex)
+            segments.append((first, worstIndex))
+            segments.append((worstIndex, last))
+        else:
+            worstErrorLeft = max(worstErrorLeft, worstError)
+    return sorted(keep), worstErrorLeft
+
+
+class KeyReductionReport:
+    def __init__(self):
+        self.keyCount = 0 # keys a full bake writes
+        self.reducedKeyCount = 0
+        self.staticChannelCount = 0
+        self.maxPositionError = 0.0 # scene units
+        self.maxRotationError = 0.0 # degrees
+
+    def __str__(self):
+        ratio = self.keyCount / max(self.reducedKeyCount, 1)
+        return (f"keys {self.reducedKeyCount}/{self.keyCount} ({ratio:.1f}x smaller), {self.staticChannelCount} static channels, "
+                f"worst error {self.maxPositionError:.4f} position {self.maxRotationError:.4f} degrees")
+
+
+FAST_EVAL_MODES = ("emp+cache", "emp", "ems") # fastest first, the first one maya accepts is used for the bake
+
+SAMPLED_CHANNELS = ("translateX", "translateY", "translateZ", "rotateX", "rotateY", "rotateZ", "scaleX", "scaleY", "scaleZ")
+
+class JointSampleBuffer:
+    # local joint channels sampled once over a set of frames, one array per channel
+    def __init__(self, joints, frames):
+        self.joints = joints # long names
+        self.frames = frames
+        self.frameIndex = {frame: index for index, frame in enumerate(frames)}
+        self.channels = {(jnt, channel): array("d") for jnt in joints for channel in SAMPLED_CHANNELS}
+
+    def Sample(self):
+        for frame in self.SampleSteps():
+            pass
+
+    def SampleSteps(self):
+        # yields every frame once it is sampled, so a caller can report progress or stop in between
+        plugs = []
+        for jnt in self.joints:
+            nodeFn = om.MFnDependencyNode(GetDependNode(jnt))
+            for channel in SAMPLED_CHANNELS:
+                plugs.append((nodeFn.findPlug(channel, False), self.channels[(jnt, channel)]))
+
+        for frame in self.frames:
+            timeContext = om.MDGContext(om.MTime(frame, om.MTime.uiUnit()))
+            with MDGContextGuard(timeContext): # evaluated at the frame, the time slider never moves
+                for plug, values in plugs:
+                    values.append(plug.asDouble())
+            yield frame
+
+    def GetSlice(self, jnt, channel, start, end):
+        # clip ranges are whole, so the frames of a clip are one contiguous run of the buffer
+        values = self.channels[(jnt, channel)]
+        return self.frames[self.frameIndex[start]:self.frameIndex[end] + 1], values[self.frameIndex[start]:self.frameIndex[end] + 1]
+
+
+def GetSrcDir():
+    # the shelf button exec()s this file, so __file__ is not always there
+    if "__file__" in globals():
+        return os.path.dirname(os.path.abspath(__file__))
+    for path in sys.path:
+        if os.path.exists(os.path.join(path, "MayaToUEWorker.py")):
+            return os.path.abspath(path)
+    return ""
+
+
+def GetMayapyPath():
+    mayapyName = "mayapy.exe" if sys.platform == "win32" else "mayapy"
+    return os.path.join(os.environ.get("MAYA_LOCATION", ""), "bin", mayapyName)
+
+
+class MayapyWorkerLauncher:
+    # runs MayaToUEWorker.py in a headless maya (maya.standalone)
+    def __init__(self, mayapyPath = ""):
+        self.mayapyPath = mayapyPath or GetMayapyPath()
+
+    def Launch(self, jobPath):
+        workerScript = os.path.join(GetSrcDir(), "MayaToUEWorker.py")
+        return subprocess.Popen([self.mayapyPath, workerScript, jobPath])
+
+
+class PlaceholderWorkerLauncher:
+    # a stand in worker that only writes placeholder files, to try the pool without maya
+    def __init__(self, pythonPath = "python"):
+        self.pythonPath = pythonPath
+
+    def Launch(self, jobPath):
+        workerScript = os.path.join(GetSrcDir(), "MayaToUEWorker.py")
+        return subprocess.Popen([self.pythonPath, workerScript, jobPath, "--placeholder"])
+
+
+class ParallelClipExporter:
+    def __init__(self, mayaToUE, launcher = None, workerCount = 4, timeout = 3600):
+        self.mayaToUE = mayaToUE
+        self.launcher = launcher or MayapyWorkerLauncher()
+        self.workerCount = max(1, workerCount)
+        self.timeout = timeout # seconds a worker gets before it is killed
+
+    def Export(self, clips = None):
+        if clips is None:
+            clips = self.mayaToUE.GetClipsToExport()
+        if not clips:
+            return []
+
+        workDir = tempfile.mkdtemp(prefix = "MayaToUE_")
+        try:
+            snapshotPath = os.path.join(workDir, "snapshot.mb")
+            mc.file(snapshotPath, exportAll = True, type = "mayaBinary", force = True, preserveReferences = True)
+            os.makedirs(self.mayaToUE.GetAnimFolder(), exist_ok = True)
+
+            workers = []
+            for index in range(self.workerCount):
+                batch = clips[index::self.workerCount] # deal the clips out like cards
+                if not batch:
+                    continue
+                job = {
+                    "scene": snapshotPath,
+                    "spec": self.mayaToUE.GetExportSpec(batch),
+                    "outputs": [{"name": clip.subFix, "path": self.mayaToUE.GetAnimClipSavePath(clip)} for clip in batch],
+                    "resultPath": os.path.join(workDir, f"result_{index}.json"),
+                }
+                jobPath = os.path.join(workDir, f"job_{index}.json")
+                with open(jobPath, "w") as jobFile:
+                    json.dump(job, jobFile)
+                workers.append((self.launcher.Launch(jobPath), job))
+
+            results = []
+            for process, job in workers:
+                results += self.CollectResults(process, job)
+            return results
+        finally:
+            shutil.rmtree(workDir, ignore_errors = True)
+
+    def CollectResults(self, process, job):
+        message = ""
+        try:
+            process.wait(timeout = self.timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            message = "worker timed out"
+
+        if os.path.exists(job["resultPath"]):
+            with open(job["resultPath"]) as resultFile:
+                return [ExportResult.FromDict(resultDict) for resultDict in json.load(resultFile)]
+
+        # the worker died before it could report, every clip it had failed
+        results = []
+        for output in job["outputs"]:
+            result = ExportResult(output["name"], output["path"])
+            result.status = "failed"
+            result.message = message or f"worker exited with code {process.returncode}"
+            results.append(result)
+        return results
+
+
+class ExportQueue(QObject):
+    # Runs queued exports a step at a time from a timer on the main thread (maya commands have to run there),
+    # so the UI stays responsive between steps and the current job can be cancelled between clips.
+    # Between two steps the scene is half changed (root renamed, bake skeleton, evaluation mode and playback range
+    # switched), so saving, opening or starting a new scene is refused while a job runs.
+    jobStarted = Signal(str) # job name
+    progressChanged = Signal(str, str, int, int) # job name, stage, done, total
+    jobFinished = Signal(str, list) # job name, list of ExportResult
+    queueChanged = Signal(int) # number of jobs waiting
+
+    def __init__(self):
+        super().__init__()
+        self.jobs = [] # (name, MayaToUE) waiting to run
+        self.currentName = ""
+        self.currentSteps = None
+        self.currentResults = []
+        self.cancelRequested = False
+        self.sceneChecks = [] # callback ids of the checks refusing scene saves and changes
+        self.timer = QTimer()
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.Step)
+
+    def Enqueue(self, name, mayaToUE):
+        self.jobs.append((name, mayaToUE))
+        self.queueChanged.emit(len(self.jobs))
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def Cancel(self):
+        self.cancelRequested = True
+
+    def IsBusy(self):
+        return self.currentSteps is not None or bool(self.jobs)
+
+    def Step(self):
+        if self.currentSteps is None:
+            if not self.jobs:
+                self.timer.stop()
+                return
+            self.currentName, mayaToUE = self.jobs.pop(0)
+            self.currentResults = []
+            self.currentSteps = mayaToUE.SaveFilesSteps(self.currentResults)
+            self.cancelRequested = False
+            self.BlockSceneChanges()
+            self.queueChanged.emit(len(self.jobs))
+            self.jobStarted.emit(self.currentName)
+
+        if self.cancelRequested:
+            self.currentSteps.close()
+            self.FinishCurrentJob()
+            return
+
+        try:
+            stage, done, total = next(self.currentSteps)
+            self.progressChanged.emit(self.currentName, stage, done, total)
+        except StopIteration:
+            self.FinishCurrentJob()
+        except Exception as e:
+            result = ExportResult(self.currentName, "")
+            result.status = "failed"
+            result.message = str(e)
+            self.currentResults.append(result)
+            self.FinishCurrentJob()
+
+    def FinishCurrentJob(self):
+        self.currentSteps = None
+        self.AllowSceneChanges() # the steps put the scene back when they ended or were closed
+        self.jobFinished.emit(self.currentName, self.currentResults)
+
+    def BlockSceneChanges(self):
+        checks = (om.MSceneMessage.kBeforeSaveCheck, om.MSceneMessage.kBeforeNewCheck, om.MSceneMessage.kBeforeOpenCheck)
+        self.sceneChecks = [om.MSceneMessage.addCheckCallback(check, self.RejectSceneChange) for check in checks]
+
+    def AllowSceneChanges(self):
+        om.MMessage.removeCallbacks(self.sceneChecks)
+        self.sceneChecks = []
+
+    def RejectSceneChange(self, *args):
+        mc.warning(f"MayaToUE is exporting {self.currentName}, wait for it to finish or cancel it first")
+        return False # refuses the save, new or open
 
 
 class MayaToUE:
@@ -20,6 +372,16 @@ class MayaToUE:
         self.fileName = ""
         self.animations = []
         self.saveDir = ""
+        self.skipUnchanged = False # only export outputs whose fingerprint changed since the last export
+        self.bakeOnce = False # sample the union of the clip ranges once and write every clip from that
+        self.bakeSkeletonSuffix = "_MayaToUEOrig"
+        self.reduceKeys = False # drop static channels and reduce the rest before export, needs the sample buffer
+        self.positionTolerance = 0.01 # scene units
+        self.rotationTolerance = 0.1 # degrees
+        self.scaleTolerance = 0.001
+        self.fastEval = True # switch to the fastest evaluation mode while the clips bake
+        self.lastEvalMode = "" # the mode the last clip export ran under
+        self.compareClipExport = False # also export every clip with the meshes, to report what leaving them out saves
 
     def SetSaveDir(self, newSaveDir):
         self.saveDir = newSaveDir
@@ -88,28 +450,96 @@ class MayaToUE:
         self.meshes = meshes 
         return True, ""
     
-    def SaveFiles(self):
-        childrenJnts = mc.listRelatives(self.rootJnt, c = True, ad=True, type = "joint")
-        allJnts = [self.rootJnt] + childrenJnts
-        objectsToExport = allJnts + list(self.meshes)
-
-        mc.select(objectsToExport, r = True)
+    def Copy(self):
+        # a detached copy for the export queue, the widget can move on to the next character
+        copy = MayaToUE()
+        copy.LoadExportSpec(self.GetExportSpec())
+        copy.skipUnchanged = self.skipUnchanged
+        return copy
+
+    def GetClipsToExport(self):
+        return [anim for anim in self.animations if anim.shouldExport]
+
+    def GetExportSpec(self, clips = None):
+        # everything a headless worker needs to export without the widget
+        if clips is None:
+            clips = self.animations
+        return {
+            "rootJnt": self.rootJnt,
+            "meshes": sorted(self.meshes),
+            "fileName": self.fileName,
+            "saveDir": self.saveDir,
+            "animations": [clip.ToDict() for clip in clips],
+            "bakeOnce": self.bakeOnce,
+            "reduceKeys": self.reduceKeys,
+            "positionTolerance": self.positionTolerance,
+            "rotationTolerance": self.rotationTolerance,
+            "scaleTolerance": self.scaleTolerance,
+            "compareClipExport": self.compareClipExport,
+            "fastEval": self.fastEval,
+        }
+
+    def LoadExportSpec(self, spec):
+        self.rootJnt = spec["rootJnt"]
+        self.meshes = set(spec["meshes"])
+        self.fileName = spec["fileName"]
+        self.saveDir = spec["saveDir"]
+        self.animations = []
+        for clipDict in spec["animations"]:
+            self.AddAnimClip().LoadDict(clipDict)
+        self.bakeOnce = spec.get("bakeOnce", False)
+        self.reduceKeys = spec.get("reduceKeys", False)
+        self.positionTolerance = spec.get("positionTolerance", self.positionTolerance)
+        self.rotationTolerance = spec.get("rotationTolerance", self.rotationTolerance)
+        self.scaleTolerance = spec.get("scaleTolerance", self.scaleTolerance)
+        self.compareClipExport = spec.get("compareClipExport", False)
+        self.fastEval = spec.get("fastEval", True)
+
+    def GetAllExportJnts(self):
+        childrenJnts = mc.listRelatives(self.rootJnt, c = True, ad=True, type = "joint") or []
+        return [self.rootJnt] + childrenJnts
+
+    def ExportSkeletalMesh(self):
         skeletalMeshSavePath = self.GetSkeletalMeshSavePath()
+        def Export():
+            objectsToExport = self.GetAllExportJnts() + list(self.meshes)
+            mc.select(objectsToExport, r = True)
 
-        mc.FBXResetExport()
-        mc.FBXExportSmoothingGroups('-v', True)
-        mc.FBXExportInputConnections('-v', False)
+            mc.FBXResetExport()
+            mc.FBXExportSmoothingGroups('-v', True)
+            mc.FBXExportInputConnections('-v', False)
 
-        mc.FBXExport('-f', skeletalMeshSavePath, '-s', True, '-ea', False)
+            mc.FBXExport('-f', skeletalMeshSavePath, '-s', True, '-ea', False)
 
-        if not self.animations:
-            return
-        
+        return RunExport(ExportResult("mesh", skeletalMeshSavePath), Export)
+
+    def PrepareAnimExport(self):
         os.makedirs(self.GetAnimFolder(), exist_ok= True)
+        mc.FBXResetExport() # same settings as the mesh export, a worker never exported the mesh
+        mc.FBXExportSmoothingGroups('-v', True)
+        mc.FBXExportInputConnections('-v', False)
         mc.FBXExportBakeComplexAnimation('-v', True)
-        for anim in self.animations:
-            
-            animsavePath = self.GetAnimClipSavePath(anim)
+
+    def ExportAnimClip(self, anim: AnimClip):
+        # only the joints and their animation, the mesh is in the skeletal mesh file already
+        animsavePath = self.GetAnimClipSavePath(anim)
+        result = self.ExportAnimClipTo(anim, animsavePath, self.GetAllExportJnts())
+        if self.compareClipExport and result.status == "ok":
+            # export it again the old way (joints and meshes) to see what leaving the mesh out saves,
+            # to a file of its own so parallel workers exporting the same clip name do not share it
+            fileHandle, withMeshPath = tempfile.mkstemp(suffix = ".fbx", prefix = anim.subFix + "_")
+            os.close(fileHandle)
+            withMeshResult = self.ExportAnimClipTo(anim, withMeshPath, self.GetAllExportJnts() + list(self.meshes))
+            result.message = (f"{result.size} bytes in {result.duration:.2f}s, "
+                              f"with mesh {withMeshResult.size} bytes in {withMeshResult.duration:.2f}s")
+            if os.path.exists(withMeshPath):
+                os.remove(withMeshPath)
+        return result
+
+    def ExportAnimClipTo(self, anim: AnimClip, animsavePath, objectsToExport):
+        def Export():
+            mc.select(objectsToExport, r = True)
+
             startFrame = anim.frameStart
             endFrame = anim.frameEnd
 
@@ -119,9 +549,339 @@ class MayaToUE:
 
             mc.playbackOptions(e = True, min = startFrame, max = endFrame)
             mc.FBXExport('-f', animsavePath, '-s', True, '-ea', True)
-            
 
-    
+        return RunExport(ExportResult(anim.subFix, animsavePath), Export)
+
+    def GetSkeletonFingerprint(self):
+        # skeleton hierarchy and bind pose
+        hasher = hashlib.sha1()
+        for jnt in self.GetAllExportJnts():
+            HashValues(hasher, jnt, mc.listRelatives(jnt, p = True), mc.getAttr(jnt + ".jointOrient"), mc.getAttr(jnt + ".bindPose"))
+        return hasher.hexdigest()
+
+    def GetMeshFingerprint(self, skeletonFingerprint):
+        # the skeleton, the rest shape of the mesh and skin weights, so posing the rig does not change it
+        hasher = hashlib.sha1()
+        HashValues(hasher, skeletonFingerprint)
+
+        for mesh in sorted(self.meshes):
+            shape = mc.listRelatives(mesh, s = True, type = "mesh", ni = True)[0]
+            meshFn = om.MFnMesh(GetDagPath(GetRestShape(mesh)))
+            polyCounts, polyConnects = meshFn.getVertices()
+            points = meshFn.getPoints(om.MSpace.kObject)
+            HashValues(hasher, mesh, meshFn.numVertices)
+            hasher.update(array("i", polyCounts).tobytes())
+            hasher.update(array("i", polyConnects).tobytes())
+            hasher.update(array("d", [value for point in points for value in (point.x, point.y, point.z)]).tobytes())
+
+            for skin in mc.ls(mc.listHistory(mesh) or [], type = "skinCluster"):
+                HashValues(hasher, mc.skinCluster(skin, q = True, inf = True))
+                vertComponent = om.MFnSingleIndexedComponent()
+                vertComponentObj = vertComponent.create(om.MFn.kMeshVertComponent)
+                vertComponent.setCompleteData(meshFn.numVertices)
+                weights, influenceCount = oma.MFnSkinCluster(GetDependNode(skin)).getWeights(GetDagPath(shape), vertComponentObj)
+                hasher.update(array("d", weights).tobytes())
+
+        return hasher.hexdigest()
+
+    def GetCurveKeys(self):
+        # every key of every anim curve driving the joints, queried once per export for all the clips:
+        # list of (curve, key times, keys as (time, value, tangents...), (pre infinity, post infinity))
+        curveTypes = ["animCurveTL", "animCurveTA", "animCurveTU", "animCurveTT"]
+        curveKeys = []
+        for curve in sorted(set(mc.ls(mc.listHistory(self.GetAllExportJnts()) or [], type = curveTypes))):
+            timesAndValues = mc.keyframe(curve, q = True, tc = True, vc = True) or []
+            tangents = [mc.keyTangent(curve, q = True, **{tangentFlag: True}) or [] for tangentFlag in ("itt", "ott", "ia", "oa", "iw", "ow")]
+            times = timesAndValues[0::2]
+            keys = list(zip(times, timesAndValues[1::2], *tangents))
+            infinity = (mc.getAttr(curve + ".preInfinity"), mc.getAttr(curve + ".postInfinity"))
+            curveKeys.append((curve, times, keys, infinity))
+        return curveKeys
+
+    def GetClipFingerprint(self, clip: AnimClip, skeletonFingerprint, curveKeys):
+        # frame range, subfix and every anim curve driving the joints inside that range
+        hasher = hashlib.sha1()
+        HashValues(hasher, clip.frameStart, clip.frameEnd, clip.subFix, skeletonFingerprint)
+        HashValues(hasher, self.UseSampleBuffer(), self.reduceKeys, self.positionTolerance, self.rotationTolerance, self.scaleTolerance)
+        for curve, times, keys, infinity in curveKeys:
+            # the keys in the range and the closest one on each side, the ones outside still shape the curve inside it
+            first = max(bisect.bisect_left(times, clip.frameStart) - 1, 0)
+            last = bisect.bisect_right(times, clip.frameEnd) + 1
+            HashValues(hasher, curve, infinity, keys[first:last])
+
+        return hasher.hexdigest()
+
+    def GetManifestPath(self):
+        return os.path.normpath(os.path.join(self.saveDir, "MayaToUE_manifest.json"))
+
+    def LoadManifest(self):
+        if not os.path.exists(self.GetManifestPath()):
+            return {}
+        with open(self.GetManifestPath()) as manifestFile:
+            return json.load(manifestFile)
+
+    def SaveManifest(self, manifest):
+        os.makedirs(self.saveDir, exist_ok = True)
+        with open(self.GetManifestPath(), "w") as manifestFile:
+            json.dump(manifest, manifestFile, indent = 4, sort_keys = True)
+
+    def GetExportReason(self, manifest, path, fingerprint):
+        if not os.path.exists(path):
+            return "file missing"
+        key = os.path.relpath(path, self.saveDir)
+        if key not in manifest:
+            return "not in manifest"
+        if manifest[key] != fingerprint:
+            return "fingerprint changed"
+        return "" # up to date
+
+    def MakeSkippedResult(self, name, path):
+        result = ExportResult(name, path)
+        result.status = "skipped"
+        result.message = "unchanged, fingerprint matches the manifest"
+        result.size = os.path.getsize(path)
+        return result
+
+    def RecordExport(self, manifest, result, fingerprint, reason):
+        key = os.path.relpath(result.path, self.saveDir)
+        if result.status == "ok" and fingerprint is not None:
+            manifest[key] = fingerprint
+            result.message = reason + (", " + result.message if result.message else "")
+        else:
+            manifest.pop(key, None) # export it again next time, or no fingerprint was taken (skipUnchanged is off)
+
+    def ExportIfChanged(self, manifest, name, path, getFingerprint, exportFunc):
+        # fingerprints scan the scene, they are only taken when they can skip an export
+        fingerprint, reason = None, ""
+        if self.skipUnchanged:
+            fingerprint = getFingerprint()
+            reason = self.GetExportReason(manifest, path, fingerprint)
+            if not reason:
+                return self.MakeSkippedResult(name, path)
+
+        result = exportFunc()
+        self.RecordExport(manifest, result, fingerprint, reason)
+        return result
+
+    def ExportClips(self, clips):
+        return [result for stage, result in self.ExportClipsSteps(clips) if result]
+
+    def ExportClipsSteps(self, clips):
+        # yields (stage, result) after every piece of work, result is None for steps that do not write a file
+        if not clips:
+            return
+
+        # the managers put the user's evaluation mode and playback options back, even on an error or a cancel
+        emManager = emModeManager()
+        with emManager, PlaybackOptionsManager():
+            self.lastEvalMode = self.SetFastEvalMode(emManager) if self.fastEval else "current"
+            for stage, result in self.ExportClipsInCurrentModeSteps(clips):
+                if result:
+                    evalNote = "eval " + self.lastEvalMode # the time is already in result.duration
+                    result.message = evalNote + (", " + result.message if result.message else "")
+                yield stage, result
+
+    def SetFastEvalMode(self, emManager):
+        for mode in FAST_EVAL_MODES:
+            try:
+                emManager.setMode(mode)
+                return mode
+            except (SyntaxError, RuntimeError): # evaluator or plugin not available in this maya
+                continue
+        return "current"
+
+    def ExportClipsInCurrentModeSteps(self, clips):
+        if self.UseSampleBuffer():
+            yield from self.ExportAnimClipsFromBufferSteps(clips)
+            return
+
+        self.PrepareAnimExport()
+        for anim in clips:
+            yield "clip " + anim.subFix, self.ExportAnimClip(anim)
+
+    def UseSampleBuffer(self):
+        return self.bakeOnce or self.reduceKeys # the reduction works on the sampled channels
+
+    def CountExportSteps(self, clips):
+        if self.UseSampleBuffer():
+            return len(clips) + len(GetFramesToSample(clips))
+        return len(clips)
+
+    def CreateBakeSkeleton(self):
+        # An unconstrained copy of the skeleton with the same names, the sampled keys go on it.
+        # The original root is renamed while the copy exists, RemoveBakeSkeleton puts it back.
+        originalRoot = mc.rename(self.rootJnt, self.rootJnt + self.bakeSkeletonSuffix)
+        bakeRoot = mc.rename(mc.duplicate(originalRoot)[0], self.rootJnt)
+        for child in mc.listRelatives(bakeRoot, ad = True, f = True) or []:
+            if mc.objExists(child) and mc.objectType(child) != "joint":
+                mc.delete(child) # constraints and meshes that came along with the copy
+
+        originalRootPath = mc.ls(originalRoot, l = True)[0]
+        bakeRootPath = mc.ls(bakeRoot, l = True)[0]
+        originalJnts = [originalRootPath] + (mc.listRelatives(originalRootPath, ad = True, type = "joint", f = True) or [])
+        jntMap = {jnt: bakeRootPath + jnt[len(originalRootPath):] for jnt in originalJnts} # original -> copy
+        return originalRoot, jntMap
+
+    def RemoveBakeSkeleton(self, originalRoot):
+        if mc.objExists(self.rootJnt):
+            mc.delete(self.rootJnt)
+        mc.rename(originalRoot, self.rootJnt)
+
+    def GetChannelTolerance(self, channel):
+        # in internal units, the same units the sampled values are in
+        if channel.startswith("rotate"):
+            return math.radians(self.rotationTolerance)
+        if channel.startswith("scale"):
+            return self.scaleTolerance
+        return om.MDistance(self.positionTolerance, om.MDistance.uiUnit()).asCentimeters()
+
+    def WriteClipKeys(self, buffer: JointSampleBuffer, jntMap, anim: AnimClip):
+        mc.cutKey(list(jntMap.values()), clear = True) # the keys of the previous clip
+        report = KeyReductionReport()
+        for jnt, bakeJnt in jntMap.items():
+            nodeFn = om.MFnDependencyNode(GetDependNode(bakeJnt))
+            for channel in SAMPLED_CHANNELS:
+                frames, values = buffer.GetSlice(jnt, channel, anim.frameStart, anim.frameEnd)
+                plug = nodeFn.findPlug(channel, False)
+                report.keyCount += len(values)
+                keepIndexes = range(len(values))
+                worstError = 0.0
+                if self.reduceKeys:
+                    tolerance = self.GetChannelTolerance(channel)
+                    if max(values) - min(values) <= tolerance: # static channel, no curve at all
+                        plug.setDouble((max(values) + min(values)) / 2)
+                        report.staticChannelCount += 1
+                        worstError = (max(values) - min(values)) / 2
+                        keepIndexes = []
+                    else:
+                        keepIndexes, worstError = ReduceLinearKeys(values, tolerance)
+
+                if channel.startswith("rotate"):
+                    report.maxRotationError = max(report.maxRotationError, math.degrees(worstError))
+                elif channel.startswith("translate"):
+                    report.maxPositionError = max(report.maxPositionError, om.MDistance(worstError).asUnits(om.MDistance.uiUnit()))
+                if not keepIndexes:
+                    continue
+
+                report.reducedKeyCount += len(keepIndexes)
+                curveFn = oma.MFnAnimCurve()
+                curveFn.create(plug)
+                times = om.MTimeArray([om.MTime(frames[index], om.MTime.uiUnit()) for index in keepIndexes])
+                curveFn.addKeys(times, [values[index] for index in keepIndexes], oma.MFnAnimCurve.kTangentLinear, oma.MFnAnimCurve.kTangentLinear)
+        return report
+
+    def ExportAnimClipsFromBufferSteps(self, clips):
+        # bake once, slice many: evaluate the union of the clip ranges one time,
+        # then write every clip from its slice of the samples onto a copy of the skeleton.
+        # compareClipExport does not apply here, the meshes stay skinned to the original skeleton, not the copy.
+        os.makedirs(self.GetAnimFolder(), exist_ok = True)
+        originalRoot, jntMap = self.CreateBakeSkeleton()
+        try:
+            buffer = JointSampleBuffer(list(jntMap.keys()), GetFramesToSample(clips))
+            for frame in buffer.SampleSteps():
+                yield f"sampling frame {frame}", None
+
+            mc.FBXResetExport()
+            mc.FBXExportInputConnections('-v', False)
+            mc.FBXExportBakeComplexAnimation('-v', False) # the keys are already baked
+            for anim in clips:
+                animsavePath = self.GetAnimClipSavePath(anim)
+                reports = []
+                def Export(anim = anim, animsavePath = animsavePath):
+                    reports.append(self.WriteClipKeys(buffer, jntMap, anim))
+                    mc.select(list(jntMap.values()), r = True) # joints only, the meshes are skinned to the original
+                    mc.playbackOptions(e = True, min = anim.frameStart, max = anim.frameEnd)
+                    mc.FBXExport('-f', animsavePath, '-s', True, '-ea', True)
+
+                result = RunExport(ExportResult(anim.subFix, animsavePath), Export)
+                if self.reduceKeys and reports:
+                    result.message = str(reports[0])
+                yield "clip " + anim.subFix, result
+        finally:
+            self.RemoveBakeSkeleton(originalRoot)
+
+    def GetClipsThatChanged(self, manifest, skeletonFingerprint, results):
+        # clips that need an export, with their (fingerprint, reason) by save path; skipped ones go to results
+        clipsToExport = []
+        clipFingerprints = {}
+        curveKeys = self.GetCurveKeys() if self.skipUnchanged else []
+        for anim in self.GetClipsToExport():
+            path = self.GetAnimClipSavePath(anim)
+            if not self.skipUnchanged:
+                clipsToExport.append(anim)
+                clipFingerprints[path] = (None, "")
+                continue
+            clipFingerprint = self.GetClipFingerprint(anim, skeletonFingerprint, curveKeys)
+            reason = self.GetExportReason(manifest, path, clipFingerprint)
+            if self.skipUnchanged and not reason:
+                results.append(self.MakeSkippedResult(anim.subFix, path))
+                continue
+            clipsToExport.append(anim)
+            clipFingerprints[path] = (clipFingerprint, reason)
+        return clipsToExport, clipFingerprints
+
+    def SaveFiles(self):
+        results = []
+        for progress in self.SaveFilesSteps(results):
+            pass
+        return results
+
+    def SaveFilesSteps(self, results):
+        # Generator version of SaveFiles, yields (stage, done, total) after every piece of work.
+        # Closing it stops the export between two steps, the clips that did not run are reported as cancelled.
+        manifest = self.LoadManifest()
+        skeletonFingerprint = self.GetSkeletonFingerprint() if self.skipUnchanged else None
+        skippedResults = []
+        clipsToExport, clipFingerprints = self.GetClipsThatChanged(manifest, skeletonFingerprint, skippedResults)
+        total = 1 + self.CountExportSteps(clipsToExport)
+        done = 0
+        try:
+            results.append(self.ExportIfChanged(manifest, "mesh", self.GetSkeletalMeshSavePath(), lambda: self.GetMeshFingerprint(skeletonFingerprint), self.ExportSkeletalMesh))
+            results += skippedResults
+            done += 1
+            yield "mesh", done, total
+
+            for stage, result in self.ExportClipsSteps(clipsToExport):
+                if result:
+                    clipFingerprint, reason = clipFingerprints[result.path]
+                    self.RecordExport(manifest, result, clipFingerprint, reason)
+                    results.append(result)
+                done += 1
+                yield stage, done, total
+        except GeneratorExit:
+            finishedPaths = {result.path for result in results}
+            for anim in clipsToExport:
+                if self.GetAnimClipSavePath(anim) not in finishedPaths:
+                    result = ExportResult(anim.subFix, self.GetAnimClipSavePath(anim))
+                    result.status = "cancelled"
+                    results.append(result)
+            raise
+        finally:
+            self.SaveManifest(manifest) # keep what was exported before a cancel or an error
+
+    def PushToUnreal(self, results, unrealLink):
+        # one import command for everything this export wrote, skipped files are already in unreal
+        written = [result for result in results if result.status == "ok"]
+        animPaths = [result.path for result in written if result.name != "mesh"]
+        importMesh = any(result.name == "mesh" for result in written)
+        if not importMesh and not animPaths:
+            return None
+        return unrealLink.ImportFiles(self.GetSkeletalMeshSavePath(), animPaths, importMesh)
+
+    def SaveFilesParallel(self, launcher = None, workerCount = 4):
+        # the mesh is quick, the clips are sent to a pool of headless maya workers
+        manifest = self.LoadManifest()
+        skeletonFingerprint = self.GetSkeletonFingerprint() if self.skipUnchanged else None
+        results = [self.ExportIfChanged(manifest, "mesh", self.GetSkeletalMeshSavePath(), lambda: self.GetMeshFingerprint(skeletonFingerprint), self.ExportSkeletalMesh)]
+
+        clipsToExport, clipFingerprints = self.GetClipsThatChanged(manifest, skeletonFingerprint, results)
+        for result in ParallelClipExporter(self, launcher, workerCount).Export(clipsToExport):
+            clipFingerprint, reason = clipFingerprints[result.path]
+            self.RecordExport(manifest, result, clipFingerprint, reason)
+            results.append(result)
+
+        self.SaveManifest(manifest)
+        return results
 
         
 class AnimEntry(QWidget):
@@ -254,10 +1014,178 @@ class MayaToUEWidget(QWidget):
         self.savePreviewLabel = QLabel()
         self.masterLayout.addWidget(self.savePreviewLabel)
 
+        self.skipUnchangedBox = QCheckBox("Skip Unchanged Files")
+        self.skipUnchangedBox.setChecked(self.MayaToUE.skipUnchanged)
+        self.skipUnchangedBox.toggled.connect(self.SkipUnchangedToggled)
+        self.masterLayout.addWidget(self.skipUnchangedBox)
+
+        self.bakeOnceBox = QCheckBox("Bake Once for All Clips")
+        self.bakeOnceBox.setChecked(self.MayaToUE.bakeOnce)
+        self.bakeOnceBox.toggled.connect(self.BakeOnceToggled)
+        self.masterLayout.addWidget(self.bakeOnceBox)
+
+        self.reduceKeysLayout = QHBoxLayout()
+        self.masterLayout.addLayout(self.reduceKeysLayout)
+        self.reduceKeysBox = QCheckBox("Reduce Keys")
+        self.reduceKeysBox.setChecked(self.MayaToUE.reduceKeys)
+        self.reduceKeysBox.toggled.connect(self.ReduceKeysToggled)
+        self.reduceKeysLayout.addWidget(self.reduceKeysBox)
+        self.reduceKeysLayout.addWidget(QLabel("Position Tol: "))
+        self.positionToleranceLineEdit = QLineEdit(str(self.MayaToUE.positionTolerance))
+        self.positionToleranceLineEdit.setValidator(QDoubleValidator(0, 100, 4))
+        self.positionToleranceLineEdit.textChanged.connect(self.PositionToleranceChanged)
+        self.reduceKeysLayout.addWidget(self.positionToleranceLineEdit)
+        self.reduceKeysLayout.addWidget(QLabel("Rotation Tol: "))
+        self.rotationToleranceLineEdit = QLineEdit(str(self.MayaToUE.rotationTolerance))
+        self.rotationToleranceLineEdit.setValidator(QDoubleValidator(0, 180, 4))
+        self.rotationToleranceLineEdit.textChanged.connect(self.RotationToleranceChanged)
+        self.reduceKeysLayout.addWidget(self.rotationToleranceLineEdit)
+
+        self.fastEvalBox = QCheckBox("Fast Evaluation While Exporting Clips")
+        self.fastEvalBox.setChecked(self.MayaToUE.fastEval)
+        self.fastEvalBox.toggled.connect(self.FastEvalToggled)
+        self.masterLayout.addWidget(self.fastEvalBox)
+
+        self.compareClipExportBox = QCheckBox("Compare Clip Size/Time with Mesh Included")
+        self.compareClipExportBox.setChecked(self.MayaToUE.compareClipExport)
+        self.compareClipExportBox.toggled.connect(self.CompareClipExportToggled)
+        self.masterLayout.addWidget(self.compareClipExportBox)
+        self.UpdateCompareClipExportBox()
+
+        self.unrealLayout = QHBoxLayout()
+        self.masterLayout.addLayout(self.unrealLayout)
+        self.pushToUnrealBox = QCheckBox("Import into Unreal After Saving")
+        self.unrealLayout.addWidget(self.pushToUnrealBox)
+        self.unrealNodeComboBox = QComboBox() # the editors found, empty means the first one that answers
+        self.unrealLayout.addWidget(self.unrealNodeComboBox)
+        findUnrealBtn = QPushButton("Find Editors")
+        findUnrealBtn.clicked.connect(self.FindUnrealBtnClicked)
+        self.unrealLayout.addWidget(findUnrealBtn)
+        connectUnrealBtn = QPushButton("Connect")
+        connectUnrealBtn.clicked.connect(self.ConnectUnrealBtnClicked)
+        self.unrealLayout.addWidget(connectUnrealBtn)
+        self.unrealStatusLabel = QLabel("connected to " + GetUnrealLink().nodeId if GetUnrealLink().IsConnected() else "not connected")
+        self.unrealLayout.addWidget(self.unrealStatusLabel)
+
         saveBth = QPushButton("Save Files")
-        saveBth.clicked.connect(self.MayaToUE.SaveFiles)
+        saveBth.clicked.connect(self.SaveFilesBtnClicked)
         self.masterLayout.addWidget(saveBth)
 
+        self.exportQueue = ExportQueue()
+        self.exportQueue.jobStarted.connect(self.ExportJobStarted)
+        self.exportQueue.progressChanged.connect(self.ExportProgressChanged)
+        self.exportQueue.jobFinished.connect(self.ExportJobFinished)
+        self.exportQueue.queueChanged.connect(self.ExportQueueChanged)
+
+        self.progressLayout = QHBoxLayout()
+        self.masterLayout.addLayout(self.progressLayout)
+        self.exportProgressBar = QProgressBar()
+        self.progressLayout.addWidget(self.exportProgressBar)
+        cancelExportBtn = QPushButton("Cancel")
+        cancelExportBtn.clicked.connect(self.exportQueue.Cancel)
+        self.progressLayout.addWidget(cancelExportBtn)
+        self.exportStatusLabel = QLabel("")
+        self.masterLayout.addWidget(self.exportStatusLabel)
+
+        self.parallelLayout = QHBoxLayout()
+        self.masterLayout.addLayout(self.parallelLayout)
+        self.parallelLayout.addWidget(QLabel("Workers: "))
+        self.workerCountLineEdit = QLineEdit("4")
+        self.workerCountLineEdit.setValidator(QIntValidator(1, 64))
+        self.workerCountLineEdit.setFixedWidth(40)
+        self.parallelLayout.addWidget(self.workerCountLineEdit)
+        saveParallelBtn = QPushButton("Save Files in Parallel")
+        saveParallelBtn.clicked.connect(self.SaveFilesParallelBtnClicked)
+        self.parallelLayout.addWidget(saveParallelBtn)
+
+    def FindUnrealBtnClicked(self):
+        self.unrealNodeComboBox.clear()
+        for node in GetUnrealLink().GetNodes():
+            self.unrealNodeComboBox.addItem(f"{node.get('project_name', '?')} on {node.get('machine', '?')}", node["node_id"])
+
+    def ConnectUnrealBtnClicked(self):
+        try:
+            nodeId = GetUnrealLink().Connect(self.unrealNodeComboBox.currentData() or "")
+            self.unrealStatusLabel.setText("connected to " + nodeId)
+        except Exception as e:
+            self.unrealStatusLabel.setText("not connected")
+            QMessageBox().critical(self, "Error", str(e))
+
+    def PushToUnreal(self, results):
+        if not self.pushToUnrealBox.isChecked():
+            return
+        try:
+            self.MayaToUE.PushToUnreal(results, GetUnrealLink())
+            self.unrealStatusLabel.setText("imported into " + GetUnrealLink().nodeId)
+        except Exception as e:
+            QMessageBox().critical(self, "Error", "Unreal import failed: " + str(e))
+
+    def FastEvalToggled(self, checked):
+        self.MayaToUE.fastEval = checked
+
+    def CompareClipExportToggled(self, checked):
+        self.MayaToUE.compareClipExport = checked
+
+    def ReduceKeysToggled(self, checked):
+        self.MayaToUE.reduceKeys = checked
+        self.UpdateCompareClipExportBox()
+
+    def PositionToleranceChanged(self):
+        if self.positionToleranceLineEdit.hasAcceptableInput():
+            self.MayaToUE.positionTolerance = float(self.positionToleranceLineEdit.text())
+
+    def RotationToleranceChanged(self):
+        if self.rotationToleranceLineEdit.hasAcceptableInput():
+            self.MayaToUE.rotationTolerance = float(self.rotationToleranceLineEdit.text())
+
+    def BakeOnceToggled(self, checked):
+        self.MayaToUE.bakeOnce = checked
+        self.UpdateCompareClipExportBox()
+
+    def UpdateCompareClipExportBox(self):
+        # the sampled export writes its keys on a copy of the skeleton, the meshes do not follow it
+        canCompare = not self.MayaToUE.UseSampleBuffer()
+        if not canCompare:
+            self.compareClipExportBox.setChecked(False)
+        self.compareClipExportBox.setEnabled(canCompare)
+
+    def SkipUnchangedToggled(self, checked):
+        self.MayaToUE.skipUnchanged = checked
+
+    def SaveFilesBtnClicked(self):
+        self.exportQueue.Enqueue(self.MayaToUE.fileName, self.MayaToUE.Copy())
+
+    def ExportJobStarted(self, jobName):
+        # the widget stays usable to set up and queue the next character, the queue's check callbacks guard the scene
+        self.exportProgressBar.setMaximum(0) # busy until the first step reports
+        self.exportStatusLabel.setText(f"Exporting {jobName}")
+
+    def ExportProgressChanged(self, jobName, stage, done, total):
+        self.exportProgressBar.setMaximum(total)
+        self.exportProgressBar.setValue(done)
+        self.exportStatusLabel.setText(f"{jobName}: {stage} ({done}/{total})")
+
+    def ExportQueueChanged(self, waitingCount):
+        self.exportStatusLabel.setText(f"{waitingCount} export(s) waiting")
+
+    def ExportJobFinished(self, jobName, results):
+        self.exportProgressBar.setMaximum(max(self.exportProgressBar.maximum(), 1)) # out of busy when no step reported
+        self.exportStatusLabel.setText(f"{jobName}: done")
+        self.ShowExportResults(results)
+        self.PushToUnreal(results)
+
+    def SaveFilesParallelBtnClicked(self):
+        workerCount = int(self.workerCountLineEdit.text()) if self.workerCountLineEdit.text() else 1
+        results = self.MayaToUE.SaveFilesParallel(workerCount = workerCount)
+        self.ShowExportResults(results)
+        self.PushToUnreal(results)
+
+    def ShowExportResults(self, results):
+        report = "\n".join(str(result) for result in results)
+        print(report)
+        if any(result.status == "failed" for result in results):
+            QMessageBox().warning(self, "Warning", report)
+
     def UpdateSavePreview(self):
         previewText = ""
         skeletalMeshFilePath = self.MayaToUE.GetSkeletalMeshSavePath()
@@ -324,7 +1252,8 @@ class MayaToUEWidget(QWidget):
         
 
 
-mayaToUEWidget = MayaToUEWidget()
+if __name__ == "__main__": # only when run from the shelf, so workers can import the export logic
+    mayaToUEWidget = MayaToUEWidget()
 
-mayaToUEWidget.show()
+    mayaToUEWidget.show()
 
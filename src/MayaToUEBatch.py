@@ -0,0 +1,192 @@
+# Batch export many scenes with MayaToUE, without the widget:
+#   python MayaToUEBatch.py scenes/ --spec spec.json --workers 8 --manifest nightly.json
+#
+# The spec file gives the MayaToUE export spec (rootJnt, meshes, fileName, saveDir, animations) per scene:
+#   {"default": {...}, "scenes": {"hero_walk.mb": {...}}}
+# A scene spec is looked up by file name, then by path, then "default" is used. An empty fileName
+# becomes the scene's name and "{scene}" in saveDir is replaced with it.
+#
+# Every scene runs in its own headless maya (MayaToUEWorker.py), N at a time. The manifest records
+# each scene's state after every change, so running the same command again after a crash or a
+# Ctrl+C only exports the scenes that are not done yet.
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+SCENE_EXTENSIONS = (".ma", ".mb")
+
+
+def GetMayapyPath():
+    mayapyName = "mayapy.exe" if sys.platform == "win32" else "mayapy"
+    return os.path.join(os.environ.get("MAYA_LOCATION", ""), "bin", mayapyName)
+
+
+def FindScenes(paths):
+    scenes = []
+    for path in paths:
+        if os.path.isdir(path):
+            for fileName in sorted(os.listdir(path)):
+                if fileName.lower().endswith(SCENE_EXTENSIONS):
+                    scenes.append(os.path.abspath(os.path.join(path, fileName)))
+        elif path.lower().endswith(SCENE_EXTENSIONS):
+            scenes.append(os.path.abspath(path))
+    return scenes
+
+
+def GetSceneSpec(specs, scene):
+    sceneSpecs = specs.get("scenes", {})
+    spec = sceneSpecs.get(os.path.basename(scene)) or sceneSpecs.get(scene) or specs.get("default")
+    if spec is None:
+        return None
+
+    sceneName = os.path.splitext(os.path.basename(scene))[0]
+    spec = dict(spec)
+    spec["fileName"] = spec.get("fileName") or sceneName
+    spec["saveDir"] = spec["saveDir"].replace("{scene}", sceneName)
+    spec.setdefault("meshes", [])
+    spec.setdefault("animations", [])
+    return spec
+
+
+class BatchManifest:
+    def __init__(self, path):
+        self.path = path
+        self.scenes = {} # scene path -> {"status", "attempts", "results", "message"}
+        if os.path.exists(path):
+            with open(path) as manifestFile:
+                self.scenes = json.load(manifestFile)["scenes"]
+
+    def Save(self):
+        tempPath = self.path + ".tmp"
+        with open(tempPath, "w") as manifestFile:
+            json.dump({"scenes": self.scenes}, manifestFile, indent = 4, sort_keys = True)
+        os.replace(tempPath, self.path) # never leaves a half written manifest behind
+
+    def GetScenesToRun(self, scenes):
+        # "running" means the previous run died while the scene was exporting, so it runs again
+        return [scene for scene in scenes if self.scenes.get(scene, {}).get("status") != "done"]
+
+    def SetStatus(self, scene, status, results = None, message = ""):
+        entry = self.scenes.setdefault(scene, {"attempts": 0})
+        entry["status"] = status
+        entry["message"] = message
+        if status == "running":
+            entry["attempts"] += 1
+        if results is not None:
+            entry["results"] = results
+        self.Save()
+
+
+class BatchExporter:
+    def __init__(self, manifest, workerCount = 4, mayapyPath = "", placeholder = False, skipUnchanged = True, timeout = 3600):
+        self.manifest = manifest
+        self.workerCount = max(1, workerCount)
+        self.mayapyPath = mayapyPath or GetMayapyPath()
+        self.placeholder = placeholder # run the stand in worker that writes placeholder files
+        self.skipUnchanged = skipUnchanged
+        self.timeout = timeout # seconds a scene gets before its worker is killed
+        self.jobDir = os.path.splitext(manifest.path)[0] + "_jobs"
+
+    def Launch(self, jobPath):
+        workerScript = os.path.join(os.path.dirname(os.path.abspath(__file__)), "MayaToUEWorker.py")
+        if self.placeholder:
+            return subprocess.Popen([sys.executable, workerScript, jobPath, "--placeholder"])
+        return subprocess.Popen([self.mayapyPath, workerScript, jobPath])
+
+    def StartScene(self, scene, spec, index):
+        job = {
+            "scene": scene,
+            "spec": spec,
+            "exportMesh": True,
+            "skipUnchanged": self.skipUnchanged,
+            "resultPath": os.path.join(self.jobDir, f"result_{index}.json"),
+        }
+        if os.path.exists(job["resultPath"]):
+            os.remove(job["resultPath"]) # left over from an earlier run
+        jobPath = os.path.join(self.jobDir, f"job_{index}.json")
+        with open(jobPath, "w") as jobFile:
+            json.dump(job, jobFile)
+
+        self.manifest.SetStatus(scene, "running")
+        return self.Launch(jobPath), job, time.time()
+
+    def FinishScene(self, scene, process, job):
+        if not os.path.exists(job["resultPath"]):
+            self.manifest.SetStatus(scene, "failed", message = f"worker exited with code {process.returncode}")
+            return
+
+        with open(job["resultPath"]) as resultFile:
+            results = json.load(resultFile)
+        failed = [result["name"] for result in results if result["status"] == "failed"]
+        if failed:
+            self.manifest.SetStatus(scene, "failed", results, "failed: " + ", ".join(failed))
+        else:
+            self.manifest.SetStatus(scene, "done", results)
+
+    def Run(self, scenes, specs):
+        os.makedirs(self.jobDir, exist_ok = True)
+        waiting = []
+        for scene in self.manifest.GetScenesToRun(scenes):
+            spec = GetSceneSpec(specs, scene)
+            if spec is None:
+                self.manifest.SetStatus(scene, "failed", message = "no export spec for this scene")
+                continue
+            waiting.append((scene, spec))
+
+        running = {} # scene -> (process, job, start time)
+        nextIndex = 0
+        try:
+            while waiting or running:
+                while waiting and len(running) < self.workerCount:
+                    scene, spec = waiting.pop(0)
+                    running[scene] = self.StartScene(scene, spec, nextIndex)
+                    nextIndex += 1
+                    print(f"started {scene}")
+
+                for scene, (process, job, startTime) in list(running.items()):
+                    if process.poll() is None:
+                        if time.time() - startTime < self.timeout:
+                            continue
+                        process.kill()
+                        process.wait()
+
+                    del running[scene]
+                    self.FinishScene(scene, process, job)
+                    print(f"{self.manifest.scenes[scene]['status']} {scene} {self.manifest.scenes[scene]['message']}")
+                time.sleep(0.2)
+        except KeyboardInterrupt:
+            for process, job, startTime in running.values():
+                process.kill() # their scenes stay "running" and are picked up by the next run
+            raise
+
+
+def Main(args):
+    parser = argparse.ArgumentParser(description = "Export many scenes to Unreal with MayaToUE.")
+    parser.add_argument("scenes", nargs = "+", help = "scene files or directories of scene files")
+    parser.add_argument("--spec", required = True, help = "json file with the export spec per scene")
+    parser.add_argument("--workers", type = int, default = 4, help = "number of headless maya processes")
+    parser.add_argument("--manifest", default = "MayaToUE_batch.json", help = "progress file, used to resume a run")
+    parser.add_argument("--mayapy", default = "", help = "mayapy to run the workers with, defaults to $MAYA_LOCATION/bin")
+    parser.add_argument("--timeout", type = int, default = 3600, help = "seconds a scene may take")
+    parser.add_argument("--no-skip", action = "store_true", help = "export everything, even unchanged files")
+    parser.add_argument("--placeholder", action = "store_true", help = "write placeholder files instead of running maya")
+    options = parser.parse_args(args)
+
+    with open(options.spec) as specFile:
+        specs = json.load(specFile)
+
+    manifest = BatchManifest(os.path.abspath(options.manifest))
+    exporter = BatchExporter(manifest, options.workers, options.mayapy, options.placeholder, not options.no_skip, options.timeout)
+    scenes = FindScenes(options.scenes)
+    exporter.Run(scenes, specs)
+
+    statuses = [manifest.scenes.get(scene, {}).get("status") for scene in scenes]
+    print(f"{statuses.count('done')} done, {statuses.count('failed')} failed, {len(scenes)} scenes")
+    return 0 if statuses.count("failed") == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(Main(sys.argv[1:]))
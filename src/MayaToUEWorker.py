@@ -0,0 +1,69 @@
+# Headless worker for MayaToUE, started by MayapyWorkerLauncher/PlaceholderWorkerLauncher:
+#   mayapy MayaToUEWorker.py job.json
+#   python MayaToUEWorker.py job.json --placeholder
+# The job holds the scene (a snapshot or a scene from MayaToUEBatch), the export spec of the clips this
+# worker owns, optionally the output paths, whether to export the mesh too and where to write the results.
+import os
+import sys
+import json
+import time
+
+
+def GetSpecOutputs(spec, exportMesh):
+    # same paths MayaToUE.GetSkeletalMeshSavePath/GetAnimClipSavePath give, without needing maya
+    outputs = []
+    if exportMesh:
+        outputs.append({"name": "mesh", "path": os.path.normpath(os.path.join(spec["saveDir"], spec["fileName"] + ".fbx"))})
+    for clip in spec["animations"]:
+        if clip.get("shouldExport", True):
+            clipPath = os.path.join(spec["saveDir"], "anim", spec["fileName"] + "_" + clip["subFix"] + ".fbx")
+            outputs.append({"name": clip["subFix"], "path": os.path.normpath(clipPath)})
+    return outputs
+
+
+def WritePlaceholders(job):
+    results = []
+    outputs = job.get("outputs") or GetSpecOutputs(job["spec"], job.get("exportMesh", False))
+    for output in outputs:
+        startTime = time.time()
+        os.makedirs(os.path.dirname(output["path"]), exist_ok = True)
+        with open(output["path"], "wb") as placeholderFile:
+            placeholderFile.write(b"placeholder fbx for " + output["name"].encode("utf-8"))
+
+        results.append({"name": output["name"], "path": output["path"], "status": "ok", "message": "placeholder",
+                        "duration": time.time() - startTime, "size": os.path.getsize(output["path"])})
+    return results
+
+
+def ExportInMaya(job):
+    import maya.standalone
+    maya.standalone.initialize(name = "python")
+    import maya.cmds as mc
+    mc.loadPlugin("fbxmaya", quiet = True)
+    mc.file(job["scene"], open = True, force = True)
+
+    from MayaToUE import MayaToUE
+    mayaToUE = MayaToUE()
+    mayaToUE.LoadExportSpec(job["spec"])
+    if job.get("exportMesh", False):
+        mayaToUE.skipUnchanged = job.get("skipUnchanged", False)
+        return [result.ToDict() for result in mayaToUE.SaveFiles()]
+    return [result.ToDict() for result in mayaToUE.ExportClips(mayaToUE.GetClipsToExport())]
+
+
+def Main(args):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))) # so MayaToUE can be imported
+    with open(args[0]) as jobFile:
+        job = json.load(jobFile)
+
+    if "--placeholder" in args:
+        results = WritePlaceholders(job)
+    else:
+        results = ExportInMaya(job)
+
+    with open(job["resultPath"], "w") as resultFile:
+        json.dump(results, resultFile)
+
+
+if __name__ == "__main__":
+    Main(sys.argv[1:])
@@ -0,0 +1,190 @@
+# Benchmarks for the Maya tools on the in-memory scene (MayaSceneStandIn.py), no maya needed:
+#   python MayaToolsBenchmark.py --ghosts 10 50 200 --limbs 4 16 64 --clips 4 16 64 --json results.json
+#   python MayaToolsBenchmark.py --baseline results.json --max-slowdown 1.5
+# Every operation runs at every scale and reports its wall time, maya.cmds calls and the scene's node count.
+# With --baseline the run fails when an operation makes more maya.cmds calls than in the baseline, or takes
+# longer than max-slowdown times the baseline. Call counts do not depend on the machine, times do.
+# The tools import PySide2, outside of maya it has to be installed.
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+VENDOR_DIR = os.path.normpath(os.path.join(SRC_DIR, "..", "vendor"))
+for path in (SRC_DIR, VENDOR_DIR):
+    if path not in sys.path:
+        sys.path.append(path) # the vendor maya package, the stand-in replaces its cmds and OpenMaya
+
+import MayaSceneStandIn
+
+MIN_SECONDS_TO_COMPARE = 0.05 # shorter times are mostly noise
+CLIP_LENGTH = 30
+CLIP_JOINT_COUNT = 20
+MESH_GRID_SIZE = 20 # the benchmark meshes are grids of this many quads a side
+
+
+def Measure(results, operation, scale, func):
+    scene = MayaSceneStandIn.scene
+    scene.callCounts.clear()
+    startTime = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - startTime
+    result = {
+        "operation": operation,
+        "scale": scale,
+        "seconds": seconds,
+        "calls": sum(scene.callCounts.values()),
+        "nodes": len(scene.nodes),
+        "topCalls": dict(scene.callCounts.most_common(5)),
+    }
+    results.append(result)
+    topCalls = ", ".join(f"{command} {count}" for command, count in result["topCalls"].items())
+    print(f"{operation:<26}{scale:>6}{seconds:>10.3f}s{result['calls']:>9} calls{result['nodes']:>8} nodes   {topCalls}")
+
+
+def BenchmarkGhoster(results, ghostCount):
+    import Ghoster
+    for shareTopology in (False, True):
+        label = "ghost shared" if shareTopology else "ghost"
+        scene = MayaSceneStandIn.NewScene()
+        scene.CreateGridMesh("body", MESH_GRID_SIZE, MESH_GRID_SIZE)
+        ghost = Ghoster.Ghost()
+        ghost.shareTopology = shareTopology
+        ghost.srcMeshes = {"body"}
+
+        def AddGhosts():
+            for frame in range(1, ghostCount + 1):
+                scene.currentTime = frame # not through maya.cmds, that would run the time changed job as well
+                ghost.AddGhost()
+        Measure(results, label + " add", ghostCount, AddGhosts)
+
+        def Scrub():
+            for frame in range(1, ghostCount + 1):
+                Ghoster.mc.currentTime(frame, e = True)
+        Measure(results, label + " scrub", ghostCount, Scrub)
+        Measure(results, label + " delete all", ghostCount, ghost.DeleteAllGhost)
+
+
+def CreateLimbSkeleton(scene, limbCount):
+    root = scene.CreateJoint("root", translate = (0, 100, 0))
+    for limb in range(limbCount):
+        upperArm = scene.CreateJoint(f"upperarm_{limb}", root, (10 + limb * 5, 0, 0))
+        lowerArm = scene.CreateJoint(f"lowerarm_{limb}", upperArm, (30, 0, -5)) # bent, so the pole vector has a side
+        scene.CreateJoint(f"hand_{limb}", lowerArm, (30, 0, 5))
+    return root
+
+
+def BenchmarkMakeController(results, limbCount):
+    import MakeController
+    scene = MayaSceneStandIn.NewScene()
+    root = CreateLimbSkeleton(scene, limbCount)
+    Measure(results, "limbs rig", limbCount, lambda: MakeController.RigLimbs(MakeController.FindLimbChains(root)))
+    Measure(results, "limbs rebuild unchanged", limbCount, MakeController.RebuildRig)
+
+    for limb in range(limbCount):
+        node = scene.GetNode(f"lowerarm_{limb}")
+        node.matrix = (0.0, 1.0, 0.0, 0.0, -1.0, 0.0, 0.0, 0.0) + node.matrix[8:] # every elbow bent, the rest stays
+    Measure(results, "limbs rebuild posed", limbCount, MakeController.RebuildRig)
+
+    for limb in range(limbCount):
+        node = scene.GetNode(f"upperarm_{limb}")
+        node.matrix = node.matrix[:13] + (node.matrix[13] + 1.0,) + node.matrix[14:] # every limb moved up a bit
+    Measure(results, "limbs rebuild moved", limbCount, MakeController.RebuildRig)
+    Measure(results, "limbs rebuild resized", limbCount, lambda: MakeController.RebuildRig(MakeController.FK_CTRL_SIZE * 2))
+
+    scene = MayaSceneStandIn.NewScene()
+    root = CreateLimbSkeleton(scene, limbCount)
+    MakeController.SHARE_CONTROLLER_SHAPES = True
+    try:
+        Measure(results, "limbs rig shared shapes", limbCount, lambda: MakeController.RigLimbs(MakeController.FindLimbChains(root)))
+    finally:
+        MakeController.SHARE_CONTROLLER_SHAPES = False
+
+
+def CreateClipScene(scene, clipCount):
+    # a joint chain keyed every 5 frames over all the clips, and a mesh
+    parent = None
+    frames = range(1, clipCount * CLIP_LENGTH + 2, 5)
+    for index in range(CLIP_JOINT_COUNT):
+        parent = scene.CreateJoint("root" if index == 0 else f"jnt_{index}", parent, (0, 10, 0))
+        for channel in ("translateX", "rotateX", "rotateY", "rotateZ"):
+            scene.SetKeys(parent, channel, [(frame, (frame * (index + 1)) % 37) for frame in frames])
+    scene.CreateGridMesh("body", MESH_GRID_SIZE, MESH_GRID_SIZE)
+
+
+def BenchmarkMayaToUE(results, clipCount):
+    import MayaToUE
+    scene = MayaSceneStandIn.NewScene()
+    CreateClipScene(scene, clipCount)
+    with tempfile.TemporaryDirectory() as saveDir:
+        mayaToUE = MayaToUE.MayaToUE()
+        mayaToUE.rootJnt = "root"
+        mayaToUE.meshes = {"body"}
+        mayaToUE.fileName = "bench"
+        mayaToUE.saveDir = saveDir
+        for index in range(clipCount):
+            clip = mayaToUE.AddAnimClip()
+            clip.frameStart = 1 + index * CLIP_LENGTH
+            clip.frameEnd = clip.frameStart + CLIP_LENGTH
+            clip.subFix = f"clip{index}"
+
+        Measure(results, "clips export", clipCount, mayaToUE.SaveFiles)
+        mayaToUE.skipUnchanged = True # fingerprints are only taken from here on
+        Measure(results, "clips export fingerprinted", clipCount, mayaToUE.SaveFiles)
+        Measure(results, "clips export unchanged", clipCount, mayaToUE.SaveFiles)
+
+
+def CompareToBaseline(results, baseline, maxSlowdown):
+    # the regressions, as lines to print
+    baselineResults = {(result["operation"], result["scale"]): result for result in baseline}
+    regressions = []
+    for result in results:
+        baselineResult = baselineResults.get((result["operation"], result["scale"]))
+        if not baselineResult:
+            continue
+        name = f"{result['operation']} at {result['scale']}"
+        if result["calls"] > baselineResult["calls"]:
+            regressions.append(f"{name}: {result['calls']} maya.cmds calls, the baseline made {baselineResult['calls']}")
+        if result["seconds"] > max(baselineResult["seconds"] * maxSlowdown, MIN_SECONDS_TO_COMPARE):
+            regressions.append(f"{name}: {result['seconds']:.3f}s, the baseline took {baselineResult['seconds']:.3f}s")
+    return regressions
+
+
+def Main(args):
+    parser = argparse.ArgumentParser(description = "Benchmark the Maya tools on an in-memory scene.")
+    parser.add_argument("--ghosts", type = int, nargs = "*", default = [10, 50, 200], help = "ghost counts to run Ghoster with")
+    parser.add_argument("--limbs", type = int, nargs = "*", default = [4, 16, 64], help = "limb counts to run MakeController with")
+    parser.add_argument("--clips", type = int, nargs = "*", default = [4, 16, 64], help = "clip counts to run MayaToUE with")
+    parser.add_argument("--json", default = "", help = "write the results to this file, to use as a baseline later")
+    parser.add_argument("--baseline", default = "", help = "results of an earlier run to compare with")
+    parser.add_argument("--max-slowdown", type = float, default = 1.5, help = "how many times slower than the baseline is a regression")
+    options = parser.parse_args(args)
+
+    MayaSceneStandIn.Install() # before the tools are imported
+    results = []
+    for ghostCount in options.ghosts:
+        BenchmarkGhoster(results, ghostCount)
+    for limbCount in options.limbs:
+        BenchmarkMakeController(results, limbCount)
+    for clipCount in options.clips:
+        BenchmarkMayaToUE(results, clipCount)
+
+    if options.json:
+        with open(options.json, "w") as resultFile:
+            json.dump(results, resultFile, indent = 4)
+
+    if not options.baseline:
+        return 0
+    with open(options.baseline) as baselineFile:
+        regressions = CompareToBaseline(results, json.load(baselineFile), options.max_slowdown)
+    for regression in regressions:
+        print("regression: " + regression)
+    print(f"{len(regressions)} regressions against {options.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(Main(sys.argv[1:]))
@@ -0,0 +1,157 @@
+# A persistent remote execution session from Maya to a running Unreal Editor.
+# The editor needs the Python plugin with "Enable Remote Execution" on. Discovery runs once,
+# the command connection stays open between exports and every export sends one import command:
+#   link = GetUnrealLink()
+#   link.Connect()
+#   link.ImportFiles(meshPath, animPaths)
+# ImportAnimsOnNodes spreads the clip imports of a big re-import over several editors instead.
+# UnrealStandInNode.py answers the same protocol, to try this without an editor.
+import os
+import sys
+import time
+import asyncio
+
+VENDOR_UNREAL_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "vendor", "unreal"))
+if VENDOR_UNREAL_DIR not in sys.path:
+    sys.path.append(VENDOR_UNREAL_DIR) # only remote_execution.py lives there, the maya stubs stay off the path
+
+import remote_execution
+import remote_execution_async
+
+
+def BuildUtilitiesCommand(srcDir, call):
+    # runs call in the editor, UnrealUtilities is reloaded so edits to it are picked up
+    lines = [
+        "import sys, importlib",
+        f"if {srcDir!r} not in sys.path: sys.path.append({srcDir!r})",
+        "import UnrealUtilities",
+        "importlib.reload(UnrealUtilities)",
+        call,
+    ]
+    return "\n".join(lines)
+
+
+def BuildImportCommand(srcDir, meshPath, animPaths, importMesh = True):
+    # one command for the whole export
+    return BuildUtilitiesCommand(srcDir, f"UnrealUtilities.ImportFiles({meshPath!r}, {list(animPaths)!r}, {importMesh!r})")
+
+
+def BuildImportAnimCommand(srcDir, meshPath, animPath):
+    # one clip onto a mesh that is already imported
+    return BuildUtilitiesCommand(srcDir, f"UnrealUtilities.ImportAnims(UnrealUtilities.GetImportedMesh({meshPath!r}), [{animPath!r}])")
+
+
+def BuildRecordAnimsCommand(srcDir, meshPath, animPaths):
+    return BuildUtilitiesCommand(srcDir, f"UnrealUtilities.RecordImportedAnims({meshPath!r}, {list(animPaths)!r})")
+
+
+async def RunOnNodes(commands, nodeCount, timeout, config = None, getFinalCommand = None):
+    # getFinalCommand(results) gives a command to run once on one of the nodes after the others, or None
+    session = remote_execution_async.AsyncRemoteExecutionFanOut(config)
+    await session.start()
+    try:
+        await session.discover(count = nodeCount)
+        if not await session.open_command_connections(count = nodeCount):
+            raise RuntimeError("No Unreal Editor found, is remote execution enabled in its Python plugin settings?")
+        results = await session.run_commands(commands, timeout = timeout)
+        finalCommand = getFinalCommand(results) if getFinalCommand else None
+        if finalCommand and session.connected_node_ids:
+            await session.run_commands([finalCommand], timeout = timeout)
+        return results
+    finally:
+        await session.stop()
+
+
+def ImportAnimsOnNodes(meshPath, animPaths, nodeCount = 4, timeout = 600, config = None):
+    # Every clip is its own job, spread over up to nodeCount editors open on the same project. The mesh has to be
+    # imported and saved already (ImportFiles) so every editor can load it. The sync index is written once at the
+    # end by one editor, if they all wrote it they would overwrite each other's entries.
+    # Returns one dict per clip: node_id, attempts, success, result and error.
+    srcDir = os.path.dirname(os.path.abspath(__file__))
+    commands = [BuildImportAnimCommand(srcDir, meshPath, animPath) for animPath in animPaths]
+    def GetRecordCommand(results):
+        imported = [animPath for animPath, result in zip(animPaths, results) if result["success"]]
+        return BuildRecordAnimsCommand(srcDir, meshPath, imported) if imported else None
+    return asyncio.run(RunOnNodes(commands, nodeCount, timeout, config, GetRecordCommand))
+
+
+class UnrealLink:
+    def __init__(self, config = None):
+        self.config = config or remote_execution.RemoteExecutionConfig()
+        self.remoteExec = None
+        self.nodeId = "" # the editor the command connection is open to
+
+    def Start(self):
+        if not self.remoteExec:
+            self.remoteExec = remote_execution.RemoteExecution(self.config)
+            self.remoteExec.start()
+
+    def Stop(self):
+        if self.remoteExec:
+            self.remoteExec.stop()
+            self.remoteExec = None
+        self.nodeId = ""
+
+    def GetNodes(self, timeout = 3):
+        # the editors that answered the discovery pings, waits up to timeout seconds for the first one
+        self.Start()
+        endTime = time.time() + timeout
+        while not self.remoteExec.remote_nodes and time.time() < endTime:
+            time.sleep(0.1)
+        return self.remoteExec.remote_nodes
+
+    def IsConnected(self):
+        return bool(self.remoteExec and self.remoteExec.has_command_connection())
+
+    def Connect(self, nodeId = "", timeout = 3):
+        # connects to nodeId, or the first editor found; does nothing if already connected to it
+        if self.IsConnected() and (not nodeId or nodeId == self.nodeId):
+            return self.nodeId
+
+        nodes = self.GetNodes(timeout)
+        nodeIds = [node["node_id"] for node in nodes]
+        if not nodeIds:
+            raise RuntimeError("No Unreal Editor found, is remote execution enabled in its Python plugin settings?")
+        if nodeId and nodeId not in nodeIds:
+            raise RuntimeError(f"Unreal Editor node {nodeId} not found")
+
+        self.Disconnect() # a connection to another editor
+        self.remoteExec.open_command_connection(nodeId or nodeIds[0])
+        self.nodeId = nodeId or nodeIds[0]
+        return self.nodeId
+
+    def Disconnect(self):
+        # drops the command connection, IsConnected can not tell a dead one from a live one
+        if self.remoteExec:
+            self.remoteExec.close_command_connection()
+
+    def RunCommand(self, command):
+        # reconnects once if the editor dropped the connection since the last command
+        self.Connect(self.nodeId)
+        try:
+            data = self.remoteExec.run_command(command)
+        except (OSError, ConnectionError, RuntimeError): # the protocol raises RuntimeError when the editor went away
+            self.Disconnect()
+            self.Connect(self.nodeId)
+            try:
+                data = self.remoteExec.run_command(command)
+            except (OSError, ConnectionError, RuntimeError):
+                self.Disconnect() # so the next command starts from a fresh connection
+                raise
+        if not data["success"]: # the command ran and failed, running it again would not help
+            raise RuntimeError(f"Remote Python Command failed! {data['result']}")
+        return data
+
+    def ImportFiles(self, meshPath, animPaths, importMesh = True):
+        srcDir = os.path.dirname(os.path.abspath(__file__))
+        return self.RunCommand(BuildImportCommand(srcDir, meshPath, animPaths, importMesh))
+
+
+unrealLink = None
+
+def GetUnrealLink():
+    # one session per maya, the MayaToUE shelf button can be run again without rediscovering the editor
+    global unrealLink
+    if not unrealLink:
+        unrealLink = UnrealLink()
+    return unrealLink
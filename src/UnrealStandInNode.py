@@ -0,0 +1,154 @@
+# A stand in for an Unreal Editor with remote execution on, to try UnrealLink without an editor:
+#   python UnrealStandInNode.py [--log commands.log] [--protocol-version 1] [--delay 0.05]
+# It answers the discovery pings, connects back when asked to open a command connection and replies
+# to every command with a success, without running it. The commands are printed and optionally logged.
+# With protocol version 2 every line of the command is streamed back as a command_result_chunk before
+# the result, version 1 behaves like an editor that predates framing and sends the lines in the result.
+# A command_id sent with a command is echoed back in its chunks and result, like an editor that pipelines.
+import os
+import sys
+import json
+import uuid
+import time
+import select
+import socket
+import argparse
+import threading
+
+sys.path.append(os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "vendor", "unreal")))
+import remote_execution
+from remote_execution import _RemoteExecutionMessage as Message
+
+
+class UnrealStandInNode:
+    def __init__(self, config = None, logPath = "", protocolVersion = remote_execution._PROTOCOL_VERSION, delay = 0.0):
+        self.config = config or remote_execution.RemoteExecutionConfig()
+        self.logPath = logPath
+        self.protocolVersion = protocolVersion # the highest version this node speaks
+        self.delay = delay # seconds every command "runs" for
+        self.nodeId = str(uuid.uuid4())
+        self.commands = [] # every command received, in order
+        self.running = False
+        self.broadcastSocket = None
+        self.threads = []
+
+    def Start(self):
+        self.running = True
+        self.broadcastSocket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        if hasattr(socket, "SO_REUSEPORT"):
+            self.broadcastSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        else:
+            self.broadcastSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        groupIp, groupPort = self.config.multicast_group_endpoint
+        bindAddress = self.config.multicast_bind_address
+        self.broadcastSocket.bind((bindAddress, groupPort))
+        self.broadcastSocket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        self.broadcastSocket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self.config.multicast_ttl)
+        self.broadcastSocket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(bindAddress))
+        self.broadcastSocket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, socket.inet_aton(groupIp) + socket.inet_aton(bindAddress))
+        self.broadcastSocket.settimeout(0.1)
+        self.StartThread(self.ListenBroadcast)
+
+    def Stop(self):
+        self.running = False
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        if self.broadcastSocket:
+            self.broadcastSocket.close()
+            self.broadcastSocket = None
+
+    def StartThread(self, target, *args):
+        thread = threading.Thread(target = target, args = args, daemon = True)
+        thread.start()
+        self.threads.append(thread)
+
+    def Broadcast(self, message):
+        self.broadcastSocket.sendto(message.to_json_bytes(), self.config.multicast_group_endpoint)
+
+    def ListenBroadcast(self):
+        while self.running:
+            try:
+                data = self.broadcastSocket.recv(remote_execution.DEFAULT_RECEIVE_BUFFER_SIZE)
+            except socket.timeout:
+                continue
+            message = Message(None, None)
+            if not message.from_json_bytes(data) or not message.passes_receive_filter(self.nodeId):
+                continue
+            if message.type_ == remote_execution._TYPE_PING:
+                self.Broadcast(Message(remote_execution._TYPE_PONG, self.nodeId, message.source, self.GetNodeData()))
+            elif message.type_ == remote_execution._TYPE_OPEN_CONNECTION and message.dest == self.nodeId:
+                # an old client does not ask for a version, it gets the old protocol
+                version = min(self.protocolVersion, message.data.get("protocol_version", remote_execution._PROTOCOL_VERSION_LEGACY))
+                self.StartThread(self.ServeCommands, message.source, message.data["command_ip"], message.data["command_port"], version)
+
+    def GetNodeData(self):
+        # the fields the editor puts in its pong
+        return {
+            "user": os.environ.get("USERNAME", os.environ.get("USER", "")),
+            "machine": socket.gethostname(),
+            "engine_version": "StandIn",
+            "engine_root": "",
+            "project_root": "",
+            "project_name": "UnrealStandInNode",
+            "protocol_version": self.protocolVersion,
+        }
+
+    def ServeCommands(self, clientId, commandIp, commandPort, version):
+        try:
+            commandSocket = socket.create_connection((commandIp, commandPort), timeout = 5)
+        except OSError:
+            return # the client gave up already, it asks again
+        commandSocket.settimeout(None)
+        stream = remote_execution._RemoteExecutionMessageStream(commandSocket, version, self.config.compression_threshold)
+        with commandSocket:
+            while self.running:
+                if not stream.has_buffered_data() and not select.select([commandSocket], [], [], 0.1)[0]:
+                    continue # nothing yet, look at self.running again
+                try:
+                    message = stream.receive_message()
+                except (RuntimeError, OSError):
+                    return # the client closed the connection
+                if message and message.type_ == remote_execution._TYPE_COMMAND:
+                    for messageType, data in self.RunCommand(message.data, version):
+                        stream.send_message(Message(messageType, self.nodeId, clientId, data))
+
+    def RunCommand(self, commandData, version):
+        # yields (message type, data) to send back, the output is the command's lines
+        command = commandData["command"]
+        self.commands.append(command)
+        print(f"[{self.nodeId}] {command}")
+        if self.logPath:
+            with open(self.logPath, "a") as logFile:
+                logFile.write(json.dumps(commandData) + "\n")
+        time.sleep(self.delay)
+
+        idData = {"command_id": commandData["command_id"]} if version >= 2 and "command_id" in commandData else {}
+        output = [{"type": "Info", "output": line} for line in command.splitlines()]
+        if version >= 2:
+            for line in output:
+                yield remote_execution._TYPE_COMMAND_RESULT_CHUNK, dict(idData, output = [line])
+            output = []
+        yield remote_execution._TYPE_COMMAND_RESULT, dict(idData, success = True, command = command, result = "None", output = output)
+
+
+def Main(argv = None):
+    parser = argparse.ArgumentParser(description = "Stand in for an Unreal Editor with remote execution on.")
+    parser.add_argument("--log", default = "", help = "append every command received to this file, one json per line")
+    parser.add_argument("--protocol-version", type = int, default = remote_execution._PROTOCOL_VERSION, help = "1 to act like an editor without framing")
+    parser.add_argument("--delay", type = float, default = 0.0, help = "seconds every command takes")
+    args = parser.parse_args(argv)
+
+    node = UnrealStandInNode(logPath = args.log, protocolVersion = args.protocol_version, delay = args.delay)
+    node.Start()
+    print(f"stand in node {node.nodeId} running, Ctrl+C to stop")
+    try:
+        while True:
+            threading.Event().wait(1)
+    except KeyboardInterrupt:
+        pass
+    node.Stop()
+
+
+if __name__ == "__main__":
+    Main()
@@ -1,9 +1,15 @@
 import unreal 
 import os
+import json
+import time
+import hashlib
 
-def ImportSkeletalMesh(meshPath):
+SYNC_INDEX_NAME = "MayaToUEImportIndex.json" # in the project's Saved folder
+SOURCE_MISSING_TAG = "MayaToUE.SourceMissing"
 
-    importTask = CreateImportTask(meshPath)
+def ImportSkeletalMesh(meshPath, save = True):
+
+    importTask = CreateImportTask(meshPath, save)
 
     importOptions = unreal.FbxImportUI()
     importOptions.import_mesh = True
@@ -14,20 +20,33 @@ def ImportSkeletalMesh(meshPath):
     importTask.options = importOptions
 
     unreal.AssetToolsHelpers.get_asset_tools().import_asset_tasks([importTask])
-    return importTask.get_objects()[0]
+    return GetImportedAsset(importTask)
 
-def CreateImportTask(meshPath):
+def CreateImportTask(meshPath, save = True):
     importTask = unreal.AssetImportTask()
     importTask.filename = meshPath
     assetName = os.path.basename(os.path.abspath(meshPath)).split(".")[0]
     importTask.destination_path = '/game/' + assetName
     importTask.automated = True # do not popup the inport options
-    importTask.save = True
+    importTask.save = save # batches save once at the end instead, see ImportAnims
     importTask.replace_existing = True
     return importTask
 
 def importAnim(mesh: unreal.SkeletalMesh, animPath):
-    importTask = CreateImportTask(animPath)
+    importTask = CreateAnimImportTask(mesh, animPath)
+    unreal.AssetToolsHelpers.get_asset_tools().import_asset_tasks([importTask])
+    return GetImportedAsset(importTask)
+
+def GetImportedAsset(importTask):
+    # the asset the task imported, None and an error in the log when the import failed
+    importedObjects = importTask.get_objects()
+    if not importedObjects:
+        unreal.log_error(f"MayaToUE: failed to import {importTask.filename}")
+        return None
+    return importedObjects[0]
+
+def CreateAnimImportTask(mesh: unreal.SkeletalMesh, animPath, save = True):
+    importTask = CreateImportTask(animPath, save)
     meshDir = os.path.dirname(mesh.get_path_name())
     importTask.destination_path = meshDir + "/animations"
 
@@ -39,16 +58,233 @@ def importAnim(mesh: unreal.SkeletalMesh, animPath):
     importOptions.set_editor_property('automated_import_should_detect_type', False)
     importOptions.set_editor_property('original_import_type', unreal.FBXImportType.FBXIT_SKELETAL_MESH)
     importOptions.set_editor_property('mesh_type_to_import', unreal.FBXImportType.FBXIT_ANIMATION)
+    importOptions.set_editor_property('skeleton', mesh.get_editor_property('skeleton')) # the clip files have no mesh, bind them to the mesh's skeleton
 
     importTask.options = importOptions
+    return importTask
 
-    unreal.AssetToolsHelpers.get_asset_tools().import_asset_tasks([importTask])
+def ImportAnims(mesh: unreal.SkeletalMesh, animPaths, assetsToSave = ()):
+    # Every clip in one import_asset_tasks call and one save of all the touched assets at the end,
+    # instead of a call and a save per clip. Returns the imported asset per path and the seconds each phase took.
+    timings = {}
+    startTime = time.perf_counter()
+    importTasks = [CreateAnimImportTask(mesh, animPath, save = False) for animPath in animPaths]
+    timings["build"] = time.perf_counter() - startTime
+
+    startTime = time.perf_counter()
+    if importTasks:
+        unreal.AssetToolsHelpers.get_asset_tools().import_asset_tasks(importTasks)
+    timings["import"] = time.perf_counter() - startTime
+
+    anims = [GetImportedAsset(importTask) for importTask in importTasks]
+    startTime = time.perf_counter()
+    toSave = [asset for asset in list(assetsToSave) + anims if asset]
+    if toSave:
+        unreal.EditorAssetLibrary.save_loaded_assets(toSave, False)
+    timings["save"] = time.perf_counter() - startTime
+
+    unreal.log(f"MayaToUE: {len(importTasks)} clips, build {timings['build']:.2f}s, import {timings['import']:.2f}s, save {timings['save']:.2f}s ({len(toSave)} assets)")
+    return dict(zip(animPaths, anims)), timings
 
 def ImportMeshAndAnims(meshpath, animDir):
-    mesh = ImportSkeletalMesh(meshpath)
-    for fileName in os.listdir(animDir):
-        if ".fbx" in fileName:
-            animPath = os.path.join(animDir, fileName)
-            importAnim(mesh, animPath)
+    mesh = ImportSkeletalMesh(meshpath, save = False)
+    animPaths = [os.path.join(animDir, fileName) for fileName in os.listdir(animDir) if ".fbx" in fileName]
+    ImportAnims(mesh, animPaths, [mesh])
+
+def GetImportedMesh(meshPath):
+    # the asset ImportSkeletalMesh made from meshPath before
+    assetName = os.path.basename(os.path.abspath(meshPath)).split(".")[0]
+    return unreal.EditorAssetLibrary.load_asset('/game/' + assetName + '/' + assetName)
+
+def ImportFiles(meshPath, animPaths, importMesh = True):
+    # what MayaToUE sends over remote execution after an export, the mesh is only imported if it changed
+    index = LoadSyncIndex()
+    mesh = ImportSkeletalMesh(meshPath, save = False) if importMesh else GetImportedMesh(meshPath)
+    if not mesh:
+        raise RuntimeError(f"no skeletal mesh imported from {meshPath}, export the mesh first")
+    if importMesh:
+        RecordImport(index, meshPath, mesh)
+    anims, timings = ImportAnims(mesh, animPaths, [mesh] if importMesh else [])
+    for animPath, anim in anims.items():
+        RecordImport(index, animPath, anim) # a failed clip is dropped from the index, the next sync imports it again
+    SaveSyncIndex(index)
+    return timings
+
+def GetSyncIndexPath():
+    return os.path.join(unreal.Paths.project_saved_dir(), SYNC_INDEX_NAME)
+
+def LoadSyncIndex():
+    # source file path -> {"size", "mtime", "hash", "asset"} of the last import
+    indexPath = GetSyncIndexPath()
+    if not os.path.exists(indexPath):
+        return {}
+    with open(indexPath) as indexFile:
+        return json.load(indexFile)
+
+def SaveSyncIndex(index):
+    indexPath = GetSyncIndexPath()
+    os.makedirs(os.path.dirname(indexPath), exist_ok = True)
+    with open(indexPath + ".tmp", "w") as indexFile:
+        json.dump(index, indexFile, indent = 4)
+    os.replace(indexPath + ".tmp", indexPath) # a crash mid write keeps the old index
+
+def GetIndexKey(path):
+    return os.path.normcase(os.path.abspath(path))
+
+def GetFileHash(path):
+    hasher = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def GetFileState(path, entry):
+    # size and mtime first, the file is only hashed when one of them moved
+    stat = os.stat(path)
+    state = {"size": stat.st_size, "mtime": stat.st_mtime}
+    if entry and entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime:
+        state["hash"] = entry.get("hash")
+    else:
+        state["hash"] = GetFileHash(path)
+    return state
+
+def RecordImport(index, path, asset):
+    # returns False and forgets the file when nothing was imported from it, so it does not look unchanged next time
+    key = GetIndexKey(path)
+    if not asset:
+        index.pop(key, None)
+        return False
+    state = GetFileState(path, None)
+    state["asset"] = asset.get_path_name()
+    index[key] = state
+    return True
+
+def RecordImportedAnims(meshPath, animPaths):
+    # records clips another editor imported (UnrealLink.ImportAnimsOnNodes), they land next to the mesh like importAnim puts them
+    index = LoadSyncIndex()
+    animDir = os.path.dirname(GetImportedMesh(meshPath).get_path_name()) + "/animations/"
+    for animPath in animPaths:
+        assetName = os.path.basename(animPath).split(".")[0]
+        RecordImport(index, animPath, unreal.EditorAssetLibrary.load_asset(animDir + assetName))
+    SaveSyncIndex(index)
+
+def GetSyncSources(meshPath, animDir = ""):
+    # the mesh and its clips, MayaToUE writes them to <saveDir>/anim/<fileName>_<subfix>.fbx
+    animDir = animDir or os.path.join(os.path.dirname(meshPath), "anim")
+    clipPrefix = os.path.basename(meshPath).split(".")[0] + "_"
+    animPaths = []
+    if os.path.isdir(animDir):
+        for fileName in sorted(os.listdir(animDir)):
+            if fileName.lower().endswith(".fbx") and fileName.startswith(clipPrefix):
+                animPaths.append(os.path.join(animDir, fileName))
+    return animPaths, clipPrefix, animDir
+
+def IsSourceChanged(index, path):
+    entry = index.get(GetIndexKey(path))
+    if not entry or entry.get("missing"):
+        return True
+    state = GetFileState(path, entry)
+    if state["hash"] != entry["hash"]:
+        return True
+    entry.update(state) # only touched, remember the new mtime so it is not hashed again
+    return False
+
+def FlagMissingSource(entry):
+    # the asset stays, it is tagged so it can be found and cleaned up by hand
+    entry["missing"] = True
+    asset = unreal.EditorAssetLibrary.load_asset(entry["asset"]) if entry.get("asset") else None
+    if asset:
+        unreal.EditorAssetLibrary.set_metadata_tag(asset, SOURCE_MISSING_TAG, "True")
+    unreal.log_warning(f"MayaToUE: source of {entry.get('asset')} was deleted")
+
+def SyncExportFolder(meshPath, animDir = ""):
+    # imports only the files that are new or changed since the last sync, returns what happened to each file
+    index = LoadSyncIndex()
+    report = {"imported": [], "unchanged": [], "missing": [], "failed": []}
+    animPaths, clipPrefix, animDir = GetSyncSources(meshPath, animDir)
+
+    meshImported = os.path.exists(meshPath) and IsSourceChanged(index, meshPath)
+    if meshImported:
+        mesh = ImportSkeletalMesh(meshPath, save = False)
+        report["imported" if RecordImport(index, meshPath, mesh) else "failed"].append(meshPath)
+    else:
+        mesh = GetImportedMesh(meshPath)
+        if os.path.exists(meshPath):
+            report["unchanged"].append(meshPath)
+
+    changedAnimPaths = []
+    for animPath in animPaths:
+        if IsSourceChanged(index, animPath):
+            changedAnimPaths.append(animPath)
+        else:
+            report["unchanged"].append(animPath)
+    if changedAnimPaths and not mesh:
+        raise RuntimeError(f"no skeletal mesh imported from {meshPath}, the clips need its skeleton")
+
+    if changedAnimPaths or meshImported:
+        anims, report["timings"] = ImportAnims(mesh, changedAnimPaths, [mesh] if meshImported else [])
+        for animPath, anim in anims.items():
+            report["imported" if RecordImport(index, animPath, anim) else "failed"].append(animPath)
+
+    # files of this export that were imported before and are gone now
+    meshKey = GetIndexKey(meshPath)
+    clipKeyPrefix = GetIndexKey(os.path.join(animDir, clipPrefix))
+    for key, entry in index.items():
+        isOurs = key == meshKey or key.startswith(clipKeyPrefix)
+        if isOurs and not os.path.exists(key) and not entry.get("missing"):
+            FlagMissingSource(entry)
+            report["missing"].append(key)
+
+    SaveSyncIndex(index)
+    return report
+
+class ExportFolderWatcher:
+    # Polls an export from the editor tick and syncs it when a file was added, touched or deleted:
+    #   watcher = UnrealUtilities.ExportFolderWatcher("D:/export/hero.fbx")
+    #   watcher.Start()
+    def __init__(self, meshPath, animDir = "", interval = 2.0):
+        self.meshPath = meshPath
+        self.animDir = animDir
+        self.interval = interval # seconds between two looks at the folder
+        self.elapsed = 0.0
+        self.lastStats = None
+        self.tickHandle = None
+
+    def Start(self):
+        if not self.tickHandle:
+            self.tickHandle = unreal.register_slate_post_tick_callback(self.Tick)
+
+    def Stop(self):
+        if self.tickHandle:
+            unreal.unregister_slate_post_tick_callback(self.tickHandle)
+            self.tickHandle = None
+
+    def GetStats(self):
+        # cheap (name, size, mtime) listing, the files are only hashed by the sync when this changes
+        animPaths, clipPrefix, animDir = GetSyncSources(self.meshPath, self.animDir)
+        stats = []
+        for path in [self.meshPath] + animPaths:
+            if os.path.exists(path):
+                stat = os.stat(path)
+                stats.append((path, stat.st_size, stat.st_mtime))
+        return stats
+
+    def Tick(self, deltaTime):
+        self.elapsed += deltaTime
+        if self.elapsed < self.interval:
+            return
+        self.elapsed = 0.0
+
+        stats = self.GetStats()
+        if stats == self.lastStats:
+            return
+        try:
+            report = SyncExportFolder(self.meshPath, self.animDir)
+            self.lastStats = stats
+            if report["imported"] or report["missing"] or report["failed"]:
+                unreal.log(f"MayaToUE sync: imported {len(report['imported'])}, missing {len(report['missing'])}, failed {len(report['failed'])}")
+        except Exception as e: # a file still being written, try again next time
+            unreal.log_warning(f"MayaToUE sync failed: {e}")
 
-ImportMeshAndAnims("EnterMeshDirHere", "EnterAnimDirHere")
\ No newline at end of file
+if __name__ == "__main__":
+    ImportMeshAndAnims("EnterMeshDirHere", "EnterAnimDirHere")